@@ -0,0 +1,45 @@
+'''
+
+Benchmark of the evaluation of the parameter constraints of trunk, at a
+point by calling the constraints and at a batch of points by their
+`evaluate` method. Run it from the top of the source tree:
+
+  shell$ python benchmarks/constraint_benchmark.py [number of points]
+
+The times are given in milliseconds.
+'''
+import sys
+import time
+import numpy
+
+from opal.core.parameter import Parameter
+from opal.core.parameter import ParameterConstraint
+
+expressions = ['eta1 < eta2', 'eta1 > 0', 'eta2 < 1', 'gamma1 > 0',
+               'gamma1 <= gamma2', 'gamma3 > 1']
+
+if __name__ == '__main__':
+    nPoints = 10000
+    if len(sys.argv) > 1:
+        nPoints = int(sys.argv[1])
+    constraints = [ParameterConstraint(expression) \
+                   for expression in expressions]
+    names = ['eta1', 'eta2', 'gamma1', 'gamma2', 'gamma3']
+    parameters = [Parameter(name=name, default=0.0) for name in names]
+    points = numpy.random.RandomState(0).rand(nPoints, len(names))*2.0
+    t = time.time()
+    feasible = []
+    for point in points:
+        for param, value in zip(parameters, point):
+            param.set_value(value)
+        feasible.append(min([constraint(parameters) \
+                             for constraint in constraints]))
+    print '%-20s %10.2f' % ('point by point', 1000*(time.time() - t))
+    t = time.time()
+    values = dict(zip(names, points.T))
+    mask = numpy.ones(nPoints, dtype=bool)
+    for constraint in constraints:
+        mask = mask & constraint.evaluate(values)
+    print '%-20s %10.2f' % ('batch', 1000*(time.time() - t))
+    assert list(mask) == feasible
+    print mask.sum(), 'feasible points out of', nPoints
@@ -0,0 +1,51 @@
+'''
+
+Benchmark of the extraction of the measures of trunk from its output, by
+the `MeasureExtractor` of `examples/trunk/trunk_run.py` and by one call of
+`opal.core.tools.extract_measure` by measure. Run it from the top of the
+source tree:
+
+  shell$ python benchmarks/measure_benchmark.py [number of iterations]
+
+The output is made of one line by iteration followed by the final report.
+The times are given in milliseconds.
+'''
+import sys
+import time
+
+sys.path.insert(0, 'examples/trunk')
+
+from opal.core.tools import extract_measure
+from trunk_run import extractor
+
+report = ''' #iterations............ : 34
+ CG iterations.......... : 40
+ Function evals......... : 36
+ Gradient evals......... : 35
+ Hessian-vector products : 41
+ objective value........ : 0.2420000E+02/  0.1234567E-12
+ Gradient 2-norm........ : 0.3456000E-06
+ Relative decrease in gradient : 0.1000000E-07
+ Final Trust-Region radius..... : 0.1250000E+01
+ Exit code.............. : 0
+ user     :     0.02
+'''
+
+def extract_by_measure(content):
+    return dict([(name, extract_measure(content, label, name, valueType)) \
+                 for pattern, types in extractor.patterns[:-1] \
+                 for name, valueType in types.items() \
+                 for label in [pattern[:pattern.index('\\s+:')]]])
+
+if __name__ == '__main__':
+    nIterations = 10000
+    if len(sys.argv) > 1:
+        nIterations = int(sys.argv[1])
+    content = ''.join(['%6d  %.7E  %.7E  %4d\n' % (i, 1.0/(i + 1), 0.5, i) \
+                       for i in range(nIterations)]) + report
+    print 'Output of', len(content), 'bytes'
+    for name, function in [('one pass', extractor.parse),
+                           ('one call by measure', extract_by_measure)]:
+        t = time.time()
+        function(content)
+        print '%-20s %10.2f' % (name, 1000*(time.time() - t))
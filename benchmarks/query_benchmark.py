@@ -0,0 +1,42 @@
+'''
+
+Micro-benchmark of the selection of CUTEr problems by a query on a
+synthetic collection of the size of CUTEr. The indexed selection of the
+collection is compared with the matching of the problems one by one. Run
+it from the top of the source tree:
+
+  shell$ python benchmarks/query_benchmark.py [number of problems]
+
+The time of each selection is given in microseconds.
+'''
+import sys
+import timeit
+
+setup = '''
+from opal.TestProblemCollections.test_collections import create_collection
+from opal.TestProblemCollections.cuterfactory import CUTErQuery
+from opal.core.testproblem import ProblemCollection
+collection = create_collection(%d)
+query = CUTErQuery(%s)
+collection.select(query) # Build the index
+'''
+
+queries = [('all problems', ''),
+           ('unconstrained', "constraintType='U'"),
+           ('small quadratic', "objectiveType='Q', nMax=10"),
+           ('name pattern', "namePattern='HS'")]
+
+if __name__ == '__main__':
+    nProblems = 1000
+    if len(sys.argv) > 1:
+        nProblems = int(sys.argv[1])
+    print 'Selection among', nProblems, 'problems    indexed   one by one'
+    for name, arguments in queries:
+        times = []
+        for statement in ['collection.select(query)',
+                          'ProblemCollection.select(collection, query)']:
+            timer = timeit.Timer(statement, setup % (nProblems, arguments))
+            number = 100
+            best = min(timer.repeat(repeat=3, number=number))
+            times.append(1.0e6*best/number)
+        print '%-30s %10.1f %12.1f' % (name, times[0], times[1])
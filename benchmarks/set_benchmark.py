@@ -0,0 +1,42 @@
+'''
+
+Micro-benchmark of the operations of `opal.core.set.Set` on a problem set of
+the size of the CUTEr collection. Run it from the top of the source tree:
+
+  shell$ python benchmarks/set_benchmark.py [number of problems]
+
+The time of each operation is given in microseconds.
+'''
+import sys
+import timeit
+
+setup = '''
+from opal.core.testproblem import TestProblem
+from opal.core.testproblem import ProblemSet
+problems = [TestProblem(name='PROB' + str(i)) for i in range(%d)]
+collection = ProblemSet(name='collection')
+for prob in problems:
+    collection.add_problem(prob)
+middle = problems[len(problems)/2]
+'''
+
+statements = [('contains (identity)', "'PROB1' in collection"),
+              ('contains (element)', 'middle in collection'),
+              ('contains (missing)', "'MISSING' in collection"),
+              ('get by identity', "collection['PROB1']"),
+              ('get by position', 'collection[len(collection) - 1]'),
+              ('iterate', 'for prob in collection: pass'),
+              ('append existing', 'collection.append(middle)'),
+              ('remove and append', 'collection.remove(middle); ' + \
+                                    'collection.append(middle)')]
+
+if __name__ == '__main__':
+    nProblems = 1000
+    if len(sys.argv) > 1:
+        nProblems = int(sys.argv[1])
+    print 'Set operations on', nProblems, 'problems'
+    for name, statement in statements:
+        timer = timeit.Timer(statement, setup % nProblems)
+        number = 1000
+        best = min(timer.repeat(repeat=3, number=number))
+        print '%-20s %10.3f' % (name, 1.0e6*best/number)
@@ -0,0 +1,132 @@
+'''
+
+Startup benchmark of the blackbox executable that NOMAD runs at each
+evaluation. The script does what the generated `blackbox.py` does and
+reports the time taken by the import of each module, by the loading of the
+model and by the evaluation. Run it from the top of the source tree:
+
+  shell$ python benchmarks/startup_benchmark.py [blackbox.dat point-file]
+
+Without argument, only the imports are timed. With the model file written by
+`NOMADSolver.generate_blackbox_executable` and a file holding the coordinates
+of a point, as given to the blackbox by NOMAD, the point is evaluated and the
+time to the first evaluation is reported. The times are given in
+milliseconds. The interpreter must be a fresh one: a module that is
+already imported is not timed. The source tree, i.e. the parent directory of
+this script, is put at the head of the module search path.
+'''
+import os
+import sys
+import time
+import __builtin__
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+startTime = time.time()
+
+
+class ImportTimer:
+    """
+
+    Time the import statements by replacing the built-in `__import__`. A
+    module is charged with the time of the statement that loaded it
+    (inclusive time) and with this time minus that of the nested imports
+    (self time).
+    """
+    def __init__(self):
+        self.times = {}
+        self.order = []
+        self.nested = [0.0]
+        self.overhead = 0.0 # Time spent by the timer itself
+        self.original_import = None
+        return
+
+    def install(self):
+        self.original_import = __builtin__.__import__
+        __builtin__.__import__ = self.timed_import
+        return
+
+    def uninstall(self):
+        __builtin__.__import__ = self.original_import
+        return
+
+    def timed_import(self, *args, **kwargs):
+        t = time.time()
+        before = set(sys.modules)
+        self.nested.append(0.0)
+        self.overhead = self.overhead + time.time() - t
+        overhead = self.overhead
+        t = time.time()
+        try:
+            return self.original_import(*args, **kwargs)
+        finally:
+            elapsed = time.time() - t
+            t = time.time()
+            # The bookkeeping of the nested imports is not charged
+            elapsed = elapsed - (self.overhead - overhead)
+            nestedTime = self.nested.pop()
+            self.nested[-1] = self.nested[-1] + elapsed
+            if len(sys.modules) > len(before):
+                # The modules loaded by the nested imports are already
+                # charged, what remains is loaded by this statement
+                loaded = [name for name in sys.modules \
+                          if (name not in before) and \
+                          (name not in self.times) and \
+                          (sys.modules[name] is not None)]
+                if len(loaded) > 0:
+                    name = max(loaded, key=len)
+                    self.times[name] = (elapsed, elapsed - nestedTime)
+                    self.order.append(name)
+            self.overhead = self.overhead + time.time() - t
+
+    def report(self, limit=20):
+        print '%-45s %10s %10s' % ('module', 'inclusive', 'self')
+        ranking = sorted(self.order, key=lambda name: -self.times[name][0])
+        for name in ranking[:limit]:
+            inclusive, own = self.times[name]
+            print '%-45s %10.2f %10.2f' % (name, 1000*inclusive, 1000*own)
+        total = sum([own for inclusive, own in self.times.values()])
+        print '%-45s %10.2f' % (str(len(self.order)) + ' modules', 1000*total)
+        return
+
+
+def time_phase(label, function, *args, **kwargs):
+    t = time.time()
+    result = function(*args, **kwargs)
+    print '%-45s %10.2f' % (label, 1000*(time.time() - t))
+    return result
+
+
+if __name__ == '__main__':
+    timer = ImportTimer()
+    timer.install()
+    t = time.time()
+    # The imports of the generated blackbox executable
+    from opal.Solvers.nomad import NOMADBlackbox
+    from opal.core.modelevaluator import ModelEvaluator
+    importTime = time.time() - t
+    timer.report()
+    print
+    print '%-45s %10.2f' % ('imports', 1000*importTime)
+    if len(sys.argv) > 2:
+        import StringIO
+        output = StringIO.StringIO()
+        worker = time_phase('model loading', ModelEvaluator,
+                            name='model evaluator', modelFile=sys.argv[1])
+        env = time_phase('environment creation', NOMADBlackbox,
+                         name='blackbox', worker=worker,
+                         input=sys.argv[2], output=output)
+        env.start()
+        time_phase('evaluation', env.join)
+        print '%-45s %10.2f' % ('time to first evaluation',
+                                1000*(time.time() - startTime))
+        print 'blackbox output:', ' '.join(output.getvalue().split())
+    timer.uninstall()
+    platforms = [name for name in sys.modules \
+                 if name.startswith('opal.Platforms.') and \
+                 (sys.modules[name] is not None)]
+    print 'platform modules loaded:', ', '.join(sorted(platforms))
+    solvers = [name for name in sys.modules \
+               if name.startswith('opal.Solvers.') and \
+               (sys.modules[name] is not None)]
+    print 'solver modules loaded:', ', '.join(sorted(solvers))
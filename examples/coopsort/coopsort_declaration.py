@@ -25,6 +25,8 @@ coopsort.add_param(Parameter(name='nothing',
                              default=0,
                              description='To avoid a bug in NOMAD'))
 
+# The sorting time is noisy, the runs are repeated as needed.
 coopsort.add_measure(Measure(name='TIME',
                              kind='real',
+                             noisy=True,
                              description='Computing time'))
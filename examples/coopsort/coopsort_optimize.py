@@ -75,13 +75,17 @@ listLengthStep = 25
 for listType in listTypes:
     for k in range(numberOfList):
         n = listLengthStep * (k + 1)
-        probName = str(listType) + '-' + str(n) + '-50'
+        probName = str(listType) + '-' + str(n)
         problems.append(TestProblem(name=probName))
 
 #SMP.set_parameter(name='MAX_PROC', value=5);
 
 # Define parameter optimization problem.
-data = ModelData(algorithm=coopsort, problems=problems)
+# Each run is repeated until the mean sorting time is known within 5%.
+data = ModelData(algorithm=coopsort, problems=problems,
+                 min_repetitions=3,
+                 max_repetitions=50,
+                 precision=0.05)
 
 struct = ModelStructure(objective=MeasureFunction(sum_time),
                         constraints=[],  # Unconstrained
@@ -4,33 +4,14 @@ import pickle
 import re
 import tempfile
 import shutil
+import subprocess
 from string import atof
 from string import atoi
 from opal.core.io import *
+from opal.core.tools import MeasureExtractor
 
 
 
-def extract_measure(content, description, name,
-                    valueType = 'int',dem='\s+:\s+'):
-    numberPattern = {'int':'-?\d+',
-                     'real':'-?\d*\.\d+',
-                     'float':'-?\d*\.\d+E(\+|-)\d+'}
-    converters = {'int':int,
-                  'real': float,
-                  'float': float}
-
-    matches = re.finditer(description + dem + '(?P<' +
-                          name + '>' +
-                          numberPattern[valueType] + ')',
-                          content)
-    value = None
-    for m in matches:
-        if name not in m.groupdict().keys():
-            raise Exception('Could not to extract measure ' + name)
-            continue
-        value = converters[valueType](m.groupdict()[name])
-    return value
-
 def write_specfile(parameter_file, loc='.', name='ipopt.opt'):
     # Read parameters into a dictionary
     #parms = read_params_from_file(parameter_file)
@@ -47,96 +28,35 @@ def write_specfile(parameter_file, loc='.', name='ipopt.opt'):
     f.close()
     return
 
-def get_measures(stats_file, weight=1.0):
-
-    measures = {}
-    f  = open(stats_file)
-    content = f.read()
-    f.close()
-    #print content
-    measures['CPU'] = extract_measure(
-        content=content,
-        description='OverallAlgorithm',
-        dem='\.*:\s+',
-        name='CPU',
-        valueType='real')
-    measures['HTIME'] = extract_measure(
-        content=content,
-        description=' UpdateHessian',
-        dem='\.*:\s+',
-        name='HTIME',
-        valueType='real')
-    measures['DIRTIME'] = extract_measure(
-        content=content,
-        description=' ComputeSearchDirection',
-        dem='\.*:\s+',
-        name='DIRTIME',
-        valueType='real')
-    measures['PTRTIME'] = extract_measure(
-        content=content,
-        description=' ComputeAcceptableTrialPoint',
-        dem='\.*:\s+',
-        name='PTRTIME',
-        valueType='real')
-    measures['FTIME'] = extract_measure(
-        content=content,
-        description='Function Evaluations',
-        dem='\.*:\s+',
-        name='FTIME',
-        valueType='real')
-    measures['NITER'] = extract_measure(
-        content=content,
-        description='Number of Iterations',
-        dem='\.+:\s+',
-        name='NITER',
-        valueType='int')
-  
-    measures['FEVAL'] = extract_measure(
-        content=content,
-        description='Number of objective function evaluations',
-        dem='\s*=\s+',
-        name='FEVAL',
-        valueType='int')
-    measures['GEVAL'] = extract_measure(
-        content=content,
-        description='Number of objective gradient evaluations',
-        dem='\s*=\s+',
-        name='GEVAL',
-        valueType='int')
-    measures['EQCVAL'] = extract_measure(
-        content=content,
-        description='Number of equality constraint evaluations',
-        dem='\s*=\s+',
-        name='EQCVAL',
-        valueType='int')
-    measures['INCVAL'] = extract_measure(
-        content=content,
-        description='Number of inequality constraint evaluations',
-        dem='\s*=\s+',
-        name='INCVAL',
-        valueType='int')
-    measures['EQJVAL'] = extract_measure(
-        content=content,
-        description='Number of equality constraint Jacobian evaluations',
-        dem='\s*=\s+',
-        name='EQJVAL',
-        valueType='int')
-    measures['INJVAL'] = extract_measure(
-        content=content,
-        description='Number of inequality constraint Jacobian evaluations',
-        dem='\s*=\s+',
-        name='INJVAL',
-        valueType='int')
-    measures['ECODE'] = extract_measure(
-        content=content,
-        description='Exit code',
-        dem='\s*=\s+',
-        name='ECODE',
-        valueType='int')
+# The measures written by IPOPT, extracted in one pass over its output
+extractor = MeasureExtractor(
+    [('OverallAlgorithm', 'CPU', 'real', '\.*:[ \t]+'),
+     (' UpdateHessian', 'HTIME', 'real', '\.*:[ \t]+'),
+     (' ComputeSearchDirection', 'DIRTIME', 'real', '\.*:[ \t]+'),
+     (' ComputeAcceptableTrialPoint', 'PTRTIME', 'real', '\.*:[ \t]+'),
+     ('Function Evaluations', 'FTIME', 'real', '\.*:[ \t]+'),
+     ('Number of Iterations', 'NITER', 'int', '\.+:[ \t]+'),
+     ('Number of objective function evaluations', 'FEVAL', 'int'),
+     ('Number of objective gradient evaluations', 'GEVAL', 'int'),
+     ('Number of equality constraint evaluations', 'EQCVAL', 'int'),
+     ('Number of inequality constraint evaluations', 'INCVAL', 'int'),
+     ('Number of equality constraint Jacobian evaluations', 'EQJVAL', 'int'),
+     ('Number of inequality constraint Jacobian evaluations', 'INJVAL',
+      'int'),
+     ('Exit code', 'ECODE', 'int')],
+    separator='[ \t]*=[ \t]+')
 
+def read_measures(stream, weight=1.0):
+    measures = extractor.parse(stream)
     measures['WEIGHT'] = weight
     return measures
 
+def get_measures(stats_file, weight=1.0):
+    f = open(stats_file)
+    measures = read_measures(f, weight=weight)
+    f.close()
+    return measures
+
 
 def run(param_file, problem, keep=False):
     curDir = os.getcwd()
@@ -150,8 +70,11 @@ def run(param_file, problem, keep=False):
     os.chdir(workDir)
     write_specfile(param_file)
     os.system('sifdecode ' + problem + ' > /dev/null')
-    os.system('runcuter -p ipopt > ' + problem + '.sol')
-    measures = get_measures(problem + '.sol')
+    # The measures are read from the output of IPOPT as it runs
+    proc = subprocess.Popen(['runcuter', '-p', 'ipopt'],
+                            stdout=subprocess.PIPE)
+    measures = read_measures(proc.stdout)
+    proc.wait()
     os.chdir(curDir)
     if not keep:
         shutil.rmtree(workDir)
@@ -0,0 +1,12 @@
+# Evaluate the TRUNK problem at the points of a Latin hypercube without any
+# solver. All of the tests run concurrently on SMP and the results are
+# written to trunk-design.csv, one column by parameter, model value and
+# measure of each problem.
+from trunk_optimize import prob
+
+if __name__ == '__main__':
+    from opal.core.design import evaluate_design
+    table = evaluate_design(prob, design='lhs', nPoints=50,
+                            resultStore='trunk.results',
+                            tableFile='trunk-design.csv')
+    print len(table), 'points evaluated'
@@ -0,0 +1,44 @@
+# Define a parameter optimization problem in relation to the TRUNK solver.
+# NOMAD is given a surrogate learned from the evaluation history of the
+# model instead of a model on fewer test problems.
+from trunk_declaration import trunk
+from opal import ModelStructure, ModelData, Model
+from opal.Solvers import NOMAD
+from opal.TestProblemCollections import CUTEr
+from opal.core.surrogate import RBFSurrogate
+
+def sum_heval(parameters, measures):
+    val = sum(measures["HEVAL"])
+    return val
+
+def get_error(parameters,measures):
+    val = sum(measures['ECODE'])
+    return val
+
+# Parameters being tuned and problem list.
+par_names = ['eta1', 'eta2', 'gamma1', 'gamma2', 'gamma3']
+params = [param for param in trunk.parameters if param.name in par_names]
+
+problems = [problem for problem in CUTEr if problem.name in ['BDQRTIC',
+                                                             'BROYDN7D',
+                                                             'BRYBND',
+                                                             'HIELOW',
+                                                             'POWER',
+                                                             'SENSORS',
+                                                             'SINQUAD',
+                                                             'TESTQUAD',
+                                                             'TRIDIA',
+                                                             'WOODS']]
+
+# Define parameter optimization problem.
+data = ModelData(algorithm=trunk,
+                 problems=problems,
+                 parameters=params)
+struct = ModelStructure(objective=sum_heval,
+                        constraints=[(None,get_error, 0)])
+model = Model(modelData=data, modelStructure=struct)
+
+# Solve parameter optimization problem. The surrogate is fitted again to
+# the evaluations recorded in blackbox.hist each time NOMAD calls it.
+NOMAD.set_parameter(name='MAX_BB_EVAL', value=10)
+NOMAD.solve(blackbox=model, surrogate=RBFSurrogate())
@@ -48,10 +48,14 @@ LSF.set_config(parameterName="-m",
                parameterValue='"lin01 lin02 lin03 lin04"')
 LSF.set_config(parameterName="-q",
                parameterValue="fedora")
+# The results of the tests are stored in trunk.results. If the campaign
+# dies, running this script again replays them instead of running the
+# tests again.
 data = ModelData(algorithm=trunk,
                  problems=problems,
                  parameters=params,
-                 platform=LSF)
+                 platform=LSF,
+                 result_store='trunk.results')
 struct = ModelStructure(objective=get_error,
                         constraints=[])  # Unconstrained
 blackbox = Model(modelData=data, modelStructure=struct)
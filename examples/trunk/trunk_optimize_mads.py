@@ -0,0 +1,9 @@
+# Define a parameter optimization problem in relation to the TRUNK solver.
+# The problem is solved by the MADS solver of OPAL, which needs no NOMAD
+# installation. The tests of the points of a poll run concurrently on SMP.
+from trunk_optimize import prob
+
+if __name__ == '__main__':
+    from opal.Solvers import MADS
+    MADS.set_parameter(name='MAX_BB_EVAL', value=100)
+    print MADS.solve(blackbox=prob)
@@ -1,9 +1,11 @@
 # Define a parameter optimization problem in relation to the TRUNK solver.
 # This is the sequential version.
+import os
 from trunk_declaration import trunk
 from opal import ModelStructure, ModelData, Model
 from opal.Solvers import NOMAD
 from opal.TestProblemCollections import CUTEr
+from opal.core.problemselection import create_surrogate_data
 
 def sum_heval(parameters, measures):
     val = sum(measures["HEVAL"])
@@ -47,18 +49,25 @@ data = ModelData(algorithm=trunk,
                  parameters=params)
 struct = ModelStructure(objective=sum_heval,
                         constraints=[(None,get_error, 0)])
-model = Model(modelData=data, modelStructure=struct)
+# The evaluations are recorded in blackbox.hist for the next run.
+model = Model(modelData=data, modelStructure=struct, history=True)
 
-# Define a surrogate
+# Define a surrogate. If a previous run left an evaluation history, the
+# surrogate problems are the cheapest subset that ranks the points like the
+# full problem list. Otherwise, they are picked by hand.
 
-surr_data = ModelData(algorithm=trunk,
-                      problems= [problem for problem in CUTEr \
-                                     if problem.name in ['BDQRTIC',
-                                                         'BROYDN7D',
-                                                         'BRYBND']],
-                      parameters=params)
 surr_struct = ModelStructure(objective=sum_heval,
                              constraints=[])
+if os.path.exists('blackbox.hist'):
+    surr_data = create_surrogate_data(data, surr_struct, 'blackbox.hist',
+                                      costMeasure='CPU')
+else:
+    surr_data = ModelData(algorithm=trunk,
+                          problems= [problem for problem in CUTEr \
+                                         if problem.name in ['BDQRTIC',
+                                                             'BROYDN7D',
+                                                             'BRYBND']],
+                          parameters=params)
 surr_model = Model(modelData=surr_data, modelStructure=surr_struct,
                            dataFile='surrogate.dat')
 
@@ -6,66 +6,41 @@ import tempfile
 import os
 import sys
 import shutil
+import subprocess
 import re
 
 src = 'trunk.src'
 
-def get_measures(stats_file):
+# The measures written by trunk, extracted in one pass over its output
+extractor = MeasureExtractor(
+    [('user', 'CPU', 'real'),
+     ('\#iterations\.*', 'NITER', 'int'),
+     ('CG iterations\.*', 'CGITER', 'int'),
+     ('Function evals\.*', 'FEVAL', 'int'),
+     ('Gradient evals\.*', 'GEVAL', 'int'),
+     ('Hessian-vector products\.*', 'HEVAL', 'int'),
+     ('Gradient 2-norm\.*', 'GNORM', 'float'),
+     ('Relative decrease in gradient\.*', 'RDGRAD', 'float'),
+     ('Final Trust-Region radius\.*', 'DELTA', 'float'),
+     ('Exit code\.*', 'ECODE', 'int')])
+extractor.add_pattern('objective value\.*[ \t]:[ \t]+' + \
+                      '(?P<FVAL0>-?\d*\.\d+E[+-]\d+)/[ \t]+' + \
+                      '(?P<FVAL>-?\d*\.\d+E[+-]\d+)',
+                      {'FVAL0': 'float', 'FVAL': 'float'})
+
+def read_measures(stream):
+    measures = extractor.parse(stream)
+    # The objective values are given only if they are found
+    for name in ['FVAL0', 'FVAL']:
+        if measures[name] is None:
+            del measures[name]
+    return measures
 
-    measures = {}
-    f  = open(stats_file)
-    content = f.read()
+
+def get_measures(stats_file):
+    f = open(stats_file)
+    measures = read_measures(f)
     f.close()
-    measures['CPU'] = extract_measure(content=content,
-                                      description='user',
-                                      name='CPU',
-                                      valueType='real')
-    measures['NITER'] = extract_measure(content=content,
-                                        description='\#iterations\.*',
-                                        name='NITER',
-                                        valueType='int')
-    measures['CGITER'] = extract_measure(content=content,
-                                         description='CG iterations\.*',
-                                         name='CGITER',
-                                         valueType='int')
-    measures['FEVAL'] = extract_measure(content=content,
-                                        description='Function evals\.*',
-                                        name='FEVAL',
-                                        valueType='int')
-    measures['GEVAL'] = extract_measure(content=content,
-                                        description='Gradient evals\.*',
-                                        name='GEVAL',
-                                        valueType='int')
-    measures['HEVAL'] = extract_measure(
-                            content=content,
-                            description='Hessian-vector products\.*',
-                            name='HEVAL',
-                            valueType='int')
-    measures['GNORM'] = extract_measure(content=content,
-                                        description='Gradient 2-norm\.*',
-                                        name='GNORM',
-                                        valueType='float')
-    measures['RDGRAD'] = extract_measure(
-                            content=content,
-                            description='Relative decrease in gradient\.*',
-                            name='RDGRAD',
-                            valueType='float')
-    measures['DELTA'] = extract_measure(
-                            content=content,
-                            description='Final Trust-Region radius\.*',
-                            name='DELTA',
-                            valueType='float')
-    measures['ECODE'] = extract_measure(content=content,
-                                        description='Exit code\.*',
-                                        name='ECODE',
-                                        valueType='int')
-    match = re.search('objective value\.*\s:\s+' + \
-                          '(?P<FVAL0>-?\d*\.\d+E(\+|-)\d+)/\s+' + \
-                          '(?P<FVAL>-?\d*\.\d+E(\+|-)\d+)',
-                      content)
-    if match is not None:
-        measures['FVAL0'] = float(match.groupdict()['FVAL0'])
-        measures['FVAL'] = float(match.groupdict()['FVAL'])
     return measures
 
 
@@ -122,8 +97,10 @@ def run(param_file, problem):
     write_specfile(param_file)
     os.system('sifdecode ' + problem + ' > /dev/null')
     os.system('make trunkd > /dev/null')
-    os.system('./trunkd > ' + problem + '.sol')
-    measures = get_measures(problem + '.sol')
+    # The measures are read from the output of trunk as it runs
+    proc = subprocess.Popen(['./trunkd'], stdout=subprocess.PIPE)
+    measures = read_measures(proc.stdout)
+    proc.wait()
     os.chdir(curDir)
     shutil.rmtree(workDir)
     return measures
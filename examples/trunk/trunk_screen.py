@@ -0,0 +1,13 @@
+# Screen the parameters of the TRUNK problem before tuning them. The
+# parameters with a small elementary effect on the objective function are
+# fixed and only the important ones are tuned by MADS.
+from trunk_optimize import prob
+
+if __name__ == '__main__':
+    from opal.core.screening import screen_model
+    from opal.Solvers import MADS
+    reduced, ranking = screen_model(prob, nTrajectories=10)
+    for name, muStar, sigma in ranking:
+        print name, muStar, sigma
+    MADS.set_parameter(name='MAX_BB_EVAL', value=100)
+    print MADS.solve(blackbox=reduced)
@@ -1,10 +1,86 @@
-from lsf import LSF
-from linux import LINUX
-from mpi import OPALMPI
-from smp import SMP
-from sungrid import SunGrid
-
-supported_platforms = {'LINUX': LINUX,
-                       'LSF': LSF,
-                       'SMP': SMP,
-                       'SunGrid': SunGrid}
+'''
+
+The platforms supported by OPAL. Each platform object is created by its
+module, which is imported only when the platform is first asked for, as
+`opal.Platforms.SMP`, by `from opal.Platforms import SMP`, by
+`get_platform('SMP')` or through `supported_platforms`. A program, like the
+blackbox executable run by NOMAD at each evaluation, thus loads only the
+platform that it works with.
+'''
+import sys
+import types
+import importlib
+
+# Name of the platform object -> module that creates it
+platform_modules = {'LINUX': 'linux',
+                    'LSF': 'lsf',
+                    'SMP': 'smp',
+                    'OPALMPI': 'mpi',
+                    'SunGrid': 'sungrid'}
+
+def get_platform(name):
+    '''
+
+    Return the platform object of the given name, importing its module at the
+    first call
+    '''
+    if name not in platform_modules:
+        raise KeyError, 'Unsupported platform: ' + str(name)
+    module = importlib.import_module('.' + platform_modules[name], __name__)
+    return getattr(module, name)
+
+
+class PlatformRegistry:
+    """
+
+    A read-only mapping from the platform names to the platform objects
+    that imports a platform only when it is looked up
+    """
+    def __init__(self, modules):
+        self.modules = modules
+        return
+
+    def __contains__(self, name):
+        return name in self.modules
+
+    def __getitem__(self, name):
+        return get_platform(name)
+
+    def __iter__(self):
+        return iter(self.modules)
+
+    def __len__(self):
+        return len(self.modules)
+
+    def keys(self):
+        return self.modules.keys()
+
+    def get(self, name, default=None):
+        if name not in self.modules:
+            return default
+        return get_platform(name)
+
+supported_platforms = PlatformRegistry(platform_modules)
+
+
+class PlatformPackage(types.ModuleType):
+    """
+
+    The module object of this package. Python 2 has no module level
+    __getattr__, so the package module is replaced in `sys.modules` by an
+    instance of this class that imports the platforms on attribute access.
+    """
+    def __getattr__(self, name):
+        if name in platform_modules:
+            return get_platform(name)
+        raise AttributeError, name
+
+    def __dir__(self):
+        return sorted(self.__dict__.keys() + platform_modules.keys())
+
+package = PlatformPackage(__name__, __doc__)
+package.__dict__.update(sys.modules[__name__].__dict__)
+# The original module is kept alive: its dictionary holds the globals of the
+# functions above and would be cleared when the module is released
+package.original_module = sys.modules[__name__]
+sys.modules[__name__] = package
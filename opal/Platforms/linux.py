@@ -1,5 +1,6 @@
 import socket
 import os
+import subprocess
 
 from ..core.platform import Platform
 from ..core.platform import Task
@@ -10,22 +11,42 @@ class LINUXTask(Task):
                  command=None,
                  sessionTag=None,
                  output='/dev/null',
+                 extractor=None,
+                 streamMeasures=False,
                  logHandlers=[]):
         Task.__init__(self,
                       name=name,
                       command=command,
                       sessionTag=sessionTag,
                       output=output,
+                      extractor=extractor,
+                      streamMeasures=streamMeasures,
                       logHandlers=logHandlers)
+        self.proc = None
         return
 
     def run(self):
         # Execute the command
-        os.system(self.command + ' > ' + self.output)
+        if self.extractor is None:
+            os.system(self.command + ' > ' + self.output)
+        else:
+            # The measures are extracted from the output as it comes
+            self.proc = subprocess.Popen(args=self.command, shell=True,
+                                         stdout=subprocess.PIPE)
+            if self.stopped: # The stop has come before the start
+                self.proc.terminate()
+            self.capture_output(self.proc.stdout)
+            self.proc.wait()
         # Inform the fininish
         Task.run(self)
         return
 
+    def stop(self):
+        Task.stop(self)
+        if (self.proc is not None) and (self.proc.poll() is None):
+            self.proc.terminate()
+        return
+
 class LINUXPlatform(Platform):
     def __init__(self, logHandlers=[]):
         Platform.__init__(self, name='LINUX',
@@ -54,7 +75,10 @@ class LINUXPlatform(Platform):
         queueTag = proposition['queue']
         task = LINUXTask(name=name,
                          command=command,
-                         sessionTag=proposition['tag'])
+                         sessionTag=proposition['tag'],
+                         extractor=proposition.get('extractor', None),
+                         streamMeasures=proposition.get('stream-measures',
+                                                        False))
         self.submit(task, queue=queueTag)
         return 
 
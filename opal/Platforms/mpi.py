@@ -1,72 +1,325 @@
-
 import os
-import time
+import sys
 
 from ..core.platform import Platform
-from ..core import log
+from ..core.platform import Task
+from smp import CoreAllocator
+from smp import pin_command
+from smp import get_pinning_tool
+from smp import is_tool_available
+
+# Tags of the MPI messages exchanged between the platform (master) and
+# its workers
+WORK_TAG = 1
+RESULT_TAG = 2
+STOP_TAG = 3
+
+
+def execute_work(work):
+    '''
+
+    Carry out a work unit received by a worker. A work unit is either a shell
+    command or an in-process callable with its arguments. The callable has to
+    be picklable, i.e. a function defined at the top level of a module.
+    '''
+    if work['function'] is not None:
+        return work['function'](*work['args'])
+    return os.system(pin_command(work['command'], cores=work['cores']) + \
+                     ' > ' + work['output'])
+
+
+def serve(communicator, master=0):
+    '''
+
+    The life time of a worker: receive the work units from the master,
+    execute them and report the completions until a stop signal arrives.
+    '''
+    from mpi4py import MPI
+    status = MPI.Status()
+    while True:
+        work = communicator.recv(source=master, tag=MPI.ANY_TAG, status=status)
+        if status.Get_tag() == STOP_TAG:
+            break
+        try:
+            result = execute_work(work)
+            how = 'no-error'
+        except Exception, e:
+            result = str(e)
+            how = 'error'
+        communicator.send({'name':work['name'],
+                           'how':how,
+                           'result':result},
+                          dest=master,
+                          tag=RESULT_TAG)
+    return
+
+
+class MPITask(Task):
+    """
+
+    A task of the MPI platform is not executed by the platform process. It
+    is shipped to a worker process that runs either the command or the
+    in-process callable. The platform calls `finish` when the worker reports
+    the completion, with the result and the status of the work ('no-error'
+    or 'error').
+    """
+    def __init__(self,
+                 name=None,
+                 command=None,
+                 function=None,
+                 args=(),
+                 sessionTag=None,
+                 output='/dev/null',
+                 logHandlers=[]):
+        Task.__init__(self,
+                      name=name,
+                      command=command,
+                      sessionTag=sessionTag,
+                      output=output,
+                      logHandlers=logHandlers)
+        self.function = function
+        self.args = args
+        self.rank = None # Rank of the worker that executes the task
+        self.result = None
+        self.how = None
+        return
+
+    def get_work(self, cores=None):
+        return {'name':self.name,
+                'command':self.command,
+                'function':self.function,
+                'args':self.args,
+                'output':self.output,
+                'cores':cores}
+
+    def finish(self, result=None, how='no-error'):
+        self.result = result
+        self.how = how
+        # Inform the finish
+        Task.run(self, how=how)
+        return
+
 
 class MPIPlatform(Platform):
-    def __init__(self,logHandlers=[],**kwargs):
-        Platform.__init__(self,'MPI',**kwargs)
-        #self.communicator = MPI.COMM_WORLD
-        self.children = []
-        self.wrapper_name = ''
+    """
+
+    A platform backed by a pool of MPI worker processes. The workers are
+    started once, when the platform starts its work, and are kept until the
+    platform is stopped.
+
+    The platform works in one of two modes:
+
+    1. If the application is launched by `mpirun -np N`, the process of rank
+       0 hosts the platform and the N - 1 other processes are the workers.
+       Every process has to call `serve_as_worker()` at the beginning of
+       the script.
+
+    2. Otherwise, `WORKERS` worker processes are spawned by
+       `MPI.COMM_SELF.Spawn`.
+
+    The completions are reported asynchronously as `inform-task-finish`
+    messages, just like the other platforms. If the workers can not be
+    started, the platform keeps working but finishes every task with an
+    error.
+
+    If the setting `AFFINITY` is True and the workers share the machine of
+    the platform, the commands of each worker are pinned to a dedicated set
+    of `CORES_PER_TASK` cores. The workers left without cores, and all of
+    them if `taskset` is not installed, run their commands unpinned.
+    """
+    def __init__(self, workers=4, logHandlers=[]):
+        Platform.__init__(self,
+                          name='OPALMPI',
+                          maxTask=workers,
+                          synchronous=False,
+                          logHandlers=logHandlers)
+        self.settings['WORKERS'] = workers
+        self.settings['PYTHON'] = sys.executable
+        self.settings['AFFINITY'] = False
+        self.settings['CORES_PER_TASK'] = 1
         self.configuration = {}
-        self.logger = log.OPALLogger(name='mpiPlatform', handlers=logHandlers)
-        pass
+        self.worker_cores = {}
+        self.communicator = None
+        self.spawned = False
+        self.idle_workers = []
+        self.message_handlers['cfp-execute'] = self.create_task
+        return
 
     def set_config(self, parameterName, parameterValue):
         self.configuration[parameterName] = parameterValue
         return
 
     def initialize(self, testId):
-        self.wrapper_name = 'run_wrapper_' + testId + '.py'
-        if not os.path.exists(self.wrapper_name):
-            self.create_wrapper()
-        self.children = []
-        #self.logger.log('Platform is initialized')
         return
 
-    def execute(self, command, output='/dev/null'):
-        jobId = str(hash(command))
-        # str(ltime.tm_year) +  str(ltime.tm_mon) + str(ltime.tm_mday) + \
-            # str(ltime.tm_hour) + str(ltime.tm_min) + str(ltime.tm_sec)
-        optionStr = " "
-        for param in self.configuration.keys():
-            optionStr = optionStr + param + " " + self.configuration[param] + " "
-        #child = self.communicator.Spawn('python',
-        #                        [self.wrapper_name, command])
+    def serve_as_worker(self):
+        '''
+
+        Turn the calling process into a worker if it is not the master
+        process of an application launched by `mpirun`. Return True once the
+        worker is stopped by the master, so that the script can exit::
+
+            if OPALMPI.serve_as_worker():
+                sys.exit(0)
+        '''
+        from mpi4py import MPI
+        world = MPI.COMM_WORLD
+        if (world.Get_size() > 1) and (world.Get_rank() != 0):
+            serve(world)
+            return True
+        return False
+
+    def start_workers(self):
         from mpi4py import MPI
-        #self.logger.log('Execute command: '+ command)
-        child = MPI.COMM_WORLD.Spawn('python',
-                                     [self.wrapper_name, command])
-        self.children.append(child)
+        world = MPI.COMM_WORLD
+        if world.Get_size() > 1:
+            self.communicator = world
+            self.idle_workers = range(1, world.Get_size())
+            self.spawned = False
+        else:
+            self.communicator = MPI.COMM_SELF.Spawn(
+                self.settings['PYTHON'],
+                args=['-c', 'from opal.Platforms.mpi import serve_parent; ' +\
+                      'serve_parent()'],
+                maxprocs=self.settings['WORKERS'])
+            self.idle_workers = range(self.communicator.Get_remote_size())
+            self.spawned = True
+        self.settings['MAX_TASK'] = len(self.idle_workers)
+        self.worker_cores = {}
+        if self.settings['AFFINITY'] and \
+               not is_tool_available(get_pinning_tool()):
+            self.logger.log('The tasks are not pinned: ' + \
+                            get_pinning_tool() + ' is not found')
+        elif self.settings['AFFINITY']:
+            allocator = CoreAllocator()
+            for rank in self.idle_workers:
+                cores = allocator.allocate(self.settings['CORES_PER_TASK'])
+                if cores is None:
+                    self.logger.log('The tasks of the worker ' + str(rank) + \
+                                    ' are not pinned: no core is free')
+                self.worker_cores[rank] = cores
+        self.logger.log('Started ' + str(len(self.idle_workers)) + ' workers')
+        return
+
+    def stop_workers(self):
+        # Wait for the tasks in execution before releasing the workers
+        while len(self.running) > 0:
+            self.collect_completion(block=True)
+        for rank in self.idle_workers:
+            self.communicator.send(None, dest=rank, tag=STOP_TAG)
+        if self.spawned:
+            self.communicator.Disconnect()
+        self.communicator = None
+        self.idle_workers = []
+        return
+
+    def dispatch(self, task):
+        task.rank = self.idle_workers.pop()
+        self.running[task.name] = task
+        self.communicator.send(task.get_work(self.worker_cores.get(task.rank)),
+                               dest=task.rank,
+                               tag=WORK_TAG)
         return
 
-    def create_wrapper(self):
-        tab = ' '*4
-        f = open(self.wrapper_name,'w')
-        f.write('import sys\n')
-        f.write('import os\n')
-        f.write('from mpi4py import MPI\n')
-        f.write('parent = MPI.COMM_WORLD.Get_parent()\n')
-        f.write('exeCmd = ""\n')
-        f.write('for argv in sys.argv[1:]:\n')
-        f.write(tab + 'exeCmd = exeCmd + argv + " "\n')
-        #f.write('print exeCmd\n')
-        f.write('os.system(exeCmd)\n')
-        f.write('parent.Barrier()\n')
-        f.write('parent.Disconnect()\n')
-        f.close()
-
-
-    def waitForCondition(self,condition):
-        for child in self.children:
-            child.Barrier()
-            child.Disconnect()
-        os.remove(self.wrapper_name)
-        self.children = []
+    def collect_completion(self, block=False):
+        '''
+
+        Get a completion report from the workers, if there is one, and
+        inform the finish of the corresponding task.
+        '''
+        from mpi4py import MPI
+        status = MPI.Status()
+        if not block and \
+               not self.communicator.Iprobe(source=MPI.ANY_SOURCE,
+                                            tag=RESULT_TAG,
+                                            status=status):
+            return False
+        report = self.communicator.recv(source=MPI.ANY_SOURCE,
+                                        tag=RESULT_TAG,
+                                        status=status)
+        self.idle_workers.append(status.Get_source())
+        task = self.running.pop(report['name'])
+        if report['how'] != 'no-error':
+            self.logger.log('Task ' + task.name + ' failed: ' + \
+                            str(report['result']))
+        task.finish(report['result'], how=report['how'])
+        return True
+
+    def fail_queued_tasks(self, why):
+        '''
+
+        Finish the queued tasks with an error, when there is no worker to
+        execute them
+        '''
+        while self.queue_system.get_length() > 0:
+            self.queue_system.pop().finish(why, how='error')
         return
 
+    def run(self):
+        try:
+            self.start_workers()
+            failure = None
+        except Exception, e:
+            failure = 'The workers can not be started: ' + str(e)
+            self.logger.log(failure)
+            self.idle_workers = []
+        while self.working:
+            if failure is not None:
+                self.fail_queued_tasks(failure)
+            while (len(self.idle_workers) > 0) and \
+                      (self.queue_system.get_length() > 0):
+                self.dispatch(self.queue_system.pop())
+            while (failure is None) and self.collect_completion():
+                pass
+            # Work as an agent
+            messages = self.fetch_messages()
+            for msg in messages:
+                self.handle_message(msg)
+            del messages
+        self.stop_workers()
+        return
+
+    # Message handlers
+
+    def finalize_task(self, info):
+        # The running list is updated as soon as the worker reports the
+        # completion
+        return
+
+    def create_task(self, info):
+        '''
+
+        Handle a call for proposal of executing a command
+        '''
+        if 'proposition' not in info.keys():
+            self.logger.log('Proposal of executing a command has not ' + \
+                            'information to process')
+            return
+
+        proposition = info['proposition']
+        if 'queue' in proposition.keys():
+            queueTag = proposition['queue']
+        else:
+            queueTag = None
+        task = MPITask(name=proposition['tag'],
+                       command=proposition.get('command', None),
+                       function=proposition.get('function', None),
+                       args=proposition.get('args', ()),
+                       sessionTag=proposition['tag'])
+        self.submit(task, queue=queueTag)
+        return
+
+
+def serve_parent():
+    '''
+
+    Entry point of the workers spawned by the platform
+    '''
+    from mpi4py import MPI
+    parent = MPI.Comm.Get_parent()
+    serve(parent)
+    parent.Disconnect()
+    return
+
 
 OPALMPI = MPIPlatform()
@@ -4,6 +4,8 @@ import time
 import subprocess
 import threading
 import shlex
+import multiprocessing
+from distutils.spawn import find_executable
 
 from ..core.platform import Platform
 from ..core.platform import Task
@@ -11,6 +13,140 @@ from ..core.platform import Task
 from ..core import log
 
 
+def parse_cpu_list(cpuList):
+    '''
+
+    Convert a CPU list in the format of the kernel, for example "0-3,8", to
+    a list of core numbers.
+    '''
+    cores = []
+    for field in cpuList.strip().split(','):
+        if len(field) == 0:
+            continue
+        if '-' in field:
+            first, last = field.split('-')
+            cores.extend(range(int(first), int(last) + 1))
+        else:
+            cores.append(int(field))
+    return cores
+
+
+def read_allowed_cores():
+    try:
+        f = open('/proc/self/status')
+        for line in f:
+            if line.startswith('Cpus_allowed_list:'):
+                f.close()
+                return parse_cpu_list(line.split(':')[1])
+        f.close()
+    except IOError:
+        pass
+    return range(multiprocessing.cpu_count())
+
+
+def read_node_cores(node):
+    try:
+        f = open('/sys/devices/system/node/node' + str(node) + '/cpulist')
+        cores = parse_cpu_list(f.read())
+        f.close()
+    except IOError:
+        cores = []
+    return cores
+
+
+# Availability of the tools that pin the tasks, by name
+pinning_tools = {}
+
+def get_pinning_tool(node=None):
+    '''
+
+    Return the name of the tool used by `pin_command` to pin a task
+    '''
+    if node is not None:
+        return 'numactl'
+    return 'taskset'
+
+
+def is_tool_available(name):
+    '''
+
+    Return True if the executable `name` is found in the search path. The
+    search is done once by tool.
+    '''
+    if name not in pinning_tools:
+        pinning_tools[name] = find_executable(name) is not None
+    return pinning_tools[name]
+
+
+def pin_command(command, cores=None, node=None):
+    '''
+
+    Prefix a command so that it runs only on the given cores and, if a NUMA
+    node is specified, allocates its memory on this node.
+    '''
+    if cores is not None:
+        coreStr = ','.join([str(core) for core in cores])
+    if node is not None:
+        if cores is None:
+            return 'numactl --cpunodebind=' + str(node) + \
+                   ' --membind=' + str(node) + ' ' + command
+        return 'numactl --physcpubind=' + coreStr + \
+               ' --membind=' + str(node) + ' ' + command
+    if cores is not None:
+        return 'taskset -c ' + coreStr + ' ' + command
+    return command
+
+
+class CoreAllocator:
+    """
+
+    Keep track of the cores that are given to the running tasks so that no
+    two tasks share a core.
+    """
+    def __init__(self, cores=None):
+        if cores is None:
+            cores = read_allowed_cores()
+        self.cores = list(cores)
+        self.free = list(cores)
+        self.node_cores = {}
+        return
+
+    def get_node_cores(self, node):
+        if node not in self.node_cores:
+            self.node_cores[node] = [core for core in read_node_cores(node) \
+                                     if core in self.cores]
+        return self.node_cores[node]
+
+    def get_candidates(self, node=None):
+        if node is None:
+            return self.free
+        nodeCores = self.get_node_cores(node)
+        return [core for core in self.free if core in nodeCores]
+
+    def count(self, node=None):
+        if node is None:
+            return len(self.cores)
+        return len(self.get_node_cores(node))
+
+    def count_free(self, node=None):
+        return len(self.get_candidates(node))
+
+    def allocate(self, nCores=1, node=None):
+        candidates = self.get_candidates(node)
+        if len(candidates) < nCores:
+            return None
+        cores = sorted(candidates)[0:nCores]
+        for core in cores:
+            self.free.remove(core)
+        return cores
+
+    def release(self, cores):
+        for core in cores:
+            if core not in self.free:
+                self.free.append(core)
+        return
+
+
 class SMPTask(Task):
     """
     
@@ -18,39 +154,266 @@ class SMPTask(Task):
     some stubs to communicate with the platform
     
     """
-    def __init__(self, name=None, taskId=None, command=None, sessionTag=None):
+    def __init__(self, name=None, taskId=None, command=None, sessionTag=None,
+                 nCores=1, extractor=None, streamMeasures=False):
         Task.__init__(self,
                       name=name,
                       taskId=taskId,
                       command=command,
-                      sessionTag=sessionTag)
+                      sessionTag=sessionTag,
+                      extractor=extractor,
+                      streamMeasures=streamMeasures)
         self.proc = None
         self.pid = None
+        # The cores and NUMA node are assigned by the platform at launch if
+        # the tasks are pinned
+        self.n_cores = nCores
+        self.cores = None
+        self.numa_node = None
         return
 
     def run(self):
         #cmd = shlex.split(self.command)
         #self.proc = subprocess.Popen(args=cmd)
-        cmd = self.command + '> /dev/null'
-        self.proc = subprocess.Popen(args=cmd, shell=True)
-        self.pid = self.proc.pid
+        cmd = pin_command(self.command,
+                          cores=self.cores,
+                          node=self.numa_node)
+        if self.extractor is None:
+            self.proc = subprocess.Popen(args=cmd + '> /dev/null', shell=True)
+            self.pid = self.proc.pid
+        else:
+            # The measures are extracted from the output as it comes
+            self.proc = subprocess.Popen(args=cmd, shell=True,
+                                         stdout=subprocess.PIPE)
+            self.pid = self.proc.pid
+            if self.stopped: # The stop has come before the start
+                self.proc.terminate()
+            self.capture_output(self.proc.stdout)
         if self.proc.poll() is None: # check if child process is still running
             self.proc.wait() # wait until the child process finish
         # Inform the task is finished
         Task.run(self)
         return
 
+    def stop(self):
+        Task.stop(self)
+        if (self.proc is not None) and (self.proc.poll() is None):
+            self.proc.terminate()
+        return
+
+class SystemMonitor:
+    """
+
+    Sample the state of the machine from the /proc file system: the CPU
+    usage since the previous sample, the load average, the fraction of
+    available memory and the number of pages swapped out since the previous
+    sample.
+    """
+    def __init__(self, procDir='/proc'):
+        self.proc_dir = procDir
+        self.last_cpu_times = None
+        self.last_swap_out = None
+        return
+
+    def read_cpu_times(self):
+        f = open(os.path.join(self.proc_dir, 'stat'))
+        fields = f.readline().split()
+        f.close()
+        times = [int(field) for field in fields[1:]]
+        # The idle time includes the time waiting for I/O
+        return sum(times), times[3] + times[4]
+
+    def read_load(self):
+        f = open(os.path.join(self.proc_dir, 'loadavg'))
+        load = float(f.readline().split()[0])
+        f.close()
+        return load
+
+    def read_free_memory(self):
+        memory = {}
+        f = open(os.path.join(self.proc_dir, 'meminfo'))
+        for line in f:
+            fields = line.split()
+            memory[fields[0].strip(':')] = int(fields[1])
+        f.close()
+        if 'MemAvailable' in memory:
+            available = memory['MemAvailable']
+        else: # Older kernels
+            available = memory['MemFree'] + memory['Buffers'] + \
+                        memory['Cached']
+        return float(available) / memory['MemTotal']
+
+    def read_swap_out(self):
+        f = open(os.path.join(self.proc_dir, 'vmstat'))
+        for line in f:
+            fields = line.split()
+            if fields[0] == 'pswpout':
+                f.close()
+                return int(fields[1])
+        f.close()
+        return 0
+
+    def sample(self):
+        '''
+
+        Return a dictionary describing the machine state or None if the
+        /proc file system could not be read.
+        '''
+        try:
+            total, idle = self.read_cpu_times()
+            swapOut = self.read_swap_out()
+            state = {'load':self.read_load(),
+                     'free-memory':self.read_free_memory(),
+                     'cpu-usage':0.0,
+                     'swap-out':0}
+        except (IOError, OSError, IndexError, KeyError, ValueError):
+            return None
+        if self.last_cpu_times is not None:
+            deltaTotal = total - self.last_cpu_times[0]
+            deltaIdle = idle - self.last_cpu_times[1]
+            if deltaTotal > 0:
+                state['cpu-usage'] = 1.0 - float(deltaIdle) / deltaTotal
+            state['swap-out'] = swapOut - self.last_swap_out
+        self.last_cpu_times = (total, idle)
+        self.last_swap_out = swapOut
+        return state
+
+
 class SMPPlatform(Platform):
-    def __init__(self, maxTask=2, logHandlers=[]):
+    """
+
+    A platform that runs the tasks as child processes of the local machine.
+
+    The number of concurrent tasks is given by `MAX_TASK`. In adaptive mode
+    (setting `ADAPTIVE`), this number is revised every `ADAPTING_INTERVAL`
+    seconds from the machine state read from /proc: it is increased while
+    the platform is saturated and the CPUs are not fully used, and decreased
+    when the available memory falls under `MIN_FREE_MEMORY`, when pages are
+    swapped out or when the load average exceeds the number of CPUs. The
+    chosen concurrency and the task throughput are available through
+    `get_metrics()`.
+
+    If the setting `AFFINITY` is True, each task is pinned to a dedicated
+    set of `CORES_PER_TASK` cores, or to the number of cores requested in
+    the `cores` field of the execution proposal. If `NUMA_NODE` is set, the
+    cores are taken from this node and the memory is allocated on it. A task
+    waits in the queue until enough cores are free. The tasks run unpinned
+    if `taskset` (or `numactl` with `NUMA_NODE`) is not installed.
+    """
+    def __init__(self, maxTask=2, adaptive=False, logHandlers=[]):
         Platform.__init__(self, name='SMP',
                           maxTask=maxTask,
                           synchronous=False,
                           logHandlers=logHandlers)
+        self.settings['ADAPTIVE'] = adaptive
+        self.settings['MIN_TASK'] = 1
+        self.settings['TASK_LIMIT'] = multiprocessing.cpu_count()
+        self.settings['ADAPTING_INTERVAL'] = 5.0
+        self.settings['MIN_FREE_MEMORY'] = 0.1
+        self.settings['CPU_TARGET'] = 0.9
+        self.settings['AFFINITY'] = False
+        self.settings['CORES_PER_TASK'] = 1
+        self.settings['NUMA_NODE'] = None
         self.configuration = {}
+        self.monitor = SystemMonitor()
+        self.allocator = CoreAllocator()
+        self.pinning_failures = {} # Why the tasks are not pinned, by node
+        self.n_finished_tasks = 0
+        self.metrics = {'concurrency':maxTask,
+                        'throughput':0.0,
+                        'finished-tasks':0,
+                        'sampling-time':time.time()}
         #self.logger = log.OPALLogger(name='smpPlatform', handlers=logHandlers)
         self.message_handlers['cfp-execute'] = self.create_task
         pass
-   
+
+    def get_metrics(self):
+        metrics = {}
+        metrics.update(self.metrics)
+        metrics['concurrency'] = self.settings['MAX_TASK']
+        metrics['finished-tasks'] = self.n_finished_tasks
+        return metrics
+
+    def choose_concurrency(self, state):
+        '''
+
+        Return the number of concurrent tasks suitable for the given machine
+        state.
+        '''
+        maxTask = self.settings['MAX_TASK']
+        if (state['free-memory'] < self.settings['MIN_FREE_MEMORY']) or \
+               (state['swap-out'] > 0) or \
+               (state['load'] > self.settings['TASK_LIMIT']):
+            return max(self.settings['MIN_TASK'], maxTask - 1)
+        if (len(self.running) >= maxTask) and \
+               (self.queue_system.get_length() > 0) and \
+               (state['cpu-usage'] < self.settings['CPU_TARGET']):
+            return min(self.settings['TASK_LIMIT'], maxTask + 1)
+        return maxTask
+
+    def is_pinning(self):
+        '''
+
+        Return True if the tasks are pinned to their cores. When the setting
+        `AFFINITY` is True but the pinning tool is missing or there is no
+        core to pin to, the tasks run unpinned and the reason is logged once.
+        '''
+        if not self.settings['AFFINITY']:
+            return False
+        node = self.settings['NUMA_NODE']
+        if node not in self.pinning_failures:
+            tool = get_pinning_tool(node)
+            failure = None
+            if not is_tool_available(tool):
+                failure = tool + ' is not found'
+            elif self.allocator.count(node) == 0:
+                failure = 'there is no core to use'
+            if failure is not None:
+                self.logger.log('The tasks are not pinned: ' + failure)
+            self.pinning_failures[node] = failure
+        return self.pinning_failures[node] is None
+
+    def can_launch(self, task):
+        if not Platform.can_launch(self, task):
+            return False
+        if not self.is_pinning():
+            return True
+        return self.allocator.count_free(self.settings['NUMA_NODE']) >= \
+               task.n_cores
+
+    def launch(self, task):
+        if self.is_pinning():
+            task.numa_node = self.settings['NUMA_NODE']
+            task.cores = self.allocator.allocate(task.n_cores, task.numa_node)
+        Platform.launch(self, task)
+        return
+
+    def adjust(self):
+        if not self.settings['ADAPTIVE']:
+            return
+        now = time.time()
+        elapsed = now - self.metrics['sampling-time']
+        if elapsed < self.settings['ADAPTING_INTERVAL']:
+            return
+        state = self.monitor.sample()
+        if state is None:
+            return
+        self.metrics['throughput'] = \
+            (self.n_finished_tasks - self.metrics['finished-tasks']) / elapsed
+        self.metrics['finished-tasks'] = self.n_finished_tasks
+        self.metrics['sampling-time'] = now
+        self.metrics.update(state)
+        maxTask = self.choose_concurrency(state)
+        if maxTask != self.settings['MAX_TASK']:
+            self.logger.log('Concurrency is changed from ' + \
+                            str(self.settings['MAX_TASK']) + ' to ' + \
+                            str(maxTask) + ' with throughput ' + \
+                            str(self.metrics['throughput']) + \
+                            ' tasks/s and state ' + str(state))
+            self.settings['MAX_TASK'] = maxTask
+        self.metrics['concurrency'] = maxTask
+        return
+
     def set_config(self, parameterName, parameterValue):
         self.configuration[parameterName] = parameterValue 
         return
@@ -62,7 +425,15 @@ class SMPPlatform(Platform):
         return
 
     # Message handlers
-    
+
+    def finalize_task(self, info):
+        task = self.running[info['proposition']['who']]
+        if task.cores is not None:
+            self.allocator.release(task.cores)
+        Platform.finalize_task(self, info)
+        self.n_finished_tasks = self.n_finished_tasks + 1
+        return
+
     def create_task(self, info):
         '''
 
@@ -80,9 +451,17 @@ class SMPPlatform(Platform):
             queueTag = proposition['queue']
         else:
             queueTag = None
+        # A task can not request more cores than the platform has
+        nCores = proposition.get('cores', self.settings['CORES_PER_TASK'])
+        nCores = max(1, min(nCores,
+                            self.allocator.count(self.settings['NUMA_NODE'])))
         task = SMPTask(name=name,
                        command=command,
-                       sessionTag=proposition['tag'])
+                       sessionTag=proposition['tag'],
+                       nCores=nCores,
+                       extractor=proposition.get('extractor', None),
+                       streamMeasures=proposition.get('stream-measures',
+                                                      False))
         self.submit(task, queue=queueTag)
         return 
   
@@ -7,3 +7,221 @@ def test_linux_platform():
     LINUX.register(env)
     LINUX.submit('ls')
 
+
+def test_mpi_platform():
+    # Run it directly or with mpirun -np 4 to use a pool of MPI workers
+    import os
+    import time
+    try:
+        import mpi4py
+    except ImportError:
+        from nose.plugins.skip import SkipTest
+        raise SkipTest('mpi4py is not available')
+    from ..core.mafrw import Environment
+    from mpi import MPIPlatform
+    from mpi import MPITask
+
+    env = Environment(name='test mpi environment')
+    platform = MPIPlatform(workers=2)
+    if platform.serve_as_worker():
+        return
+    platform.register(env)
+    env.initialize()
+    tasks = [MPITask(name='task-' + str(i), command='true') for i in range(4)]
+    # The failure of an in-process callable is reported with the completion
+    tasks.append(MPITask(name='task-4', function=os.path.getsize,
+                         args=('/nonexistent/file',)))
+    for task in tasks:
+        platform.submit(task)
+    for i in range(1000):
+        if None not in [task.how for task in tasks]:
+            break
+        time.sleep(0.01)
+    env.finalize()
+    assert [task.result for task in tasks[:4]] == [0, 0, 0, 0]
+    assert [task.how for task in tasks] == ['no-error']*4 + ['error']
+
+
+def test_mpi_worker_failure():
+    import time
+    from ..core.mafrw import Environment
+    from mpi import MPIPlatform
+    from mpi import MPITask
+
+    class BrokenPlatform(MPIPlatform):
+        def start_workers(self):
+            raise Exception('no MPI')
+
+    env = Environment(name='test mpi failure environment')
+    platform = BrokenPlatform(workers=2)
+    platform.register(env)
+    env.initialize()
+    task = MPITask(name='task', command='true')
+    platform.submit(task)
+    for i in range(1000):
+        if task.how is not None:
+            break
+        time.sleep(0.01)
+    env.finalize()
+    assert task.how == 'error'
+    assert 'no MPI' in task.result
+
+
+def test_smp_adaptive_concurrency():
+    from smp import SMPPlatform
+
+    platform = SMPPlatform(maxTask=2, adaptive=True)
+    platform.set_parameter(TASK_LIMIT=4)
+    state = platform.monitor.sample()
+    if state is not None:
+        assert 0.0 <= state['free-memory'] <= 1.0
+    platform.running = {'t1':None, 't2':None}
+    platform.queue_system.append('t3')
+    idle = {'cpu-usage':0.5, 'load':1.0, 'free-memory':0.5, 'swap-out':0}
+    assert platform.choose_concurrency(idle) == 3
+    swapping = {'cpu-usage':0.5, 'load':1.0, 'free-memory':0.5, 'swap-out':10}
+    assert platform.choose_concurrency(swapping) == 1
+
+
+def test_core_allocator():
+    from smp import CoreAllocator
+    from smp import parse_cpu_list
+    from smp import pin_command
+
+    assert parse_cpu_list('0-3,8\n') == [0, 1, 2, 3, 8]
+    allocator = CoreAllocator(cores=[0, 1, 2, 3])
+    cores = allocator.allocate(3)
+    assert cores == [0, 1, 2]
+    assert allocator.allocate(2) is None
+    allocator.release(cores)
+    assert allocator.count_free() == 4
+    assert pin_command('ls', cores=[0, 1]) == 'taskset -c 0,1 ls'
+
+
+def test_missing_pinning_tool():
+    import smp
+    from smp import SMPPlatform
+    from smp import SMPTask
+
+    platform = SMPPlatform(maxTask=2)
+    platform.allocator = smp.CoreAllocator(cores=[0, 1])
+    platform.set_parameter(AFFINITY=True)
+    available = smp.pinning_tools.copy()
+    smp.pinning_tools['taskset'] = False
+    try:
+        # The tasks run unpinned instead of waiting for cores
+        assert not platform.is_pinning()
+        assert platform.can_launch(SMPTask(command='ls', nCores=4))
+    finally:
+        smp.pinning_tools.clear()
+        smp.pinning_tools.update(available)
+
+
+def test_lazy_platforms():
+    # A fresh interpreter is needed to see which modules are imported
+    import os
+    import sys
+    import subprocess
+
+    script = '; '.join(['import sys',
+                        'import opal.core.modelevaluator',
+                        'from opal.Platforms import SMP',
+                        'from opal.Platforms import supported_platforms',
+                        'assert supported_platforms["SMP"] is SMP',
+                        'assert "LSF" in supported_platforms',
+                        'print sorted([name for name in sys.modules ' + \
+                        'if name.startswith("opal.Platforms.") and ' + \
+                        'sys.modules[name] is not None])'])
+    root = os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = root
+    output = subprocess.Popen([sys.executable, '-c', script],
+                              stdout=subprocess.PIPE,
+                              env=environment).communicate()[0]
+    assert output.strip() == "['opal.Platforms.smp']"
+
+
+def test_measure_streaming():
+    import time
+    from ..core.mafrw import Environment
+    from ..core.tools import MeasureExtractor
+    from linux import LINUXPlatform
+    from linux import LINUXTask
+    from smp import SMPPlatform
+    from smp import SMPTask
+
+    extractor = MeasureExtractor([('Iterations', 'NITER', 'int'),
+                                  ('CPU time', 'CPU', 'real')])
+    command = "printf 'Iterations : 12\\nCPU time   : 0.25\\n'"
+    for platform, task in [(LINUXPlatform(),
+                            LINUXTask(name='linux-task', command=command,
+                                      extractor=extractor.copy())),
+                           (SMPPlatform(),
+                            SMPTask(name='smp-task', command=command,
+                                    extractor=extractor.copy()))]:
+        env = Environment(name='test streaming environment')
+        platform.register(env)
+        env.initialize()
+        platform.submit(task)
+        for i in range(1000):
+            if task.measure_values is not None:
+                break
+            time.sleep(0.01)
+        env.finalize()
+        assert task.measure_values == {'NITER': 12, 'CPU': 0.25}
+
+
+def test_stop_task():
+    import time
+    from ..core.mafrw import Agent
+    from ..core.mafrw import Environment
+    from ..core.mafrw import Message
+    from ..core.tools import MeasureExtractor
+    from linux import LINUXPlatform
+    from linux import LINUXTask
+    from smp import SMPPlatform
+    from smp import SMPTask
+
+    class Stopper(Agent):
+        # Stop a run once it has done more than 2 iterations
+        def __init__(self):
+            Agent.__init__(self, name='stopper')
+            self.message_handlers['inform-partial-measure-values'] = \
+                                                                self.check
+            return
+
+        def check(self, info):
+            proposition = info['proposition']
+            if proposition['values'].get('NITER', 0) > 2:
+                self.send_message(Message(sender=self.id,
+                                          performative='cfp',
+                                          content={'action':'stop-task',
+                                                   'proposition':\
+                                                   {'tag':proposition[\
+                                                    'session-tag']}}))
+            return
+
+    extractor = MeasureExtractor([('Iterations', 'NITER', 'int')])
+    command = 'for i in 1 2 3 4 5 6 7 8 9 10; do ' + \
+              'echo Iterations : $i; sleep 0.2; done'
+    for platform, task in [(LINUXPlatform(),
+                            LINUXTask(name='linux-task', command=command,
+                                      extractor=extractor.copy(),
+                                      streamMeasures=True)),
+                           (SMPPlatform(),
+                            SMPTask(name='smp-task', command=command,
+                                    extractor=extractor.copy(),
+                                    streamMeasures=True))]:
+        env = Environment(name='test stop environment')
+        platform.register(env)
+        Stopper().register(env)
+        env.initialize()
+        platform.submit(task)
+        for i in range(1000):
+            if task.measure_values is not None:
+                break
+            time.sleep(0.01)
+        env.finalize()
+        assert task.stopped
+        assert 3 <= task.measure_values['NITER'] < 10
@@ -1,3 +1,49 @@
-#from NOMAD import NOMADBlackbox
-from nomad import NOMAD
-from nomad import NOMADMPI
+'''
+
+The solvers supported by OPAL. Each solver object is created by its module,
+which is imported only when the solver is first asked for, as
+`opal.Solvers.NOMAD` or by `from opal.Solvers import NOMAD`. The blackbox
+executable run by NOMAD at each evaluation thus does not load the modules of
+the other solvers, like the threads and the history of `MADS`.
+'''
+import sys
+import types
+import importlib
+
+# Name of the solver object -> module that creates it
+solver_modules = {'NOMAD': 'nomad',
+                  'NOMADMPI': 'nomad',
+                  'MADS': 'mads'}
+
+def get_solver(name):
+    '''
+
+    Return the solver object of the given name, importing its module at the
+    first call
+    '''
+    if name not in solver_modules:
+        raise KeyError, 'Unsupported solver: ' + str(name)
+    module = importlib.import_module('.' + solver_modules[name], __name__)
+    return getattr(module, name)
+
+
+class SolverPackage(types.ModuleType):
+    """
+
+    The module object of this package, which imports the solvers on
+    attribute access like `opal.Platforms` does with the platforms
+    """
+    def __getattr__(self, name):
+        if name in solver_modules:
+            return get_solver(name)
+        raise AttributeError, name
+
+    def __dir__(self):
+        return sorted(self.__dict__.keys() + solver_modules.keys())
+
+package = SolverPackage(__name__, __doc__)
+package.__dict__.update(sys.modules[__name__].__dict__)
+# The original module is kept alive: its dictionary holds the globals of the
+# functions above and would be cleared when the module is released
+package.original_module = sys.modules[__name__]
+sys.modules[__name__] = package
@@ -0,0 +1,863 @@
+import os
+import sys
+import math
+import time
+import random
+import pickle
+import Queue
+import threading
+
+from ..core.model import Model
+from ..core.solver import Solver
+from ..core.mafrw import Agent
+from ..core.mafrw import Message
+from ..core.mafrw import Environment
+from ..core.modelevaluator import ModelEvaluator
+from ..core.history import create_point_tag
+
+__docformat__ = 'restructuredtext'
+
+
+def get_violation(values):
+    '''
+
+    Return the violation of the constraints of model values, i.e. the sum of
+    the squares of the positive constraint values. A failed evaluation has
+    an infinite violation.
+    '''
+    if values is None:
+        return float('inf')
+    objValue, consValues = values
+    violation = 0.0
+    for cons in consValues:
+        for value in cons:
+            if (value is not None) and (value > 0):
+                violation = violation + value*value
+    return violation
+
+
+def get_merit(values):
+    '''
+
+    Return the key by which the evaluated points are compared: the points
+    with the smallest violation of the constraints are the best ones and
+    the objective function breaks the ties.
+    '''
+    if values is None:
+        return (float('inf'), float('inf'))
+    return (get_violation(values), values[0])
+
+
+class FunctionEvaluation:
+    """
+
+    Evaluate the points by calling a Python function that returns the
+    objective function value and the list of constraint values of a point,
+    or None if the evaluation fails.
+
+    Like every evaluation, it returns the list of the evaluated points with
+    their values. If a function `accept` is given, the evaluation stops as
+    soon as `accept` is True for the values of a point.
+    """
+    def __init__(self, function):
+        self.function = function
+        return
+
+    def start(self):
+        return
+
+    def evaluate(self, points, accept=None):
+        evaluated = []
+        for point in points:
+            values = self.function(point)
+            evaluated.append((point, values))
+            if (accept is not None) and accept(values):
+                break
+        return evaluated
+
+    def stop(self):
+        return
+
+
+class EvaluationClient(Agent):
+    """
+
+    The agent through which the solver asks the model evaluator for the
+    model values of the points. The replies are delivered by queues, one
+    for each caller, so that several searches can share the client. A point
+    requested by several callers is evaluated once and its values are
+    delivered to all of them.
+    """
+    def __init__(self, name='evaluation client', logHandlers=[]):
+        Agent.__init__(self, name=name, logHandlers=logHandlers)
+        self.waiting = {} # Queues of the callers by tag
+        self.lock = threading.Lock()
+        self.message_handlers['inform-model-value'] = self.receive
+        return
+
+    def submit(self, tag, point, results):
+        '''
+
+        Ask for the model values of a point. They are put in the queue
+        `results` with the tag of the point.
+        '''
+        self.lock.acquire()
+        try:
+            if tag in self.waiting:
+                # The point is being evaluated for another caller
+                self.waiting[tag].append(results)
+                return
+            self.waiting[tag] = [results]
+        finally:
+            self.lock.release()
+        msg = Message(performative='cfp',
+                      sender=self.id,
+                      content={'action':'evaluate-point',
+                               'proposition':{'point':point,
+                                              'tag':tag}
+                               })
+        self.send_message(msg)
+        return
+
+    def cancel(self, tag, results):
+        '''
+
+        Withdraw the request of the caller owning the queue `results`. The
+        evaluation is cancelled if no other caller waits for it.
+        '''
+        self.lock.acquire()
+        try:
+            if (tag not in self.waiting) or \
+                   (results not in self.waiting[tag]):
+                return
+            self.waiting[tag].remove(results)
+            if len(self.waiting[tag]) > 0:
+                return
+            del self.waiting[tag]
+        finally:
+            self.lock.release()
+        msg = Message(performative='inform',
+                      sender=self.id,
+                      content={'proposition':{'what':'evaluation-cancelled',
+                                              'parameter-tag':tag}
+                               })
+        self.send_message(msg)
+        return
+
+    def is_served(self):
+        '''
+
+        Return False if an agent of the environment stopped working
+        unexpectedly, in which case the pending evaluations will never
+        complete
+        '''
+        for agent in self.environment.directory_service.get_all():
+            if (agent is not self) and (agent.ident is not None) and \
+                   agent.working and not agent.is_alive():
+                return False
+        return True
+
+    def wait(self, results, timeout=None):
+        '''
+
+        Return the tag and the model values of the next point evaluated for
+        the caller owning the queue `results`, or None if no point is
+        evaluated within `timeout` seconds. An exception is raised if the
+        agents that evaluate the points are dead.
+        '''
+        deadline = None
+        if timeout is not None:
+            deadline = time.time() + timeout
+        while True:
+            delay = 1.0
+            if deadline is not None:
+                delay = min(delay, deadline - time.time())
+                if delay <= 0.0:
+                    return None
+            try:
+                return results.get(timeout=delay)
+            except Queue.Empty:
+                pass
+            if not self.is_served():
+                raise Exception('An agent of the evaluation environment ' + \
+                                'is dead, the points can not be evaluated')
+
+    # Message handlers
+
+    def receive(self, info):
+        tag = info['proposition']['parameter-tag']
+        self.lock.acquire()
+        try:
+            callers = self.waiting.pop(tag, [])
+        finally:
+            self.lock.release()
+        for results in callers:
+            results.put((tag, info['proposition']['values']))
+        return
+
+
+class ModelEvaluation:
+    """
+
+    Evaluate the points by a model evaluator living in the same process as
+    the solver. The points of a batch are submitted together so that their
+    tests are run concurrently by the platform of the model. The points are
+    returned in the order of completion, the ones that violate the bounds or
+    the constraints of the parameters first, with no values and without
+    being submitted.
+
+    When the values of a point are accepted, the evaluations in progress
+    are cancelled: the tests waiting in the platform queues are removed and
+    the results of the running ones are ignored.
+
+    Several searches may evaluate their points at the same time through the
+    same evaluation, each one from its own thread.
+
+    If `resultStore` names a file, the results of the tests are saved in it
+    and the stored ones are replayed instead of being run again. If
+    `history` is True, the evaluations are recorded in the history file of
+    `dataFile`.
+
+    If `timeout` is given, a batch whose next point is not evaluated within
+    `timeout` seconds is given up: its pending points are cancelled and
+    returned as failed, with no values.
+    """
+    def __init__(self, model, dataFile='blackbox.dat', resultStore=None,
+                 timeout=None, history=False, logHandlers=[]):
+        self.model = model
+        self.data_file = dataFile
+        self.result_store = resultStore
+        self.history = history
+        self.timeout = timeout
+        self.log_handlers = logHandlers
+        self.environment = None
+        self.client = None
+        return
+
+    def create_tag(self, point):
+        return create_point_tag(point)
+
+    def start(self):
+        # The model is saved as the NOMAD blackbox does, the evaluator saves
+        # it back and records the evaluation history next to it
+        f = open(self.data_file, 'w')
+        pickle.dump(self.model, f)
+        f.close()
+        self.environment = Environment(name='mads',
+                                       logHandlers=self.log_handlers)
+        self.client = EvaluationClient(logHandlers=self.log_handlers)
+        evaluator = ModelEvaluator(model=self.model,
+                                   modelFile=self.data_file,
+                                   options={'result_store':self.result_store,
+                                            'history':self.history},
+                                   logHandlers=self.log_handlers)
+        self.client.register(self.environment)
+        evaluator.register(self.environment)
+        self.environment.initialize()
+        return
+
+    def evaluate(self, points, accept=None):
+        results = Queue.Queue()
+        waiting = {}
+        evaluated = []
+        # The infeasible points are failed at once, without creating tasks
+        feasible = [True]*len(points)
+        if len(points) > 0:
+            feasible, reasons = self.model.get_algorithm().check_points(
+                points, self.model.variables)
+        failed = set()
+        for point, isFeasible in zip(points, feasible):
+            tag = self.create_tag(point)
+            if (tag in waiting) or (tag in failed):
+                continue
+            if isFeasible:
+                waiting[tag] = point
+                self.client.submit(tag, point, results)
+            else:
+                failed.add(tag)
+                evaluated.append((point, None))
+        while len(waiting) > 0:
+            reply = self.client.wait(results, timeout=self.timeout)
+            if reply is None:
+                # The evaluations take too long, they fail
+                for tag, point in waiting.items():
+                    self.client.cancel(tag, results)
+                    evaluated.append((point, None))
+                break
+            tag, values = reply
+            if tag not in waiting:
+                # Late reply for a cancelled evaluation
+                continue
+            evaluated.append((waiting.pop(tag), values))
+            if (accept is not None) and accept(values):
+                for tag in waiting.keys():
+                    self.client.cancel(tag, results)
+                break
+        return evaluated
+
+    def stop(self):
+        self.environment.finalize()
+        self.environment = None
+        self.client = None
+        return
+
+
+class MADSRun:
+    """
+
+    The state of a mesh adaptive direct search started from an initial
+    point: the incumbent, the poll size and the cache of the evaluated
+    points.
+
+    The poll directions are the columns of a Householder matrix and their
+    opposites, rounded on the mesh as in OrthoMADS. The mesh size is
+    min(p, p^2) where p is the poll size, both relative to the scale of the
+    variables. The scale of a bounded variable is its range, the one of an
+    unbounded variable is its initial magnitude (or 10 if it is zero).
+
+    In opportunistic mode, the poll stops at the first point that improves
+    the incumbent and the other evaluations are cancelled. The poll points
+    are then tried in the order of their closeness to the direction of the
+    last success.
+
+    Categorical variables are not polled. When the poll fails, the
+    neighbors of the incumbent are evaluated (extended poll). They are given
+    by the neighborhood function of the model structure if there is one, or
+    by changing a categorical variable to another of its values otherwise.
+
+    A run is resumed from a saved state (see `get_state`) without
+    evaluating the initial point again.
+
+    If a function `budget` is given, it is called with the number of points
+    that the run is about to evaluate and returns how many of them may be
+    evaluated. It is called again with a negative number to give back the
+    evaluations that were not done.
+    """
+    def __init__(self, variables, initialPoint, evaluation, neighborhood=None,
+                 initialPollSize=0.1, minPollSize=1.0e-6, seed=0,
+                 opportunistic=True, cache=None, state=None, budget=None):
+        self.variables = variables
+        self.evaluation = evaluation
+        self.budget = budget
+        self.neighborhood = neighborhood
+        self.opportunistic = opportunistic
+        self.last_direction = None
+        self.min_poll_size = minPollSize
+        self.poll_size = initialPollSize
+        self.random = random.Random(seed)
+        if cache is None:
+            cache = {}
+        self.cache = cache # Model values by point
+        self.n_evaluations = 0
+        self.n_iterations = 0
+        self.polled = [i for i in range(len(variables)) \
+                       if not variables[i].is_categorical]
+        self.scales = []
+        for var, x in zip(variables, initialPoint):
+            bound = var.bound
+            if var.is_categorical:
+                self.scales.append(None)
+            elif (bound is not None) and (bound[0] is not None) and \
+                     (bound[1] is not None) and (bound[1] > bound[0]):
+                self.scales.append(float(bound[1] - bound[0]))
+            elif float(x) != 0.0:
+                self.scales.append(abs(float(x)))
+            else:
+                self.scales.append(10.0)
+        if state is not None:
+            self.set_state(state)
+            return
+        self.incumbent = self.convert(initialPoint)
+        self.incumbent_values = None # Unless the budget allows evaluation
+        for point, values in self.evaluate([self.incumbent]):
+            self.incumbent_values = values
+        return
+
+    def get_state(self):
+        '''
+
+        Return the picklable state from which the run can be resumed. The
+        cache is not part of the state as it may be shared by several runs.
+        '''
+        return {'incumbent':self.incumbent,
+                'incumbent-values':self.incumbent_values,
+                'poll-size':self.poll_size,
+                'last-direction':self.last_direction,
+                'scales':self.scales,
+                'random':self.random.getstate(),
+                'n-evaluations':self.n_evaluations,
+                'n-iterations':self.n_iterations}
+
+    def set_state(self, state):
+        self.incumbent = state['incumbent']
+        self.incumbent_values = state['incumbent-values']
+        self.poll_size = state['poll-size']
+        self.last_direction = state['last-direction']
+        self.scales = state['scales']
+        self.random.setstate(state['random'])
+        if 'cache' in state: # Saved by an older version
+            self.cache.update(state['cache'])
+        self.n_evaluations = state['n-evaluations']
+        self.n_iterations = state['n-iterations']
+        return
+
+    def convert(self, point):
+        '''
+
+        Convert the coordinates to the types of the variables and project
+        them onto the bounds
+        '''
+        converted = []
+        for var, x in zip(self.variables, point):
+            if var.is_categorical:
+                converted.append(x)
+                continue
+            if var.is_integer:
+                x = int(round(float(x)))
+            else:
+                x = float(x)
+            if var.bound is not None:
+                if (var.bound[0] is not None) and (x < var.bound[0]):
+                    x = var.bound[0]
+                if (var.bound[1] is not None) and (x > var.bound[1]):
+                    x = var.bound[1]
+            converted.append(x)
+        return tuple(converted)
+
+    def is_improving(self, values):
+        return get_merit(values) < get_merit(self.incumbent_values)
+
+    def evaluate(self, points, accept=None):
+        '''
+
+        Return the list of the evaluated points with their model values.
+        Only the points that are not in the cache are evaluated, within the
+        budget of evaluations. If a function `accept` is given, the
+        evaluation may stop as soon as it is True for a point.
+        '''
+        evaluated = []
+        newPoints = []
+        for point in points:
+            if point in self.cache:
+                evaluated.append((point, self.cache[point]))
+                if (accept is not None) and accept(self.cache[point]):
+                    return evaluated
+            elif point not in newPoints:
+                newPoints.append(point)
+        if (self.budget is not None) and (len(newPoints) > 0):
+            newPoints = newPoints[:self.budget(len(newPoints))]
+        if len(newPoints) > 0:
+            results = self.evaluation.evaluate([list(point) \
+                                                for point in newPoints],
+                                               accept=accept)
+            for point, values in results:
+                point = tuple(point)
+                self.cache[point] = values
+                evaluated.append((point, values))
+            self.n_evaluations = self.n_evaluations + len(results)
+            if (self.budget is not None) and \
+                   (len(results) < len(newPoints)):
+                self.budget(len(results) - len(newPoints))
+        return evaluated
+
+    def get_mesh_size(self):
+        return min(self.poll_size, self.poll_size**2)
+
+    def get_directions(self):
+        n = len(self.polled)
+        if n == 0:
+            return []
+        v = [self.random.gauss(0.0, 1.0) for i in range(n)]
+        norm = math.sqrt(sum([vi*vi for vi in v]))
+        if norm == 0.0:
+            v = [1.0] + [0.0]*(n - 1)
+        else:
+            v = [vi/norm for vi in v]
+        ratio = self.poll_size/self.get_mesh_size()
+        directions = []
+        for j in range(n):
+            h = [(i == j) - 2.0*v[i]*v[j] for i in range(n)]
+            largest = max([abs(hi) for hi in h])
+            d = [round(ratio*hi/largest) for hi in h]
+            directions.append(d)
+            directions.append([-di for di in d])
+        return directions
+
+    def get_poll_points(self):
+        points = []
+        meshSize = self.get_mesh_size()
+        directions = self.get_directions()
+        if self.last_direction is not None:
+            directions.sort(key=lambda d: -sum([di*li for di, li in \
+                                                zip(d, self.last_direction)]))
+        for d in directions:
+            point = list(self.incumbent)
+            for di, i in zip(d, self.polled):
+                step = meshSize*di*self.scales[i]
+                if self.variables[i].is_integer and (di != 0) and \
+                       (abs(step) < 1.0) and \
+                       (abs(di) == max([abs(dk) for dk in d])):
+                    # The mesh is finer than the integer grid
+                    step = math.copysign(1.0, di)
+                point[i] = point[i] + step
+            point = self.convert(point)
+            if (point != self.incumbent) and (point not in points):
+                points.append(point)
+        return points
+
+    def get_neighbors(self):
+        if self.neighborhood is not None:
+            neighbors = self.neighborhood([str(x) for x in self.incumbent])
+            return [self.convert(neighbor) for neighbor in neighbors]
+        neighbors = []
+        for i in range(len(self.variables)):
+            var = self.variables[i]
+            if not var.is_categorical or (var.bound is None):
+                continue
+            for value in var.bound:
+                if value != self.incumbent[i]:
+                    neighbor = list(self.incumbent)
+                    neighbor[i] = value
+                    neighbors.append(tuple(neighbor))
+        return neighbors
+
+    def move(self, evaluated):
+        '''
+
+        Move to the best of the evaluated points if it improves the
+        incumbent. Return True in that case.
+        '''
+        best = None
+        for point, values in evaluated:
+            if self.is_improving(values):
+                if (best is None) or (get_merit(values) < get_merit(best[1])):
+                    best = (point, values)
+        if best is None:
+            return False
+        self.last_direction = []
+        for i in self.polled:
+            self.last_direction.append((float(best[0][i]) - \
+                                        float(self.incumbent[i]))/\
+                                       self.scales[i])
+        self.incumbent, self.incumbent_values = best
+        return True
+
+    def iterate(self):
+        '''
+
+        Do an iteration: poll around the incumbent, then do the extended
+        poll if the poll fails, and update the poll size
+        '''
+        self.n_iterations = self.n_iterations + 1
+        accept = None
+        if self.opportunistic:
+            accept = self.is_improving
+        points = self.get_poll_points()
+        success = self.move(self.evaluate(points, accept))
+        if not success:
+            points = [point for point in self.get_neighbors() \
+                      if point != self.incumbent]
+            success = self.move(self.evaluate(points, accept))
+        if success:
+            self.poll_size = min(2.0*self.poll_size, 1.0)
+        else:
+            self.poll_size = 0.5*self.poll_size
+        return success
+
+    def is_terminated(self, maxEvaluations=None, maxIterations=None):
+        if self.poll_size < self.min_poll_size:
+            return True
+        if (maxEvaluations is not None) and \
+               (self.n_evaluations >= maxEvaluations):
+            return True
+        if (maxIterations is not None) and \
+               (self.n_iterations >= maxIterations):
+            return True
+        return False
+
+
+class MADSSolver(Solver):
+    """
+
+    A mesh adaptive direct search solver running in the process of OPAL.
+    Unlike NOMAD, it needs no external executable: the points are evaluated
+    by a model evaluator living in the same process and the points of a
+    poll are evaluated concurrently by the platform of the model.
+
+    The settings are given by `set_parameter`:
+
+    - `MAX_BB_EVAL`: maximum number of evaluations, never exceeded: a poll
+      is cut to the evaluations that remain,
+    - `MAX_ITERATIONS`: maximum number of iterations,
+    - `INITIAL_POLL_SIZE`, `MIN_POLL_SIZE`: poll sizes relative to the
+      scales of the variables,
+    - `SEED`: seed of the random poll directions,
+    - `OPPORTUNISTIC_EVAL`: stop the poll at the first improving point and
+      cancel the other evaluations (True by default),
+    - `MULTI_START`: search from every initial point of the model at the
+      same time (False by default),
+    - `DISPLAY_DEGREE`: 0 for no output, 1 to show the successes,
+    - `CHECKPOINT_FILE`: file in which the state of the search is saved
+      every `CHECKPOINT_INTERVAL` iterations,
+    - `RESULT_STORE`: file in which the results of the tests are saved.
+      It defaults to the checkpoint file name followed by `.results` when
+      the checkpoints are enabled.
+    - `EVALUATION_TIMEOUT`: number of seconds after which the points of a
+      poll that are still waiting for their evaluation are failed (no
+      limit by default).
+
+    A search stopped for any reason is resumed by `solve(..., resume=True)`
+    with the same checkpoint file: it continues from its last checkpoint,
+    and the tests completed after the checkpoint are not run again as
+    their results are replayed from the result store.
+
+    The solution is written to `solution_file` (one coordinate by line, as
+    NOMAD does) and kept in the `solution` attribute.
+    """
+    def __init__(self, name='MADS', **kwargs):
+        Solver.__init__(self, name=name, **kwargs)
+        self.solution_file = 'mads-solution.txt'
+        self.parameters = {'MAX_BB_EVAL':None,
+                           'MAX_ITERATIONS':None,
+                           'INITIAL_POLL_SIZE':0.1,
+                           'MIN_POLL_SIZE':1.0e-6,
+                           'SEED':0,
+                           'OPPORTUNISTIC_EVAL':True,
+                           'MULTI_START':False,
+                           'DISPLAY_DEGREE':1,
+                           'CHECKPOINT_FILE':None,
+                           'CHECKPOINT_INTERVAL':1,
+                           'RESULT_STORE':None,
+                           'EVALUATION_TIMEOUT':None}
+        self.solution = None
+        self.checkpoint_lock = threading.Lock()
+        self.budget_lock = threading.Lock()
+        self.n_reserved_evaluations = 0
+        return
+
+    def set_parameter(self, name=None, value=None, **kwargs):
+        '''
+
+        Set the parameter `name` to `value`. Several parameters may also be
+        given as keyword arguments, as in `set_parameter(SEED=1, MAX_BB_EVAL=
+        100)`. An unknown parameter name raises a KeyError.
+        '''
+        settings = dict(kwargs)
+        if name is not None:
+            settings[name] = value
+        for name in settings:
+            if name not in self.parameters:
+                raise KeyError, 'Unknown MADS parameter: ' + str(name)
+        self.parameters.update(settings)
+        return
+
+    def display(self, run):
+        if self.parameters['DISPLAY_DEGREE'] > 0:
+            print run.n_evaluations, list(run.incumbent), \
+                  run.incumbent_values
+        return
+
+    def get_result_store(self):
+        if self.parameters['RESULT_STORE'] is not None:
+            return self.parameters['RESULT_STORE']
+        if self.parameters['CHECKPOINT_FILE'] is not None:
+            return self.parameters['CHECKPOINT_FILE'] + '.results'
+        return None
+
+    def get_n_evaluations(self, runs):
+        return sum([run.n_evaluations for run in runs if run is not None])
+
+    def reserve_evaluations(self, n):
+        '''
+
+        Reserve `n` evaluations of the MAX_BB_EVAL budget, shared by the
+        searches, and return the number of evaluations granted. A negative
+        `n` gives back evaluations that were not done.
+        '''
+        self.budget_lock.acquire()
+        try:
+            if (n > 0) and (self.parameters['MAX_BB_EVAL'] is not None):
+                n = max(0, min(n, self.parameters['MAX_BB_EVAL'] - \
+                               self.n_reserved_evaluations))
+            self.n_reserved_evaluations = self.n_reserved_evaluations + n
+        finally:
+            self.budget_lock.release()
+        return n
+
+    def is_budget_exhausted(self):
+        maxEvaluations = self.parameters['MAX_BB_EVAL']
+        return (maxEvaluations is not None) and \
+               (self.n_reserved_evaluations >= maxEvaluations)
+
+    def save_checkpoint(self, states, cache):
+        '''
+
+        Save the states of the runs and, once for all of them, the cache of
+        the evaluated points
+        '''
+        checkpointFile = self.parameters['CHECKPOINT_FILE']
+        self.checkpoint_lock.acquire()
+        try:
+            # Write then rename so that a crash never leaves a partial file
+            f = open(checkpointFile + '.tmp', 'w')
+            pickle.dump({'states':states, 'cache':dict(cache)}, f)
+            f.close()
+            os.rename(checkpointFile + '.tmp', checkpointFile)
+        finally:
+            self.checkpoint_lock.release()
+        return
+
+    def load_checkpoint(self):
+        '''
+
+        Return the states of the runs and the cache saved in the checkpoint
+        file, or None if there is no checkpoint
+        '''
+        checkpointFile = self.parameters['CHECKPOINT_FILE']
+        if (checkpointFile is None) or not os.path.exists(checkpointFile):
+            return None
+        f = open(checkpointFile)
+        checkpoint = pickle.load(f)
+        f.close()
+        if isinstance(checkpoint, list):
+            # An older checkpoint holds the cache in each state
+            return checkpoint, {}
+        return checkpoint['states'], checkpoint['cache']
+
+    def search(self, runs, states, index, variables, initialPoint, evaluation,
+               neighborhood=None, cache=None):
+        '''
+
+        Run the search started from the initial point number `index` until
+        it terminates. The run is kept in `runs` and its last state in
+        `states` so that the searches done at the same time see each other.
+        '''
+        run = MADSRun(variables,
+                      initialPoint,
+                      evaluation,
+                      neighborhood=neighborhood,
+                      initialPollSize=self.parameters['INITIAL_POLL_SIZE'],
+                      minPollSize=self.parameters['MIN_POLL_SIZE'],
+                      seed=self.parameters['SEED'] + index,
+                      opportunistic=self.parameters['OPPORTUNISTIC_EVAL'],
+                      cache=cache,
+                      state=states[index],
+                      budget=self.reserve_evaluations)
+        runs[index] = run
+        self.display(run)
+        while not run.is_terminated(None, self.parameters['MAX_ITERATIONS']):
+            if self.is_budget_exhausted():
+                break
+            if run.iterate():
+                self.display(run)
+            if (self.parameters['CHECKPOINT_FILE'] is not None) and \
+                   (run.n_iterations % \
+                    self.parameters['CHECKPOINT_INTERVAL'] == 0):
+                states[index] = run.get_state()
+                self.save_checkpoint(states, run.cache)
+        if self.parameters['CHECKPOINT_FILE'] is not None:
+            states[index] = run.get_state()
+            self.save_checkpoint(states, run.cache)
+        return
+
+    def solve(self, blackbox=None, evaluation=None, resume=False, **kwargs):
+        '''
+
+        Solve the parameter optimization problem described by the model
+        `blackbox` from its first initial point, or from the last checkpoint
+        if `resume` is True. The points are evaluated by `evaluation`, a
+        `ModelEvaluation` of the model by default.
+
+        If `MULTI_START` is True, an independent search is started from each
+        initial point of the model. The searches run at the same time and
+        share the evaluation, hence the platform, and the cache of the
+        evaluated points; `MAX_BB_EVAL` bounds their total number of
+        evaluations. The solution is the best one found by the searches and
+        the result of each search is reported under `runs`.
+        '''
+        if evaluation is None:
+            evaluation = ModelEvaluation(
+                blackbox,
+                resultStore=self.get_result_store(),
+                timeout=self.parameters['EVALUATION_TIMEOUT'])
+        initialPoints = blackbox.get_initial_points()
+        if not self.parameters['MULTI_START']:
+            initialPoints = initialPoints[:1]
+        states = [None]*len(initialPoints)
+        cache = {} # Shared by the searches
+        if resume:
+            checkpoint = self.load_checkpoint()
+            if checkpoint is not None:
+                savedStates, savedCache = checkpoint
+                if len(savedStates) != len(initialPoints):
+                    raise Exception('The checkpoint does not match the ' + \
+                                    'initial points')
+                states = savedStates
+                cache.update(savedCache)
+        # The evaluations done before the checkpoint are charged to the
+        # budget
+        self.n_reserved_evaluations = sum([state['n-evaluations'] \
+                                           for state in states \
+                                           if state is not None])
+        neighborhood = None
+        if isinstance(blackbox, Model):
+            neighborhood = \
+                blackbox.get_structure().informations.get('neighborhood',
+                                                          None)
+        runs = [None]*len(initialPoints)
+        failures = []
+        evaluation.start()
+        try:
+            if len(initialPoints) == 1:
+                self.search(runs, states, 0, blackbox.variables,
+                            initialPoints[0], evaluation,
+                            neighborhood=neighborhood, cache=cache)
+            else:
+                def search(index):
+                    try:
+                        self.search(runs, states, index, blackbox.variables,
+                                    initialPoints[index], evaluation,
+                                    neighborhood=neighborhood, cache=cache)
+                    except:
+                        failures.append(sys.exc_info())
+                    return
+                threads = [threading.Thread(target=search, args=(index,)) \
+                           for index in range(len(initialPoints))]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        finally:
+            evaluation.stop()
+        if len(failures) > 0:
+            raise failures[0][0], failures[0][1], failures[0][2]
+        reports = []
+        for initialPoint, run in zip(initialPoints, runs):
+            reports.append({'initial-point':list(initialPoint),
+                            'point':list(run.incumbent),
+                            'values':run.incumbent_values,
+                            'n-evaluations':run.n_evaluations,
+                            'n-iterations':run.n_iterations})
+        best = runs[0]
+        for run in runs[1:]:
+            if best.is_improving(run.incumbent_values):
+                best = run
+        self.solution = {'point':list(best.incumbent),
+                         'values':best.incumbent_values,
+                         'n-evaluations':self.get_n_evaluations(runs),
+                         'n-iterations':sum([run.n_iterations \
+                                             for run in runs]),
+                         'runs':reports}
+        if (self.parameters['DISPLAY_DEGREE'] > 0) and (len(runs) > 1):
+            for report in reports:
+                print report['initial-point'], '->', report['point'], \
+                      report['values']
+        if self.solution_file is not None:
+            f = open(self.solution_file, 'w')
+            for x in best.incumbent:
+                f.write(str(x) + '\n')
+            f.close()
+        return self.solution
+
+
+MADS = MADSSolver()
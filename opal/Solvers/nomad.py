@@ -12,6 +12,7 @@ from ..core.mafrw import Message
 from ..core.mafrw import Environment
 
 from opal.core.modelevaluator import ModelEvaluator
+from opal.core.history import get_history_file
 #from ..core.blackbox import BlackBox
 
 __docformat__ = 'restructuredtext'
@@ -251,14 +252,26 @@ class NOMADSolver(Solver):
         '''
         #self.blackbox = NOMADBlackbox(model=model)
         #self.blackbox.generate_executable_file()
+        if (surrogate is not None) and not isinstance(surrogate, Model):
+            # The learned surrogate is fitted to the evaluation history
+            blackbox.evaluating_options['history'] = True
         self.generate_blackbox_executable(model=blackbox,
                                           execFile='blackbox.py',
                                           dataFile='blackbox.dat')
-        # Check if surrogate is used
-        if surrogate is not None:
+        # Check if surrogate is used. A surrogate is either a cheaper model
+        # or a surrogate learned from the evaluation history of the blackbox
+        if isinstance(surrogate, Model):
             self.generate_blackbox_executable(model=surrogate,
                                               execFile='surrogate.py',
                                               dataFile='surrogate.dat')
+        elif surrogate is not None:
+            if surrogate.history_file is None:
+                surrogate.history_file = get_history_file('blackbox.dat')
+            if surrogate.bounds is None:
+                surrogate.bounds = blackbox.bounds
+            self.generate_surrogate_executable(surrogate,
+                                               execFile='surrogate.py',
+                                               dataFile='surrogate.dat')
         # Check if there is a neighborhood defintions
         suppInfo =  blackbox.get_structure().informations
         if "neighborhood" in suppInfo:
@@ -345,6 +358,38 @@ class NOMADSolver(Solver):
         f.close()
         return
 
+    def generate_surrogate_executable(self,
+                                      surrogate,
+                                      execFile='surrogate.py',
+                                      dataFile='surrogate.dat'):
+        """
+
+        Generate Python code that evaluates a point by a learned surrogate.
+        No test is run by this executable.
+        """
+        endl = '\n'
+        comment = '# '
+        bb = open(execFile, 'w')
+        bb.write('import sys' + endl)
+        bb.write('from opal.Solvers.nomad import NOMADBlackbox' + endl)
+        bb.write('from opal.core.surrogate import SurrogateEvaluator' + endl)
+        bb.write('worker = SurrogateEvaluator(name="surrogate evaluator", ' + \
+                 'surrogateFile="' + dataFile + '")' + endl)
+        bb.write(comment + 'Create surrogate evaluation environment' + endl)
+        bb.write('env = NOMADBlackbox(name="surrogate blackbox", ' + \
+                 'worker=worker, ' + \
+                 'input=sys.argv[1], output=sys.stdout)' + endl)
+        bb.write(comment + 'Activate the environment' + endl)
+        bb.write('env.start()' + endl)
+        bb.write(comment + 'Wait for environement finish his life time' + endl)
+        bb.write('env.join()' + endl)
+        bb.close()
+
+        f = open(dataFile, 'w')
+        pickle.dump(surrogate, f)
+        f.close()
+        return
+
     def generate_neighbors_executable(self,
                                      neighborsFunction=None,
                                      execFile=None,
@@ -0,0 +1,228 @@
+def test_mads_solver():
+    from ..core.algorithm import Algorithm
+    from ..core.parameter import Parameter
+    from ..core.modeldata import ModelData
+    from ..core.modelstructure import ModelStructure
+    from ..core.model import Model
+    from mads import MADSSolver
+    from mads import FunctionEvaluation
+
+    def sum_value(parameters, measures):
+        return sum(measures['VALUE'])
+
+    def function(point):
+        x, n, choice = point
+        value = (x - 1.3)**2 + (n - 7)**2 + {'a':1.0, 'b':0.0, 'c':2.0}[choice]
+        return (value, [[None, x - 1.0]]) # x <= 1
+
+    algorithm = Algorithm(name='ALGO')
+    algorithm.add_param(Parameter(name='x', kind='real', default=0.0,
+                                  bound=[-5.0, 5.0]))
+    algorithm.add_param(Parameter(name='n', kind='integer', default=0,
+                                  bound=[0, 20]))
+    algorithm.add_param(Parameter(name='choice', kind='categorical',
+                                  default='a', bound=['a', 'b', 'c']))
+    model = Model(modelData=ModelData(algorithm),
+                  modelStructure=ModelStructure(objective=sum_value))
+    solver = MADSSolver()
+    solver.solution_file = None
+    solver.set_parameter(name='DISPLAY_DEGREE', value=0)
+    solver.set_parameter(name='MAX_BB_EVAL', value=500)
+    solution = solver.solve(blackbox=model,
+                            evaluation=FunctionEvaluation(function))
+    x, n, choice = solution['point']
+    assert abs(x - 1.0) < 1e-3
+    assert n == 7
+    assert choice == 'b'
+    assert solution['n-evaluations'] <= 500
+    # The budget is not exceeded by the last poll
+    solver.set_parameter(name='MAX_BB_EVAL', value=7)
+    solution = solver.solve(blackbox=model,
+                            evaluation=FunctionEvaluation(function))
+    assert solution['n-evaluations'] == 7
+
+
+def test_mads_opportunistic_poll():
+    from ..core.parameter import Parameter
+    from mads import MADSRun
+    from mads import FunctionEvaluation
+
+    calls = []
+    def function(point):
+        calls.append(point)
+        return (sum([x*x for x in point]), [])
+
+    variables = [Parameter(name='x' + str(i), kind='real', default=1.0,
+                           bound=[-2.0, 2.0]) for i in range(3)]
+    run = MADSRun(variables, [1.0, 1.0, 1.0], FunctionEvaluation(function))
+    points = [(0.5, 1.0, 1.0), (1.5, 1.0, 1.0), (0.0, 0.0, 0.0)]
+    evaluated = run.evaluate(points, accept=run.is_improving)
+    assert [point for point, values in evaluated] == [(0.5, 1.0, 1.0)]
+    assert run.move(evaluated)
+    assert run.last_direction == [-0.125, 0.0, 0.0]
+    # The cached points are not evaluated again
+    assert len(run.evaluate(points)) == 3
+    assert len(calls) == 4
+
+
+def test_mads_checkpoint():
+    import os
+    import pickle
+    import tempfile
+    from ..core.parameter import Parameter
+    from ..core.history import ResultStore
+    from mads import MADSSolver
+    from mads import FunctionEvaluation
+
+    class Blackbox:
+        variables = [Parameter(name='x' + str(i), kind='real', default=1.0,
+                               bound=[-2.0, 2.0]) for i in range(2)]
+        def get_initial_points(self):
+            return [[1.0, 1.0]]
+
+    def function(point):
+        return ((point[0] - 0.3)**2 + (point[1] + 0.6)**2, [])
+
+    checkpointFile = tempfile.mktemp(suffix='.ckpt')
+    solver = MADSSolver()
+    solver.solution_file = None
+    solver.set_parameter(name='DISPLAY_DEGREE', value=0)
+    solver.set_parameter(name='MAX_ITERATIONS', value=12)
+    straight = solver.solve(blackbox=Blackbox(),
+                            evaluation=FunctionEvaluation(function))
+    solver.set_parameter(name='CHECKPOINT_FILE', value=checkpointFile)
+    solver.set_parameter(name='MAX_ITERATIONS', value=5)
+    solver.solve(blackbox=Blackbox(), evaluation=FunctionEvaluation(function))
+    solver.set_parameter(name='MAX_ITERATIONS', value=12)
+    resumed = solver.solve(blackbox=Blackbox(),
+                           evaluation=FunctionEvaluation(function),
+                           resume=True)
+    assert resumed == straight
+    # The cache is saved once, not in each state
+    f = open(checkpointFile)
+    checkpoint = pickle.load(f)
+    f.close()
+    assert len(checkpoint['cache']) == resumed['n-evaluations']
+    assert 'cache' not in checkpoint['states'][0]
+    os.remove(checkpointFile)
+
+    storeFile = tempfile.mktemp(suffix='.results')
+    store = ResultStore(storeFile)
+    store.add('tag', 'PROB', {'TIME':1.0}, {'repetitions':1})
+    assert ResultStore(storeFile).get('tag', 'PROB') == \
+           ({'TIME':1.0}, {'repetitions':1})
+    assert ResultStore(storeFile).get('tag', 'OTHER') is None
+    os.remove(storeFile)
+
+
+def test_mads_multistart():
+    from ..core.parameter import Parameter
+    from mads import MADSSolver
+    from mads import FunctionEvaluation
+
+    class Blackbox:
+        variables = [Parameter(name='x' + str(i), kind='real', default=0.0,
+                               bound=[-3.0, 3.0]) for i in range(2)]
+        def get_initial_points(self):
+            return [[-1.0, 0.5], [1.0, 0.5]]
+
+    def function(point):
+        x, y = point
+        return (min((x - 1.5)**2, (x + 1.5)**2 + 0.5) + y*y, [])
+
+    solver = MADSSolver()
+    solver.solution_file = None
+    solver.set_parameter(name='DISPLAY_DEGREE', value=0)
+    solver.set_parameter(name='MULTI_START', value=True)
+    solver.set_parameter(name='MAX_BB_EVAL', value=1000)
+    solution = solver.solve(blackbox=Blackbox(),
+                            evaluation=FunctionEvaluation(function))
+    # Each search stays in the basin of its initial point
+    left, right = solution['runs']
+    assert abs(left['point'][0] + 1.5) < 1e-3
+    assert abs(right['point'][0] - 1.5) < 1e-3
+    assert solution['point'] == right['point']
+    assert solution['n-evaluations'] == \
+           left['n-evaluations'] + right['n-evaluations']
+
+
+def test_mads_model_evaluation():
+    import os
+    import shutil
+    import tempfile
+    from ..core.algorithm import Algorithm
+    from ..core.parameter import Parameter
+    from ..core.measure import Measure
+    from ..core.modeldata import ModelData
+    from ..core.modelstructure import ModelStructure
+    from ..core.model import Model
+    from ..core.testproblem import TestProblem
+    from mads import MADSSolver
+
+    def sum_value(parameters, measures):
+        return sum(measures['VALUE'])
+
+    # The points go through the model evaluator, the data generator and
+    # the platform, which runs a shell script for each test
+    workDir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(workDir)
+    try:
+        script = open('run.sh', 'w')
+        script.write('x=`grep "^x:" $1 | cut -d: -f3`\n' + \
+                     'y=`grep "^y:" $1 | cut -d: -f3`\n' + \
+                     'awk -v x=$x -v y=$y "BEGIN {print \\"VALUE\\", ' + \
+                     '(x - 1)^2 + (y + 2)^2}" > $3\n')
+        script.close()
+        algorithm = Algorithm(name='SHELL')
+        algorithm.set_executable_command('sh run.sh')
+        for name in ['x', 'y']:
+            algorithm.add_param(Parameter(name=name, kind='real',
+                                          default=0.0, bound=[-5.0, 5.0]))
+        algorithm.add_measure(Measure(name='VALUE', kind='real'))
+        algorithm.add_parameter_constraint('x < 4')
+        model = Model(modelData=ModelData(algorithm,
+                                          problems=[TestProblem(name='P')]),
+                      modelStructure=ModelStructure(objective=sum_value),
+                      platform='SMP')
+        solver = MADSSolver()
+        solver.solution_file = None
+        solver.set_parameter(DISPLAY_DEGREE=0, MAX_BB_EVAL=20)
+        try:
+            solver.set_parameter(name='MAX_BB_EVALS', value=20)
+        except KeyError:
+            pass
+        else:
+            raise AssertionError('An unknown parameter is accepted')
+        solution = solver.solve(blackbox=model)
+        assert solution['values'][0] < 5.0
+        assert 0 < solution['n-evaluations'] <= 20
+        # The files of the runs, cancelled ones included, are removed
+        assert [name for name in os.listdir('.') \
+                if name.endswith('.param') or \
+                name.endswith('.measure')] == []
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workDir)
+
+
+def test_lazy_solvers():
+    # A fresh interpreter is needed to see which modules are imported
+    import os
+    import sys
+    import subprocess
+
+    script = '; '.join(['import sys',
+                        'from opal.Solvers.nomad import NOMADBlackbox',
+                        'from opal.Solvers import NOMAD',
+                        'print sorted([name for name in sys.modules ' + \
+                        'if name.startswith("opal.Solvers.") and ' + \
+                        'sys.modules[name] is not None])'])
+    root = os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = root
+    output = subprocess.Popen([sys.executable, '-c', script],
+                              stdout=subprocess.PIPE,
+                              env=environment).communicate()[0]
+    assert output.strip() == "['opal.Solvers.nomad']"
@@ -1,29 +1,33 @@
-import shutil
+import os
 import os.path
 import pickle
-import sys
 #from paropt.components.testenv import CUTEr as testEnvironment
 
 from ..core.testproblem import *
 
 from cuterfactory import CUTErFactory
 from cuterfactory import CUTErQuery
+from cuterfactory import LazyCUTErCollection
 
-#data_file = os.path.join(os.path.dirname(os.path.abspath(sys.modules[__name__].__file__)),'CUTEr.data')
+# The collection is kept in a CUTEr table. The pickle of the collection
+# written by the previous versions is converted at the first access.
 data_file = os.path.join(os.path.expanduser('~'),'.opal/CUTEr-1.data')
-#print data_file
-# Object definition
-try:
-    f = open(data_file,'r')
-    CUTEr = pickle.load(f)
-    f.close()
-except IOError:
+table_file = os.path.join(os.path.expanduser('~'),'.opal/CUTEr-2.table')
+
+def create_problems():
+    if not os.path.exists(os.path.dirname(table_file)):
+        os.makedirs(os.path.dirname(table_file))
+    if os.path.exists(data_file):
+        f = open(data_file,'r')
+        collection = pickle.load(f)
+        f.close()
+        return list(collection)
     classfDir = os.environ['MASTSIF']
     classfName='CLASSF.DB'  # Standard name for CUTEr classify file
     classfFile = os.path.join(classfDir, classfName)
-    CUTEr_factory = CUTErFactory(classifyFile=classfFile)
-    CUTEr = CUTEr_factory.generate_collection()
-    CUTEr.HS = CUTEr.select(CUTErQuery(name='HS\d+'))
-    f = open(data_file,'w')
-    pickle.dump(CUTEr,f)
-    f.close()
+    CUTEr_factory = CUTErFactory(classifyFile=classfFile,
+                                 cacheFile=data_file + '.decoded')
+    return list(CUTEr_factory.generate_collection())
+
+# Object definition. The collection is loaded at the first access.
+CUTEr = LazyCUTErCollection(table_file, create=create_problems)
@@ -1,8 +1,46 @@
 import os
 import shutil
 import re
+import pickle
+import tempfile
+import subprocess
+import multiprocessing
+import mmap
+import bisect
+import itertools
 from ..core.testproblem import *
 
+def parse_classification(classifyStr):
+    '''
+
+    Parse a CUTEr classification string such as `SUR2-AN-V-0` into a
+    dictionary of typed fields: the objective, constraint and smoothness
+    types, the order of the available derivatives, the origin and the
+    presence of internal variables of the problem, and the numbers of
+    variables and constraints (None if they can be chosen by the user).
+    Return None if the string can not be parsed.
+    '''
+    if classifyStr is None:
+        return None
+    fields = [field.strip() for field in classifyStr.split('-')]
+    try:
+        classification = {'objective':fields[0][0],
+                          'constraints':fields[0][1],
+                          'smoothness':fields[0][2],
+                          'order':int(fields[0][3:]),
+                          'origin':fields[1][0],
+                          'internal':fields[1][1],
+                          'nvar':None,
+                          'ncon':None}
+        if 'V' not in fields[2]:
+            classification['nvar'] = int(fields[2])
+        if 'V' not in fields[3]:
+            classification['ncon'] = int(fields[3])
+    except (IndexError, ValueError):
+        return None
+    return classification
+
+
 class CUTErTestProblem(OptimizationTestProblem):
 
     def __init__(self,
@@ -21,6 +59,129 @@ class CUTErTestProblem(OptimizationTestProblem):
                                          ncon=ncon,
                                          **kwargs)
         self.parameter_string = paramString
+        self.classification = parse_classification(classifyStr)
+
+    classification = None # Parsed on demand for the pickled problems
+
+    def get_classification(self):
+        if self.classification is None:
+            self.classification = \
+                parse_classification(self.get_classify_string())
+        return self.classification
+
+
+class CUTErIndex:
+    """
+
+    An index of the classifications of a list of CUTEr problems. A set of
+    problems is a bit mask over their positions in the list. There is a
+    mask for each value of each classification type, and the problems are
+    sorted by number of variables and by number of constraints so that the
+    problems in a range of sizes are found by bisection and given by the
+    difference of two prefix masks.
+    """
+    def __init__(self, problems):
+        self.problems = list(problems)
+        self.all = (1 << len(self.problems)) - 1
+        self.masks = {'objective':{},
+                      'constraints':{},
+                      'smoothness':{},
+                      'origin':{},
+                      'internal':{},
+                      'order':{}}
+        self.variable_masks = {'nvar':0, 'ncon':0} # Variable size problems
+        self.name_masks = {}
+        sizes = {'nvar':[], 'ncon':[]}
+        for position in range(len(self.problems)):
+            bit = 1 << position
+            classification = get_classification(self.problems[position])
+            if classification is None:
+                continue
+            for column in self.masks.keys():
+                masks = self.masks[column]
+                value = classification[column]
+                masks[value] = masks.get(value, 0) | bit
+            for column in sizes.keys():
+                if classification[column] is None:
+                    self.variable_masks[column] = \
+                        self.variable_masks[column] | bit
+                else:
+                    sizes[column].append((classification[column], position))
+        self.sizes = {}
+        self.prefix_masks = {}
+        for column in sizes.keys():
+            sizes[column].sort()
+            self.sizes[column] = [size for size, position in sizes[column]]
+            prefixMasks = [0]
+            for size, position in sizes[column]:
+                prefixMasks.append(prefixMasks[-1] | (1 << position))
+            self.prefix_masks[column] = prefixMasks
+        return
+
+    def get_value_mask(self, column, values):
+        '''
+
+        Return the mask of the problems whose classification type `column`
+        takes one of the given values
+        '''
+        mask = 0
+        for value in values:
+            mask = mask | self.masks[column].get(value, 0)
+        return mask
+
+    def get_order_mask(self, minOrder):
+        mask = 0
+        for order, orderMask in self.masks['order'].items():
+            if order >= minOrder:
+                mask = mask | orderMask
+        return mask
+
+    def get_range_mask(self, column, low, high):
+        '''
+
+        Return the mask of the problems whose size `column` ('nvar' or
+        'ncon') is in [low, high], or can be chosen by the user
+        '''
+        sizes = self.sizes[column]
+        prefixMasks = self.prefix_masks[column]
+        first = bisect.bisect_left(sizes, low)
+        last = bisect.bisect_right(sizes, high)
+        if last <= first:
+            return self.variable_masks[column]
+        return (prefixMasks[last] ^ prefixMasks[first]) | \
+               self.variable_masks[column]
+
+    def get_problems(self, mask):
+        '''
+
+        Return the problems of a mask in the order of the index
+        '''
+        bits = bin(mask)[:1:-1] # The bit of position i is bits[i]
+        return [problem \
+                for problem, bit in itertools.izip(self.problems, bits) \
+                if bit == '1']
+
+    def get_name_mask(self, nameQuery):
+        '''
+
+        Return the mask of the problems whose name matches a compiled
+        pattern. The names can not be indexed, so the mask of each pattern
+        is kept once computed.
+        '''
+        if nameQuery.pattern not in self.name_masks:
+            mask = 0
+            for position in range(len(self.problems)):
+                if nameQuery.match(self.problems[position].get_name()):
+                    mask = mask | (1 << position)
+            self.name_masks[nameQuery.pattern] = mask
+        return self.name_masks[nameQuery.pattern]
+
+
+def get_classification(problem):
+    if isinstance(problem, CUTErTestProblem):
+        return problem.get_classification()
+    return parse_classification(problem.get_classify_string())
+
 
 class CUTErQuery:
 
@@ -42,8 +203,12 @@ class CUTErQuery:
                       nMax=10,
                       objectiveType="N",
                       constraintType="U")
+
+        The name pattern is compiled once. A query selects the problems of
+        a `CUTErIndex` by combining its masks (see `get_mask`).
         """
         self.name_pattern = namePattern
+        self.name_query = re.compile(namePattern)
         self.nMin = nMin
         self.nMax = nMax
         self.mMin = mMin
@@ -55,55 +220,166 @@ class CUTErQuery:
         self.problemType = problemType
         self.internalVar = internalVar
 
+    name_query = None # Compiled on demand for the pickled queries
+
+    def match_name(self, name):
+        if self.name_query is None:
+            self.name_query = re.compile(self.name_pattern)
+        return self.name_query.match(name) is not None
+
     def match(self, problem):
-        #print self.nMax, self.mMax,  probDescStr,
-        descFields = problem.get_classify_string().split("-")
-        for i in range(len(descFields)):
-            descFields[i] = descFields[i].strip()
-        #descFields[0:] = descFields[0:].strip()
-        if re.compile(self.name_pattern).match(problem.get_name()) is None:
+        if not self.match_name(problem.get_name()):
             return False
-        if self.objectiveType.count(descFields[0][0]) <= 0:
-            #print self.objectiveType, 'is not sastified'
+        classification = get_classification(problem)
+        if classification is None:
             return False
-        if self.constraintType.count(descFields[0][1]) <= 0:
-            #print self.constraintType, 'is not sastified'
+        if classification['objective'] not in self.objectiveType:
             return False
-        if self.smoothType.count(descFields[0][2]) <= 0:
-            #print self.smoothType, 'is not sastified'
+        if classification['constraints'] not in self.constraintType:
             return False
-        if self.infoOrder > int(descFields[0][3:]):
-            #print 'info order is not sastified'
+        if classification['smoothness'] not in self.smoothType:
             return False
-        if self.problemType.count(descFields[1][0]) <= 0:
-            #print self.problemType, 'is not satisfied'
+        if self.infoOrder > classification['order']:
             return False
-        if self.internalVar.count(descFields[1][1]) <= 0:
+        if classification['origin'] not in self.problemType:
             return False
-        if descFields[2].count("V") <= 0:
-            if self.nMin > int(descFields[2]):
-                #print descFields[2],  'variables is not satisifed'
-                return False
-            if self.nMax < int(descFields[2]):
-                #print descFields[2], 'variables is not satisifed'
-                return False
-        if descFields[3].count("V") <= 0:
-            if self.mMin > int(descFields[3]):
-                #print descFields[3], 'constraints is not satisifed'
+        if classification['internal'] not in self.internalVar:
+            return False
+        if classification['nvar'] is not None:
+            if (classification['nvar'] < self.nMin) or \
+                   (classification['nvar'] > self.nMax):
                 return False
-            if self.mMax < int(descFields[3]):
-                #print descFields[3], 'constraints is not satisifed'
+        if classification['ncon'] is not None:
+            if (classification['ncon'] < self.mMin) or \
+                   (classification['ncon'] > self.mMax):
                 return False
-        #print 'Query is matched'
         return True
 
+    def get_mask(self, index):
+        '''
+
+        Return the mask of the problems of a `CUTErIndex` that match the
+        query
+        '''
+        mask = index.all & \
+               index.get_value_mask('objective', self.objectiveType) & \
+               index.get_value_mask('constraints', self.constraintType) & \
+               index.get_value_mask('smoothness', self.smoothType) & \
+               index.get_value_mask('origin', self.problemType) & \
+               index.get_value_mask('internal', self.internalVar) & \
+               index.get_order_mask(self.infoOrder) & \
+               index.get_range_mask('nvar', self.nMin, self.nMax) & \
+               index.get_range_mask('ncon', self.mMin, self.mMax)
+        if self.name_pattern != '':
+            self.match_name('') # Compile the pattern if needed
+            mask = mask & index.get_name_mask(self.name_query)
+        return mask
+
+
+class CUTErCollection(ProblemCollection):
+    """
+
+    A collection of CUTEr problems that selects the problems matching a
+    `CUTErQuery` through an index of their classifications instead of
+    matching the problems one by one. The index is built at the first
+    selection and again after the collection changes.
+    """
+    classification_index = None
+
+    def get_classification_index(self):
+        if self.classification_index is None:
+            self.classification_index = CUTErIndex(self.all_problems())
+        return self.classification_index
+
+    def index_problem(self, problem):
+        ProblemCollection.index_problem(self, problem)
+        self.classification_index = None
+        return
+
+    def reindex(self):
+        ProblemCollection.reindex(self)
+        self.classification_index = None
+        return
+
+    def select(self, query):
+        if not isinstance(query, CUTErQuery):
+            return ProblemCollection.select(self, query)
+        index = self.get_classification_index()
+        queryResult = ProblemSet(name='query result')
+        for prob in index.get_problems(query.get_mask(index)):
+            queryResult.append(prob)
+        return queryResult
+
 #==========
+
+variable_query = re.compile('[0-9]+[ a-z]+variable[s]?')
+constraint_query = re.compile('[0-9]+[ a-z]+constraint[s]?')
+number_query = re.compile('\d+')
+
+
+def parse_decode_log(decode_log):
+    '''
+
+    Return the numbers of variables and of constraints declared in the
+    output of the SIF decoder
+    '''
+    nvar = 0
+    for var_decl in variable_query.findall(decode_log):
+        nvar = nvar + int(number_query.findall(var_decl)[0])
+    ncon = 0
+    for cons_decl in constraint_query.findall(decode_log):
+        ncon = ncon + int(number_query.findall(cons_decl)[0])
+    return nvar, ncon
+
+
+def decode_problem(decoder, problem_name, param=None):
+    '''
+
+    Decode a problem and return its numbers of variables and constraints.
+    The decoder runs in a directory of its own as it writes its output
+    files in the working directory, so that several problems can be
+    decoded at the same time.
+    '''
+    decode_cmd = decoder
+    if param is None:
+        decode_cmd = decode_cmd + ' ' + problem_name
+    else:
+        decode_cmd = decode_cmd + ' -param ' + param + ' ' + problem_name
+    workDir = tempfile.mkdtemp(prefix='sifdecode-')
+    try:
+        process = subprocess.Popen(decode_cmd, shell=True, cwd=workDir,
+                                   stdout=subprocess.PIPE)
+        decode_log = process.communicate()[0]
+    finally:
+        shutil.rmtree(workDir, ignore_errors=True)
+    return parse_decode_log(decode_log)
+
+
+def decode_problem_task(arguments):
+    # A pool of processes calls a function with a single argument
+    return decode_problem(*arguments)
+
     
 class CUTErFactory:
-    def __init__(self,classifyFile=None,**kwargs):
+    """
+
+    Generate the CUTEr collection from the classification file by decoding
+    every problem to know its size. The problems are decoded by a pool of
+    `nProcesses` processes (one by CPU by default).
+
+    If `cacheFile` is given, the sizes of the decoded problems are kept in
+    it with the modification time of their SIF file, and only the problems
+    whose SIF file changed are decoded again.
+    """
+    def __init__(self,classifyFile=None,cacheFile=None,nProcesses=None,
+                 sifDir=None,**kwargs):
         self.classifyFile = classifyFile
+        self.cacheFile = cacheFile
+        self.nProcesses = nProcesses
         self.decoder = 'sifdecode'
-        self.dbDir = os.environ['MASTSIF']
+        if sifDir is None:
+            sifDir = os.environ['MASTSIF']
+        self.dbDir = sifDir
         pass
 
     def extract(self, **kwargs):
@@ -125,46 +401,98 @@ class CUTErFactory:
                 queryResult.append(fields[0].strip())
         return queryResult
 
+    def get_sif_time(self, problem_name):
+        try:
+            return os.path.getmtime(os.path.join(self.dbDir,
+                                                 problem_name + '.SIF'))
+        except OSError:
+            return None
+
+    def load_cache(self):
+        if self.cacheFile is None:
+            return {}
+        try:
+            f = open(self.cacheFile, 'rb')
+        except IOError:
+            return {}
+        try:
+            cache = pickle.load(f)
+        except (EOFError, pickle.UnpicklingError, ValueError):
+            cache = {}
+        f.close()
+        return cache
+
+    def save_cache(self, cache):
+        if self.cacheFile is None:
+            return
+        # Write then rename so that a crash never leaves a partial file
+        f = open(self.cacheFile + '.tmp', 'wb')
+        pickle.dump(cache, f, pickle.HIGHEST_PROTOCOL)
+        f.close()
+        os.rename(self.cacheFile + '.tmp', self.cacheFile)
+        return
+
+    def decode_problems(self, problem_names):
+        '''
+
+        Return the sizes of the problems as a dictionary by name. The
+        problems found in the cache with the same SIF file modification time
+        are not decoded.
+        '''
+        cache = self.load_cache()
+        sizes = {}
+        times = {}
+        decoded = []
+        for problem_name in problem_names:
+            times[problem_name] = self.get_sif_time(problem_name)
+            entry = cache.get(problem_name, None)
+            if (entry is not None) and (times[problem_name] is not None) and \
+                   (entry['time'] == times[problem_name]):
+                sizes[problem_name] = entry['size']
+            else:
+                decoded.append(problem_name)
+        tasks = [(self.decoder, problem_name) for problem_name in decoded]
+        if (self.nProcesses == 1) or (len(tasks) <= 1):
+            results = map(decode_problem_task, tasks)
+        else:
+            pool = multiprocessing.Pool(self.nProcesses)
+            try:
+                results = pool.map(decode_problem_task, tasks, chunksize=4)
+            finally:
+                pool.close()
+                pool.join()
+        for problem_name, size in zip(decoded, results):
+            sizes[problem_name] = size
+            cache[problem_name] = {'time':times[problem_name], 'size':size}
+        if len(decoded) > 0:
+            self.save_cache(cache)
+        return sizes
+
     def generate_collection(self):
         f = open(self.classifyFile, 'r')
         lines = f.readlines()
         f.close()
-        CUTEr =  ProblemCollection(name='CUTEr collection')
+        classifications = []
         for line in lines:
             line = line.strip()
             if len(line) <= 2:
                 # Emtry line with new line symbol
                 continue
-            #print line
             fields = line.split(' ',1)
-            prob = self.generate_problem(fields[0].strip(),fields[1].strip())
+            classifications.append((fields[0].strip(), fields[1].strip()))
+        sizes = self.decode_problems([problem_name \
+                                      for problem_name, classify_string \
+                                      in classifications])
+        CUTEr =  CUTErCollection(name='CUTEr collection')
+        for problem_name, classify_string in classifications:
+            prob = self.create_problem(problem_name, classify_string,
+                                       sizes[problem_name])
             if prob is not None:
                 CUTEr.add_problem(prob)
         return CUTEr
-    
-    def generate_problem(self,problem_name,classify_string=None,param=None):  
-        decode_cmd = self.decoder
-        if param is None:
-            decode_cmd = decode_cmd + ' ' + problem_name
-        else:
-            decode_cmd = decode_cmd + ' -param ' + param + ' ' + problem_name 
-        f = os.popen(decode_cmd)
-        decode_log = f.read()
-        f.close()
-        variable_query = re.compile('[0-9]+[ a-z]+variable[s]?')
-        constraint_query = re.compile('[0-9]+[ a-z]+constraint[s]?')
-        number_query = re.compile('\d+')
-        nvar = 0
-        variable_declarations = variable_query.findall(decode_log)
-        #print problem_name,
-        for var_decl in variable_declarations:
-            #print var_decl,
-            nvar = nvar + int(number_query.findall(var_decl)[0])
-        #print ''
-        constraint_declarations = constraint_query.findall(decode_log)
-        ncon = 0
-        for cons_decl in constraint_declarations:
-            ncon = ncon + int(number_query.findall(cons_decl)[0])
+
+    def create_problem(self, problem_name, classify_string, size):
+        nvar, ncon = size
         if (nvar + ncon <= 0):
             return None
             # There is no problem nvar + ncon = 0
@@ -172,4 +500,174 @@ class CUTErFactory:
                                    classifyStr=classify_string,
                                    nvar=nvar,
                                    ncon=ncon)
-        return problem          
+        return problem
+
+    def generate_problem(self,problem_name,classify_string=None,param=None):
+        return self.create_problem(problem_name, classify_string,
+                                   decode_problem(self.decoder,
+                                                  problem_name,
+                                                  param))
+
+
+class CUTErTable:
+    """
+
+    A compact file of the CUTEr problems: a header line followed by one
+    line by problem with its name, its classification string and its
+    numbers of variables and constraints, separated by tabulations. The
+    file is memory-mapped so that a problem is found by name without
+    reading the other ones.
+    """
+    header = 'OPAL CUTEr table 1\n'
+
+    def __init__(self, fileName):
+        self.file_name = fileName
+        self.map = None
+        return
+
+    def write(self, problems):
+        # Write then rename so that a crash never leaves a partial file
+        f = open(self.file_name + '.tmp', 'wb')
+        f.write(self.header)
+        for prob in problems:
+            f.write('\t'.join([prob.name,
+                               str(prob.get_classify_string()),
+                               str(prob.nvar),
+                               str(prob.ncon)]) + '\n')
+        f.close()
+        os.rename(self.file_name + '.tmp', self.file_name)
+        self.close()
+        return
+
+    def exists(self):
+        return os.path.exists(self.file_name)
+
+    def open(self):
+        if self.map is None:
+            f = open(self.file_name, 'rb')
+            try:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            finally:
+                f.close()
+            if self.map[:len(self.header)] != self.header:
+                self.close()
+                raise Exception(self.file_name + ' is not a CUTEr table')
+        return self.map
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        return
+
+    def create_problem(self, line):
+        name, classifyStr, nvar, ncon = line.split('\t')
+        if classifyStr == 'None':
+            classifyStr = None
+        return CUTErTestProblem(name=name, classifyStr=classifyStr,
+                                nvar=int(nvar), ncon=int(ncon))
+
+    def find(self, problem_name):
+        '''
+
+        Return the problem of the given name, or None if it is not in the
+        table
+        '''
+        table = self.open()
+        start = table.find('\n' + problem_name + '\t')
+        if start < 0:
+            return None
+        end = table.find('\n', start + 1)
+        return self.create_problem(table[start + 1:end])
+
+    def read(self):
+        '''
+
+        Return the list of all of the problems of the table
+        '''
+        lines = self.open()[len(self.header):].splitlines()
+        return [self.create_problem(line) for line in lines if line != '']
+
+
+class LazyCUTErCollection:
+    """
+
+    A stand-in for the CUTEr collection that loads it at the first access
+    only, so that importing a declaration that refers to CUTEr costs
+    nothing when the collection is not used.
+
+    The collection is read from a `CUTErTable`. The problems asked by name
+    are found in the table without loading the whole collection and are
+    reused when it is loaded. If the table does not exist, the collection
+    is given by `create` (a function returning the problems) and saved in
+    the table.
+    """
+    def __init__(self, tableFile, create=None):
+        self.table = CUTErTable(tableFile)
+        self.create = create
+        self.collection = None
+        self.problems = {} # Problems found by name before the loading
+        return
+
+    def get_collection(self):
+        if self.collection is None:
+            if self.table.exists():
+                problems = self.table.read()
+            elif self.create is not None:
+                problems = self.create()
+                self.table.write(problems)
+            else:
+                raise Exception('The CUTEr collection can not be found in ' +\
+                                self.table.file_name)
+            collection = CUTErCollection(name='CUTEr collection')
+            for prob in problems:
+                collection.add_problem(self.problems.get(prob.name, prob))
+            collection.HS = collection.select(CUTErQuery(namePattern='HS\d+'))
+            self.collection = collection
+            self.table.close()
+        return self.collection
+
+    def find(self, problem_name):
+        if self.collection is not None:
+            if problem_name in self.collection:
+                return self.collection[problem_name]
+            return None
+        if problem_name not in self.problems:
+            if not self.table.exists():
+                self.get_collection()
+                return self.find(problem_name)
+            problem = self.table.find(problem_name)
+            if problem is None:
+                return None
+            self.problems[problem_name] = problem
+        return self.problems[problem_name]
+
+    def __getitem__(self, key):
+        if isinstance(key, basestring):
+            problem = self.find(key)
+            if problem is None:
+                raise IndexError, 'Element can not be found in the set'
+            return problem
+        return self.get_collection()[key]
+
+    def __contains__(self, prob):
+        if isinstance(prob, basestring):
+            return self.find(prob) is not None
+        return prob in self.get_collection()
+
+    def __iter__(self):
+        return iter(self.get_collection())
+
+    def __len__(self):
+        return len(self.get_collection())
+
+    def __nonzero__(self):
+        # The truth value would be given by __len__, which loads the
+        # collection
+        return True
+
+    def __getattr__(self, name):
+        # Called for the attributes of the collection only
+        if name.startswith('__') or (name in ['table', 'collection']):
+            raise AttributeError, name
+        return getattr(self.get_collection(), name)
@@ -0,0 +1,143 @@
+def create_collection(nProblems, seed=0):
+    import random
+    from cuterfactory import CUTErTestProblem
+    from cuterfactory import CUTErCollection
+
+    generator = random.Random(seed)
+    collection = CUTErCollection(name='CUTEr collection')
+    for i in range(nProblems):
+        size = generator.choice(['V', '2', '10', '50', '1000'])
+        classifyStr = generator.choice('NCLQSO') + \
+                      generator.choice('UXBNLQO') + \
+                      generator.choice('IR') + \
+                      str(generator.choice([0, 1, 2])) + '-' + \
+                      generator.choice('AMR') + generator.choice('YN') + \
+                      '-' + size + '-' + generator.choice(['V', '0', '5'])
+        name = generator.choice(['HS', 'PROB', 'TEST']) + str(i)
+        collection.add_problem(CUTErTestProblem(name=name,
+                                                classifyStr=classifyStr))
+    return collection
+
+
+def test_cuter_query():
+    from cuterfactory import CUTErTestProblem
+    from cuterfactory import CUTErQuery
+    from cuterfactory import parse_classification
+
+    assert parse_classification('SUR2-AN-V-0') == \
+           {'objective':'S', 'constraints':'U', 'smoothness':'R',
+            'order':2, 'origin':'A', 'internal':'N', 'nvar':None, 'ncon':0}
+    assert parse_classification('BAD') is None
+    collection = create_collection(300)
+    queries = [CUTErQuery(),
+               CUTErQuery(namePattern='HS\d+'),
+               CUTErQuery(objectiveType='SQ', constraintType='U'),
+               CUTErQuery(nMin=5, nMax=100, mMax=0, infoOrder=1),
+               CUTErQuery(namePattern='PROB', problemType='R',
+                          internalVar='Y', smoothType='R'),
+               CUTErQuery(nMin=2000)]
+    for query in queries:
+        selected = [prob.name for prob in collection.select(query)]
+        matched = [prob.name for prob in collection if query.match(prob)]
+        assert selected == matched
+    # The index follows the changes of the collection
+    n = len(collection.select(CUTErQuery(namePattern='NEW')))
+    collection.add_problem(CUTErTestProblem(name='NEW',
+                                            classifyStr='SUR2-AN-V-0'))
+    assert len(collection.select(CUTErQuery(namePattern='NEW'))) == n + 1
+
+
+def test_cuter_generation():
+    import os
+    import stat
+    import shutil
+    import tempfile
+    from cuterfactory import CUTErFactory
+
+    # A fake SIF decoder that prints the content of the SIF file and keeps
+    # track of its calls
+    sifDir = tempfile.mkdtemp()
+    decoder = os.path.join(sifDir, 'sifdecode')
+    f = open(decoder, 'w')
+    f.write('#!/bin/sh\n' + \
+            'echo $1 >> ' + os.path.join(sifDir, 'calls') + '\n' + \
+            'cat ' + sifDir + '/$1.SIF\n')
+    f.close()
+    os.chmod(decoder, stat.S_IRWXU)
+    sizes = {'ROSENBR':(2, 0), 'HS13':(2, 1), 'EMPTY':(0, 0), 'WOODS':(4, 0)}
+    for name, (nvar, ncon) in sizes.items():
+        f = open(os.path.join(sifDir, name + '.SIF'), 'w')
+        f.write('  %d free variables\n  %d linear constraints\n' % \
+                (nvar, ncon))
+        f.close()
+    classifyFile = os.path.join(sifDir, 'CLASSF.DB')
+    f = open(classifyFile, 'w')
+    f.write('ROSENBR  SUR2-AN-2-0\nHS13  QOR2-AN-2-1\n' + \
+            'EMPTY  NUR2-AN-0-0\nWOODS  SUR2-AN-4-0\n')
+    f.close()
+
+    def get_calls():
+        if not os.path.exists(os.path.join(sifDir, 'calls')):
+            return []
+        f = open(os.path.join(sifDir, 'calls'))
+        calls = sorted([line.strip() for line in f])
+        f.close()
+        os.remove(os.path.join(sifDir, 'calls'))
+        return calls
+
+    factory = CUTErFactory(classifyFile=classifyFile,
+                           cacheFile=os.path.join(sifDir, 'cache'),
+                           nProcesses=2,
+                           sifDir=sifDir)
+    factory.decoder = decoder
+    collection = factory.generate_collection()
+    assert [(prob.name, prob.nvar, prob.ncon) for prob in collection] == \
+           [('ROSENBR', 2, 0), ('HS13', 2, 1), ('WOODS', 4, 0)]
+    assert get_calls() == ['EMPTY', 'HS13', 'ROSENBR', 'WOODS']
+    # Only the problems whose SIF file changed are decoded again
+    factory.generate_collection()
+    assert get_calls() == []
+    sifFile = os.path.join(sifDir, 'WOODS.SIF')
+    os.utime(sifFile, (os.path.getmtime(sifFile) + 10,) * 2)
+    collection = factory.generate_collection()
+    assert get_calls() == ['WOODS']
+    assert collection['WOODS'].nvar == 4
+    shutil.rmtree(sifDir)
+
+
+def test_lazy_collection():
+    import os
+    import tempfile
+    from cuterfactory import CUTErTable
+    from cuterfactory import LazyCUTErCollection
+    from CUTEr import CUTEr
+
+    # Importing the collection does not load it
+    assert CUTEr.collection is None
+
+    problems = list(create_collection(50))
+    tableFile = tempfile.mktemp(suffix='.table')
+    created = []
+    def create():
+        created.append(True)
+        return problems
+    collection = LazyCUTErCollection(tableFile, create=create)
+    assert len(collection) == 50 # Created and saved in the table
+    assert len(created) == 1
+    collection = LazyCUTErCollection(tableFile, create=create)
+    name = problems[10].name
+    problem = collection[name]
+    assert (problem.nvar, problem.ncon) == (problems[10].nvar,
+                                            problems[10].ncon)
+    assert problem.get_classification() == problems[10].get_classification()
+    assert 'MISSING' not in collection
+    assert collection
+    assert collection.collection is None # Found in the table only
+    assert [prob.name for prob in collection] == \
+           [prob.name for prob in problems]
+    assert collection.get_collection()[name] is problem
+    assert [prob.name for prob in collection.HS] == \
+           [prob.name for prob in problems if prob.name.startswith('HS')]
+    assert len(created) == 1
+    CUTErTable(tableFile).close()
+    os.remove(tableFile)
@@ -9,6 +9,11 @@ from measure import Measure
 
 
 __docformat__ = 'restructuredtext'
+
+# Reason codes of Algorithm.check_points
+FEASIBLE = 0
+OUT_OF_BOUNDS = 1
+CONSTRAINT_VIOLATED = 2
   
 class Algorithm:
     """
@@ -55,6 +60,8 @@ class Algorithm:
       >>> print [param.name for param in real_params]
       ['DELMIN']
     """
+    output_extractor = None # Extractor of the measures from the standard
+                            # output (see `set_output_extractor`)
 
     def __init__(self, name=None, description=None, **kwargs):
        
@@ -72,6 +79,7 @@ class Algorithm:
         self.parameter_file = self.name + '.param'
         self.sessions = {} # dictionary map between session id and parameter
                            # values
+        self.output_extractor = None
 
     def add_param(self, param):
         "Add a parameter to an algorithm"
@@ -127,7 +135,9 @@ class Algorithm:
     def write_parameter(self, fileName):
         f = open(fileName, 'w')
         for param in self.parameters:
-            f.write(param.name + ':' +  param.kind + ':' + \
+            # The type is written rather than the kind, which is 'const'
+            # for a parameter fixed by set_as_const
+            f.write(param.name + ':' +  param.get_type() + ':' + \
                     str(param.value) + '\n')
         f.close()
         return
@@ -151,7 +161,6 @@ class Algorithm:
         f = open(fileName)
         lines = f.readlines()
         f.close()
-        converters = {'categorical':str, 'integer':int, 'real':float}
         measure_values = {}
         for line in lines:
             line.strip('\n')
@@ -164,15 +173,38 @@ class Algorithm:
             if measureName not in self.measures:
                 continue
             measure_values[measureName] = fields[1].strip(' ')
-        for i in range(len(self.measures)):
-            convert = converters[self.measures[i].get_type()]
+        return self.convert_measures(measure_values)
+
+    def convert_measures(self, values):
+        """
+
+        Convert the values of the measures, read by `read_measure` or
+        extracted from the output of the executable, to the types of the
+        measures. Return None if a measure is missing or has an invalid
+        value.
+        """
+        converters = {'categorical':str, 'integer':int, 'real':float}
+        measure_values = {}
+        for measure in self.measures:
+            convert = converters[measure.get_type()]
             try:
-                measure_values[self.measures[i].name] = \
-                    convert(measure_values[self.measures[i].name])
-            except ValueError:
+                measure_values[measure.name] = convert(values[measure.name])
+            except (KeyError, TypeError, ValueError):
                 return None
         return measure_values
 
+    def set_output_extractor(self, extractor):
+        """
+
+        Extract the measures from the standard output of the executable, as
+        it runs, by the given `MeasureExtractor` rather than reading them
+        from the output file once the executable is finished. The platforms
+        that run the commands on the local machine support it; the other
+        ones still read the output file.
+        """
+        self.output_extractor = extractor
+        return
+
     def solve(self, problem, parameters=None, parameterTag=None ):
         """
         .. warning::
@@ -247,4 +279,64 @@ class Algorithm:
             if not param.is_valid():
                 return False
         return True
+
+    def check_points(self, points, parameters=None):
+        """
+
+        Check a batch of candidate points without changing the parameters.
+        `points` is an array of N points by d values, the values of the
+        given d parameters (or parameter names), which are all of the
+        parameters of the algorithm by default. The other parameters are
+        taken at their current value.
+
+        Return a pair of arrays of length N: the mask of the feasible points
+        and the reason codes, FEASIBLE, OUT_OF_BOUNDS if a value is out of
+        the bounds of its parameter (the first reason checked) or
+        CONSTRAINT_VIOLATED if a constraint is not satisfied.
+        """
+        import numpy
+        if parameters is None:
+            parameters = list(self.parameters)
+        names = [param if isinstance(param, basestring) else param.name \
+                 for param in parameters]
+        nPoints = len(points)
+        # An object array keeps the values of the categorical parameters
+        points = numpy.asarray(points, dtype=object).reshape(nPoints,
+                                                             len(names))
+        inBounds = numpy.ones(nPoints, dtype=bool)
+        values = {}
+        for param in self.parameters:
+            if param.name not in names:
+                values[param.name] = param.value
+                if not param.is_valid():
+                    inBounds[:] = False
+                continue
+            column = points[:, names.index(param.name)]
+            # The values are converted as by Parameter.set_value
+            if param.is_real:
+                column = column.astype(float)
+            elif param.is_integer:
+                column = column.astype(float).astype(int)
+            values[param.name] = column
+            if param.bound is None:
+                continue
+            if param.is_categorical:
+                inBounds &= numpy.array([value in param.bound \
+                                         for value in column], dtype=bool)
+                continue
+            if param.bound[0] is not None:
+                inBounds &= (column >= param.bound[0])
+            if param.bound[1] is not None:
+                inBounds &= (column <= param.bound[1])
+        satisfied = numpy.ones(nPoints, dtype=bool)
+        for constraint in self.constraints:
+            satisfied &= constraint.evaluate(dict(
+                [(name, values[name]) for name in constraint.get_names() \
+                 if name in values]))
+        reasons = numpy.where(inBounds,
+                              numpy.where(satisfied,
+                                          FEASIBLE,
+                                          CONSTRAINT_VIOLATED),
+                              OUT_OF_BOUNDS)
+        return inBounds & satisfied, reasons
     
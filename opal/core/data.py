@@ -73,15 +73,7 @@ class DataSet(Set):
     """
     def __init__(self,name="", elements=[], 
                  *argv,**kwargv):
-        self.name = name
-        self.indices = {}
-        self.db = []
-        if len(elements) > 0:
-            index = 0
-            for elem in elements:
-                self.indices[elem.identify()] = index
-                self.db.append(elem)
-                index = index + 1
+        Set.__init__(self, name=name, elements=elements)
         return
 
     def set_values(self, values=None, *args, **kwargs):
@@ -123,17 +115,17 @@ class DataSet(Set):
         
         if (len(valueList) <= 0) and (len(valueDict) <= 0):
             # Set value to the default
-            for elem in self.db.values():
+            for elem in self:
                 elem.set_value(None)
         else:    
             # Set the values in the list first
-            for elem, value in itertools.izip(self.db, valueList):
+            for elem, value in itertools.izip(self, valueList):
                 elem.set(value)
             # The values in the dictionary is added of
             # correct the ones are set by the list
             for elemId in valueDict.keys():
-                if elemId in self.indices.keys():
-                    self.db[self.indices[elemId]].set(valueDict[elemId])
+                if elemId in self.indices:
+                    self[elemId].set(valueDict[elemId])
         return
 
     def select(self, query):
@@ -143,9 +135,9 @@ class DataSet(Set):
         Set object
         '''
         queryResult = DataSet(name='query-result')
-        for elem in self.db:
+        for elem in self:
             if query.match(elem):
-                queryResult.append(prob)
+                queryResult.append(elem)
         return queryResult
 
 
@@ -15,6 +15,8 @@ from data import Data
 from mafrw import *
 
 from platform import Platform
+from statistics import Sample
+from history import ResultStore
 from ..Platforms import supported_platforms
 
 from .. import config
@@ -31,9 +33,29 @@ class DataGenerator(Agent):
     2. the set of elementary measures concerned 
     3. the set of parameters to control
     4. the test problems set.
+
+    If some of the measures are noisy, the run of a parameter point on a
+    problem is repeated until the confidence intervals of the means of the
+    noisy measures are tight enough. The repetition is controlled by the
+    options:
+
+    - `min_repetitions`, `max_repetitions`: bounds on the number of runs,
+    - `precision`: the targeted half width of the confidence interval
+      relative to the mean,
+    - `confidence`: the confidence level of the intervals.
+
+    The runs stop earlier if the point is shown to be worse on this problem
+    than the incumbent, i.e. the smallest means observed so far. The
+    reported measure values are the means. The number of runs and the
+    variances come along with them.
+
+    If the option `result_store` names a file, the measure values of every
+    completed run are saved in it, and the runs whose results are already
+    stored are not executed again: their results are replayed. This is how
+    an interrupted campaign is resumed.
     """
 
-    def __init__(self, 
+    def __init__(self,
                  name='data generator',
                  algorithm=None, 
                  parameters=None,
@@ -75,11 +97,31 @@ class DataGenerator(Agent):
 
         self.platform_description = platform
         
-        self.options = {'interruptible':True}
+        self.options = {'interruptible':True,
+                        'min_repetitions':2,
+                        'max_repetitions':1,
+                        'precision':0.05,
+                        'confidence':0.95,
+                        'result_store':None,
+                        'measure_limits':None}
         if options is not None:
             self.options.update(options)
         self.options.update(kwargs)
 
+        self.noisy_measures = [measure.name for measure in self.measures \
+                               if measure.is_noisy()]
+        self.samples = {} # Statistics of the noisy measures of the runs
+                          # that are being repeated
+        self.incumbents = {} # Smallest means of the noisy measures
+                             # by problem
+        self.terminated = set() # Tags of the terminated experiments that
+                                # still have runs
+        self.stopped_runs = set() # Session tags of the runs that exceeded a
+                                  # measure limit
+        self.result_store = None
+        if self.options['result_store'] is not None:
+            self.result_store = ResultStore(self.options['result_store'])
+
         #self.platform = platform
         
         
@@ -88,12 +130,18 @@ class DataGenerator(Agent):
         # self.logger = log.OPALLogger(name='modelData', handlers=logHandlers)
       
         self.experiments = {} # List of all experiements in executions
+        self.n_submissions = 0 # Number of runs submitted to the platform
         self.message_handlers['cfp-evaluate-parameter'] = self.run_experiment
         self.message_handlers['cfp-collect-result'] = self.get_result
+        self.message_handlers['inform-tasks-cancelled'] = self.forget_runs
+        self.message_handlers['inform-partial-measure-values'] = \
+                                                   self.check_partial_measures
         self.message_handlers['inform-objective-partially-exceed'] = \
                                                      self.terminate_experiment
         self.message_handlers['inform-constraint-partially-violated'] = \
                                                      self.terminate_experiment
+        self.message_handlers['inform-evaluation-cancelled'] = \
+                                                     self.terminate_experiment
         return
 
     def register(self, environment):
@@ -161,6 +209,8 @@ class DataGenerator(Agent):
             parameterTag = info['proposition']['tag']
         else:
             parameterTag = self.create_tag()
+        # The evaluation is resumed
+        self.terminated.discard(parameterTag)
         # If the parameters are invalid, send a message informing the
         # experiment is failed
         if not self.algorithm.are_parameters_valid():
@@ -177,30 +227,139 @@ class DataGenerator(Agent):
         # Otherwise, for each problem, send a cfp message that propose execute
         # the algorithm. The content of message is the execution command
         for prob in self.problems:
-            # Get the elements relating execution of an experiment
-            cmd, paramFile, outputFile, sessionTag = \
-                 self.algorithm.solve(problem=prob,
-                                      parameters=self.parameters,
-                                      parameterTag=parameterTag)
-            # Update the experiment database
-            self.experiments[sessionTag] = {'parameter-tag':parameterTag,
-                                            'parameter-file': paramFile,
-                                            'output-file':outputFile,
-                                            'problem-name':prob.name}
-            # Create a message having intention of provoking the command of
-            # solving the test problem by algorithm
-            message = Message(sender=self.id,
-                              performative='cfp',
-                              content={'action':'execute',
-                                       'proposition':{'command':cmd,
-                                                      'tag':sessionTag,
-                                                      'queue':parameterTag}}
-                              )
-            self.send_message(message)
+            self.execute(prob, parameterValues, parameterTag)
+        return
+
+    def execute(self, problem, parameterValues, parameterTag, repetition=0):
+        '''
+
+        Send a cfp message that proposes to solve the problem by the
+        algorithm with the given parameter values.
+        '''
+        if (repetition == 0) and (self.result_store is not None):
+            stored = self.result_store.get(parameterTag, problem.name)
+            if stored is not None:
+                self.replay_result(problem, parameterTag, *stored)
+                return
+        if repetition > 0:
+            self.update_parameter(parameterValues)
+        # Each submission has its own session tag, and thus its own files,
+        # even when a point is evaluated again while its previous runs are
+        # still going on
+        self.n_submissions = self.n_submissions + 1
+        runTag = parameterTag + '_' + str(self.n_submissions)
+        # Get the elements relating execution of an experiment
+        cmd, paramFile, outputFile, sessionTag = \
+             self.algorithm.solve(problem=problem,
+                                  parameters=self.parameters,
+                                  parameterTag=runTag)
+        # Update the experiment database
+        self.experiments[sessionTag] = {'parameter-tag':parameterTag,
+                                        'parameter-values':parameterValues,
+                                        'parameter-file': paramFile,
+                                        'output-file':outputFile,
+                                        'problem':problem,
+                                        'problem-name':problem.name,
+                                        'repetition':repetition}
+        # Create a message having intention of provoking the command of
+        # solving the test problem by algorithm
+        proposition = {'command':cmd,
+                       'tag':sessionTag,
+                       'queue':parameterTag}
+        if self.algorithm.output_extractor is not None:
+            # Each run gets its own extractor
+            proposition['extractor'] = self.algorithm.output_extractor.copy()
+            # The measures are streamed to stop the runs that exceed a limit
+            if self.options['measure_limits']:
+                proposition['stream-measures'] = True
+        message = Message(sender=self.id,
+                          performative='cfp',
+                          content={'action':'execute',
+                                   'proposition':proposition}
+                          )
+        self.send_message(message)
         return
 
+    def replay_result(self, problem, parameterTag, measureValues, statistics):
+        message = Message(sender=self.id,
+                          performative='inform',
+                          content={'proposition':\
+                                   {'what':'measure-values',
+                                    'values':measureValues,
+                                    'statistics':statistics,
+                                    'parameter-tag':parameterTag,
+                                    'problem':problem.name}
+                                   }
+                          )
+        self.send_message(message)
+        return
+
+    def is_repeated(self):
+        return (len(self.noisy_measures) > 0) and \
+               (self.options['max_repetitions'] > 1)
+
+    def add_sample(self, paramTag, problem, measureValues):
+        key = (paramTag, problem)
+        if key not in self.samples:
+            self.samples[key] = {}
+            for measure in self.noisy_measures:
+                self.samples[key][measure] = Sample()
+        for measure in self.noisy_measures:
+            self.samples[key][measure].add(measureValues[measure])
+        return self.samples[key]
+
+    def is_sampling_complete(self, problem, samples):
+        '''
+
+        Return a pair of booleans. The first one is True if the runs need
+        not be repeated anymore, either because the means of the noisy
+        measures are precise enough or because one of them is significantly
+        greater than the incumbent one. The second one is True only in the
+        first case.
+        '''
+        n = len(samples[self.noisy_measures[0]])
+        if n < self.options['min_repetitions']:
+            return False, False
+        precise = True
+        for measure in self.noisy_measures:
+            sample = samples[measure]
+            halfWidth = sample.get_half_width(self.options['confidence'])
+            if (problem in self.incumbents) and \
+                   (measure in self.incumbents[problem]) and \
+                   (sample.get_mean() - halfWidth > \
+                    self.incumbents[problem][measure]):
+                return True, False
+            if halfWidth > self.options['precision']*abs(sample.get_mean()):
+                precise = False
+        if precise:
+            return True, True
+        return (n >= self.options['max_repetitions']), False
+
+    def update_incumbent(self, problem, samples):
+        if problem not in self.incumbents:
+            self.incumbents[problem] = {}
+        incumbent = self.incumbents[problem]
+        for measure in self.noisy_measures:
+            mean = samples[measure].get_mean()
+            if (measure not in incumbent) or (mean < incumbent[measure]):
+                incumbent[measure] = mean
+        return
+
+    def summarize_samples(self, samples, measureValues):
+        '''
+
+        Replace the values of the noisy measures by their means and return
+        their variances
+        '''
+        variances = {}
+        for measure in self.noisy_measures:
+            measureValues[measure] = samples[measure].get_mean()
+            variances[measure] = samples[measure].get_variance()
+        return measureValues, variances
+
     def terminate_experiment(self, info):
         paramTag = info['proposition']['parameter-tag']
+        self.terminated.add(paramTag)
         message = Message(sender=self.id,
                           performative='cfp',
                           content={'action':'cancel-queue',
@@ -208,8 +367,77 @@ class DataGenerator(Agent):
                                    }
                           )
         self.send_message(message)
+        self.release_tag(paramTag)
+        return
+
+    def release_tag(self, paramTag):
+        '''
+
+        Forget the termination of an experiment once none of its runs is
+        left
+        '''
+        if paramTag not in self.terminated:
+            return
+        for exprInfo in self.experiments.itervalues():
+            if exprInfo['parameter-tag'] == paramTag:
+                return
+        self.terminated.discard(paramTag)
         return
     
+    def remove_run_files(self, exprInfo):
+        for fileName in [exprInfo['parameter-file'],
+                         exprInfo['output-file']]:
+            if os.path.exists(fileName):
+                os.remove(fileName)
+        return
+
+    def forget_runs(self, info):
+        '''
+
+        Handle the message that informs that the platform removed queued
+        runs. Their entries and files are deleted.
+        '''
+        for sessionTag in info['proposition']['session-tags']:
+            self.stopped_runs.discard(sessionTag)
+            exprInfo = self.experiments.pop(sessionTag, None)
+            if exprInfo is None:
+                continue
+            self.samples.pop((exprInfo['parameter-tag'],
+                              exprInfo['problem-name']), None)
+            self.remove_run_files(exprInfo)
+            self.release_tag(exprInfo['parameter-tag'])
+        return
+
+    def check_partial_measures(self, info):
+        '''
+
+        Handle the measures found so far in the output of a run. The run is
+        stopped as soon as one of them exceeds its limit, given by the option
+        `measure_limits`, and it is then collected as a failed run, even if
+        it has ended before the platform could stop it.
+        '''
+        limits = self.options['measure_limits']
+        if not limits:
+            return
+        proposition = info['proposition']
+        sessionTag = proposition['session-tag']
+        if (sessionTag not in self.experiments) or \
+               (sessionTag in self.stopped_runs):
+            return
+        for name, value in proposition['values'].items():
+            if (limits.get(name, None) is not None) and \
+                   (value > limits[name]):
+                self.stopped_runs.add(sessionTag)
+                message = Message(sender=self.id,
+                                  performative='cfp',
+                                  content={'action':'stop-task',
+                                           'proposition':{'tag':sessionTag}
+                                           }
+                                  )
+                self.send_message(message)
+                return
+        return
+
     def get_result(self, info=None):
         '''
 
@@ -221,20 +449,57 @@ class DataGenerator(Agent):
             return
         proposition =  info['proposition']
         sessionTag = proposition['session-tag']
+        if sessionTag not in self.experiments: # The run has been forgotten
+            return
         exprInfo = self.experiments[sessionTag]
         outputFile = exprInfo['output-file']
         problem = exprInfo['problem-name']
         paramTag = exprInfo['parameter-tag']
         paramFile = exprInfo['parameter-file']
-        measureValues = self.algorithm.read_measure(outputFile)
+        why = 'result-collection-failed'
+        if sessionTag in self.stopped_runs:
+            # A measure of the run has exceeded its limit
+            self.stopped_runs.discard(sessionTag)
+            why = 'run-stopped'
+            measureValues = None
+        elif proposition.get('how', 'no-error') != 'no-error':
+            # The task has failed before producing its result
+            measureValues = None
+        elif 'measure-values' in proposition:
+            # The measures are extracted from the output by the task
+            measureValues = self.algorithm.convert_measures(
+                proposition['measure-values'])
+        else:
+            measureValues = self.algorithm.read_measure(outputFile)
+        statistics = {'repetitions':1}
+        if (measureValues is not None) and self.is_repeated():
+            samples = self.add_sample(paramTag, problem, measureValues)
+            complete, precise = self.is_sampling_complete(problem, samples)
+            if (not complete) and (paramTag not in self.terminated):
+                # Clean up and run again
+                del self.experiments[sessionTag]
+                self.remove_run_files(exprInfo)
+                self.execute(exprInfo['problem'],
+                             exprInfo['parameter-values'],
+                             paramTag,
+                             repetition=exprInfo['repetition'] + 1)
+                return
+            del self.samples[(paramTag, problem)]
+            if precise:
+                self.update_incumbent(problem, samples)
+            measureValues, variances = self.summarize_samples(samples,
+                                                              measureValues)
+            statistics = {'repetitions':exprInfo['repetition'] + 1,
+                          'variances':variances}
         if measureValues is None:
+            self.samples.pop((paramTag, problem), None)
             #self.logger.log('DEBUG for ' + paramTag + \
             #                ' create inform-experiment-failed message')
             message = Message(sender=self.id,
                               performative='inform',
                               content={'proposition':\
                                        {'what':'experiment-failed',
-                                        'why':'result-collection-failed',
+                                        'why':why,
                                         'measure-values':measureValues,
                                         'parameter-tag':paramTag,
                                         'problem':problem}
@@ -252,25 +517,25 @@ class DataGenerator(Agent):
             #self.logger.log('DEBUG for ' + paramTag + str(message.content))
             ## return
         else:
+            if self.result_store is not None:
+                self.result_store.add(paramTag, problem, measureValues,
+                                      statistics)
             message = Message(sender=self.id,
                               performative='inform',
                               content={'proposition':\
                                        {'what':'measure-values',
                                         'values':measureValues,
+                                        'statistics':statistics,
                                         'parameter-tag':paramTag,
                                         'problem':problem}
                                        }
                               )
         self.send_message(message)
         #self.logger.log('DEBUG for ' + paramTag + str(message.content))
-        # Remove the information entry
+        # Remove the information entry, the parameter and the measure files
         del self.experiments[sessionTag]
-        # Remove the parameter file
-        if os.path.exists(paramFile):
-            os.remove(paramFile)
-        # Remove the measure file
-        if os.path.exists(outputFile):
-            os.remove(outputFile)
+        self.remove_run_files(exprInfo)
+        self.release_tag(paramTag)
         return
         
         
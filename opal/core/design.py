@@ -0,0 +1,320 @@
+"""
+
+This module evaluates a model at the points of a design of experiments
+without any solver in the loop. The design is a set of points of the unit
+hypercube, a Latin hypercube, a Sobol sequence or a full grid, mapped onto
+the ranges of the parameters. All of the points are submitted at once so
+that the platform of the model runs their tests with full parallelism,
+each distinct point being evaluated only once. The results are gathered
+in a columnar table, for example to fit a surrogate or to screen the
+parameters.
+"""
+import os
+import csv
+import shutil
+import tempfile
+import numpy
+
+from history import get_history_file
+from history import get_history_end
+from history import load_history
+from history import create_point_tag
+
+__docformat__ = 'restructuredtext'
+
+
+# Primitive polynomials (degree, interior coefficients) and initial
+# direction numbers of the Sobol sequence from the dimension 2 on, after
+# S. Joe and F. Y. Kuo
+SOBOL_DIRECTIONS = [(1, 0, [1]),
+                    (2, 1, [1, 3]),
+                    (3, 1, [1, 3, 1]),
+                    (3, 2, [1, 1, 1]),
+                    (4, 1, [1, 1, 3, 3]),
+                    (4, 4, [1, 3, 5, 13]),
+                    (5, 2, [1, 1, 5, 5, 17]),
+                    (5, 4, [1, 1, 5, 5, 5]),
+                    (5, 7, [1, 1, 7, 11, 19]),
+                    (5, 11, [1, 1, 5, 1, 1]),
+                    (5, 13, [1, 1, 1, 3, 11]),
+                    (5, 14, [1, 3, 5, 5, 31]),
+                    (6, 1, [1, 3, 3, 9, 7, 49]),
+                    (6, 13, [1, 1, 1, 15, 21, 21]),
+                    (6, 16, [1, 3, 1, 13, 27, 49])]
+
+SOBOL_BITS = 30
+
+
+def get_parameter_range(param):
+    '''
+
+    Return the range over which a numerical parameter is sampled: its
+    bounds, where a missing bound is replaced by the default value shifted
+    by its magnitude (or by 1 if it is zero)
+    '''
+    low = None
+    high = None
+    if param.bound is not None:
+        low, high = param.bound
+    default = float(param.get_default())
+    if low is None:
+        low = default - max(abs(default), 1.0)
+    if high is None:
+        high = default + max(abs(default), 1.0)
+    if high <= low:
+        raise Exception('The parameter ' + param.name + \
+                        ' has an empty range')
+    return float(low), float(high)
+
+
+def save_parameter_values(model):
+    '''
+
+    Return the current values of the parameters of a model and of its
+    algorithm. The evaluation of a point sets them to its coordinates, they
+    are put back by `restore_parameter_values`.
+    '''
+    parameters = list(model.variables) + \
+                 list(model.get_algorithm().parameters)
+    return [(param, param.value) for param in parameters]
+
+
+def restore_parameter_values(savedValues):
+    for param, value in savedValues:
+        param.value = value
+    return
+
+
+def create_latin_hypercube(nFactors, nPoints, seed=0):
+    '''
+
+    Return a Latin hypercube of `nPoints` points: each factor takes one
+    value in each of the `nPoints` slices of [0, 1], at random within the
+    slice.
+    '''
+    generator = numpy.random.RandomState(seed)
+    design = numpy.zeros((nPoints, nFactors))
+    for i in range(nFactors):
+        design[:, i] = (generator.permutation(nPoints) + \
+                        generator.rand(nPoints))/nPoints
+    return design
+
+
+def create_sobol_sequence(nFactors, nPoints, skip=0):
+    '''
+
+    Return the points `skip` to `skip + nPoints - 1` of the Sobol sequence
+    in dimension `nFactors`, generated in the Gray code order
+    '''
+    if nFactors > len(SOBOL_DIRECTIONS) + 1:
+        raise Exception('The Sobol sequence is available for at most ' + \
+                        str(len(SOBOL_DIRECTIONS) + 1) + ' factors')
+    directions = [[1 << (SOBOL_BITS - 1 - i) for i in range(SOBOL_BITS)]]
+    for s, a, m in SOBOL_DIRECTIONS[:nFactors - 1]:
+        v = [m[i] << (SOBOL_BITS - 1 - i) for i in range(s)]
+        for i in range(s, SOBOL_BITS):
+            vi = v[i - s] ^ (v[i - s] >> s)
+            for k in range(1, s):
+                if (a >> (s - 1 - k)) & 1:
+                    vi = vi ^ v[i - k]
+            v.append(vi)
+        directions.append(v)
+    design = numpy.zeros((nPoints, nFactors))
+    x = [0]*nFactors
+    for n in range(skip + nPoints):
+        if n >= skip:
+            design[n - skip] = [xi/float(1 << SOBOL_BITS) for xi in x]
+        c = 0 # Position of the lowest zero bit of n
+        while (n >> c) & 1:
+            c = c + 1
+        for i in range(nFactors):
+            x[i] = x[i] ^ directions[i][c]
+    return design
+
+
+def create_grid(nFactors, nLevels):
+    '''
+
+    Return the full factorial design with `nLevels` equally spaced levels
+    by factor, the bounds included
+    '''
+    levels = numpy.linspace(0.0, 1.0, nLevels)
+    grids = numpy.meshgrid(*([levels]*nFactors), indexing='ij')
+    return numpy.array([grid.ravel() for grid in grids]).T
+
+
+def get_design_points(variables, design):
+    '''
+
+    Map the points of a design of the unit hypercube onto the parameters.
+    A real parameter is scaled linearly to its range. The range of an
+    integer parameter and the values of a categorical one are divided into
+    equal slices, one by value.
+    '''
+    ranges = [None if var.is_categorical else get_parameter_range(var) \
+              for var in variables]
+    points = []
+    for u in design:
+        point = []
+        for var, (ui, r) in zip(variables, zip(u, ranges)):
+            if var.is_categorical:
+                values = var.bound
+                point.append(values[min(int(ui*len(values)),
+                                        len(values) - 1)])
+            elif var.is_integer:
+                low = int(numpy.ceil(r[0]))
+                n = int(numpy.floor(r[1])) - low + 1
+                point.append(low + min(int(ui*n), n - 1))
+            else:
+                point.append(r[0] + float(ui)*(r[1] - r[0]))
+        points.append(point)
+    return points
+
+
+class ResultTable:
+    """
+
+    A table of the evaluated points stored by column: one column by
+    parameter, the objective function, the constraint values and, when
+    they are known, the measure values of each problem in the columns named
+    `problem.measure`. A missing value is None.
+    """
+    def __init__(self, names=[]):
+        self.names = []
+        self.columns = {}
+        self.n_rows = 0
+        for name in names:
+            self.add_column(name)
+        return
+
+    def __len__(self):
+        return self.n_rows
+
+    def add_column(self, name):
+        if name in self.columns:
+            return
+        self.names.append(name)
+        self.columns[name] = [None]*self.n_rows
+        return
+
+    def add_row(self, values):
+        for name in values.keys():
+            self.add_column(name)
+        for name in self.names:
+            self.columns[name].append(values.get(name, None))
+        self.n_rows = self.n_rows + 1
+        return
+
+    def get_column(self, name):
+        return self.columns[name]
+
+    def get_row(self, index):
+        return dict([(name, self.columns[name][index]) \
+                     for name in self.names])
+
+    def write(self, fileName):
+        '''
+
+        Write the table as comma separated values with a header line. A
+        missing value is an empty field.
+        '''
+        f = open(fileName, 'wb')
+        writer = csv.writer(f)
+        writer.writerow(self.names)
+        for index in range(self.n_rows):
+            writer.writerow(['' if self.columns[name][index] is None \
+                             else self.columns[name][index] \
+                             for name in self.names])
+        f.close()
+        return
+
+
+def evaluate_design(model, design='lhs', nPoints=10, nLevels=3, seed=0,
+                    evaluation=None, resultStore=None, tableFile=None,
+                    dataFile=None):
+    '''
+
+    Evaluate the model at the points of a design and return the table of
+    the results. `design` is 'lhs' (Latin hypercube of `nPoints` points),
+    'sobol' (first `nPoints` points of the Sobol sequence), 'grid' (full
+    grid of `nLevels` levels by parameter) or an array of points of the
+    unit hypercube.
+
+    The points are evaluated by `evaluation`, an in-process
+    `ModelEvaluation` of the model by default, in which case the tests
+    whose results are in `resultStore` are not run again and the measure
+    values are read back from the history of the model. This evaluation
+    saves the model in `dataFile` and its history next to it. By default,
+    they are private temporary files so that the model file of another
+    campaign is not overwritten. The table is written to `tableFile` if it
+    is given.
+
+    The values of the parameters of the model are the same after the
+    evaluation as before.
+    '''
+    variables = model.variables
+    if design == 'lhs':
+        design = create_latin_hypercube(len(variables), nPoints, seed=seed)
+    elif design == 'sobol':
+        design = create_sobol_sequence(len(variables), nPoints)
+    elif design == 'grid':
+        design = create_grid(len(variables), nLevels)
+    points = get_design_points(variables, design)
+    distinctPoints = []
+    seen = set()
+    for point in points:
+        if tuple(point) not in seen:
+            seen.add(tuple(point))
+            distinctPoints.append(point)
+    historyFile = None
+    workDir = None
+    if evaluation is None:
+        from ..Solvers.mads import ModelEvaluation
+        if dataFile is None:
+            workDir = tempfile.mkdtemp()
+            dataFile = os.path.join(workDir, 'design.dat')
+        evaluation = ModelEvaluation(model, dataFile=dataFile,
+                                     resultStore=resultStore, history=True)
+        historyFile = get_history_file(dataFile)
+        # The history may hold the records of earlier evaluations, only the
+        # ones of this design are read
+        historyStart = get_history_end(historyFile)
+    savedValues = save_parameter_values(model)
+    try:
+        evaluation.start()
+        try:
+            evaluated = evaluation.evaluate(distinctPoints)
+        finally:
+            evaluation.stop()
+            restore_parameter_values(savedValues)
+        measures = {}
+        if historyFile is not None:
+            for record in load_history(historyFile, start=historyStart):
+                measures[create_point_tag(record['point'])] = \
+                                                         record['measures']
+    finally:
+        if workDir is not None:
+            shutil.rmtree(workDir)
+    results = dict([(tuple(point), values) for point, values in evaluated])
+    table = ResultTable([var.name for var in variables] + ['objective'])
+    for point in distinctPoints:
+        row = dict(zip([var.name for var in variables], point))
+        # The columns are added in a stable order before the row
+        values = results.get(tuple(point), None)
+        if values is not None:
+            row['objective'] = values[0]
+            for j in range(len(values[1])):
+                for side, value in zip(['lower', 'upper'], values[1][j]):
+                    table.add_column('constraint' + str(j + 1) + '-' + side)
+                    row['constraint' + str(j + 1) + '-' + side] = value
+        pointMeasures = measures.get(create_point_tag(point), None)
+        if pointMeasures is not None:
+            for probId in sorted(pointMeasures.keys()):
+                for measureId in sorted(pointMeasures[probId].keys()):
+                    table.add_column(probId + '.' + measureId)
+                    row[probId + '.' + measureId] = \
+                        pointMeasures[probId][measureId]
+        table.add_row(row)
+    if tableFile is not None:
+        table.write(tableFile)
+    return table
@@ -0,0 +1,192 @@
+"""
+
+This module keeps the evaluation history of a model: every point evaluated
+by a blackbox, the measure values obtained on each test problem and the
+model values are appended to a file that lives next to the model file.
+
+Each record is written as a frame: a marker, the length and the checksum
+of the pickled record, then the pickled record. A record cut short by a
+crash is thus recognized and skipped, and the records appended after it
+are still read. The appends are serialized by a lock on the file so that
+several processes can share it.
+"""
+import os
+import zlib
+import fcntl
+import struct
+import pickle
+import hashlib
+import StringIO
+
+__docformat__ = 'restructuredtext'
+
+
+def get_history_file(modelFile):
+    '''
+
+    Return the name of the file in which the evaluations of the model saved
+    in `modelFile` are recorded
+    '''
+    if modelFile.endswith('.dat'):
+        return modelFile[:-len('.dat')] + '.hist'
+    return modelFile + '.hist'
+
+
+def create_point_tag(point):
+    '''
+
+    Return the tag identifying the evaluation of a parameter point
+    '''
+    valuesStr = '_'
+    for coordinate in point:
+        valuesStr = valuesStr + str(coordinate) + '_'
+    return hashlib.sha1(valuesStr).hexdigest()
+
+
+RECORD_MARKER = '\xffOPH'
+RECORD_HEADER = struct.Struct('>4sIi') # Marker, length and checksum
+
+
+def append_record(fileName, record):
+    '''
+
+    Append a record to a history file or a result store, under an exclusive
+    lock of the file
+    '''
+    data = pickle.dumps(record)
+    frame = RECORD_HEADER.pack(RECORD_MARKER, len(data), zlib.crc32(data)) + \
+            data
+    f = open(fileName, 'ab')
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            f.write(frame)
+            f.flush()
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    finally:
+        f.close()
+    return
+
+
+def read_records(content):
+    '''
+
+    Return the records of the content of a history file. The damaged parts
+    are skipped up to the next frame. The records written without frame by
+    the older versions are read too.
+    '''
+    records = []
+    position = 0
+    while position < len(content):
+        if content.startswith(RECORD_MARKER, position):
+            end = position + RECORD_HEADER.size
+            if end <= len(content):
+                marker, length, checksum = \
+                        RECORD_HEADER.unpack(content[position:end])
+                data = content[end:end + length]
+                if (len(data) == length) and \
+                       (zlib.crc32(data) == checksum):
+                    records.append(pickle.loads(data))
+                    position = end + length
+                    continue
+        else:
+            # A record of an older version, pickled without frame
+            f = StringIO.StringIO(content)
+            f.seek(position)
+            try:
+                records.append(pickle.load(f))
+                position = f.tell()
+                continue
+            except Exception:
+                pass
+        # A damaged record: go to the next frame
+        position = content.find(RECORD_MARKER, position + 1)
+        if position < 0:
+            break
+    return records
+
+
+def record_evaluation(historyFile, point, values, measures=None,
+                      parameters=None):
+    '''
+
+    Append an evaluation record to the history file. Several blackbox
+    processes can share the file. The measure values are given as a
+    dictionary by problem and the names of the parameters are the ones of
+    the coordinates of the point.
+    '''
+    if measures is None:
+        measures = {}
+    append_record(historyFile, {'point':point,
+                                'values':values,
+                                'measures':measures,
+                                'parameters':parameters})
+    return
+
+
+def get_history_end(historyFile):
+    '''
+
+    Return the position of the end of a history file, from which the
+    records appended later are loaded by `load_history`
+    '''
+    if not os.path.exists(historyFile):
+        return 0
+    return os.path.getsize(historyFile)
+
+
+def load_history(historyFile, start=0):
+    '''
+
+    Return the list of the evaluation records of a history file, from the
+    position `start` on. A missing file is an empty history. The records
+    damaged by a crash are skipped.
+    '''
+    try:
+        f = open(historyFile, 'rb')
+    except IOError:
+        return []
+    try:
+        f.seek(start)
+        content = f.read()
+    finally:
+        f.close()
+    return read_records(content)
+
+
+class ResultStore:
+    """
+
+    A persistent store of the measure values obtained by running the
+    algorithm with a parameter point on a test problem. The results are
+    appended to a file as soon as they are collected, so that they survive
+    a crash of a long campaign and can be replayed instead of being
+    computed again when it is resumed.
+    """
+    def __init__(self, storeFile):
+        self.store_file = storeFile
+        self.results = {}
+        for record in load_history(storeFile):
+            self.results[(record['parameter-tag'], record['problem'])] = \
+                                     (record['values'], record['statistics'])
+        return
+
+    def __len__(self):
+        return len(self.results)
+
+    def add(self, paramTag, problem, measureValues, statistics=None):
+        self.results[(paramTag, problem)] = (measureValues, statistics)
+        append_record(self.store_file, {'parameter-tag':paramTag,
+                                        'problem':problem,
+                                        'values':measureValues,
+                                        'statistics':statistics})
+        return
+
+    def get(self, paramTag, problem):
+        '''
+
+        Return the measure values and the statistics stored for the
+        parameter point on the problem, or None
+        '''
+        return self.results.get((paramTag, problem), None)
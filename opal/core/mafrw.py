@@ -172,8 +172,9 @@ class Agent(threading.Thread):
         ##            msg.sender is not self.id:
         ##         result.append(msg)
         messageBoxes = self.environment.message_service.message_boxes[self.id]
+        # The messages are handled in the order they are posted
         while len(messageBoxes):
-            result.append(messageBoxes.pop())
+            result.append(messageBoxes.pop(0))
         return result
 
 
@@ -256,6 +257,14 @@ class Agent(threading.Thread):
         
         register to
         """
+        if self.ident is not None:
+            # The agent has already lived in an environment, for example a
+            # platform used by several solving sessions. A thread can not be
+            # started twice, the thread part of the agent is then renewed.
+            name = self.name
+            threading.Thread.__init__(self)
+            self.name = name
+            self.working = True
         self.id = environment.add_agent(self)
         # Set the pointer to registed environment
         self.environment = environment
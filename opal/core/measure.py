@@ -13,11 +13,21 @@ class Measure(Data):
     - Data: its value is value of an observation 
     - Functionality: It encapsulates the way to extract measure value 
       from the output.
+
+    A measure declared as noisy, for example a computing time, may differ
+    from one run to another with the same parameter values on the same
+    problem. The runs giving a noisy measure are repeated until its mean is
+    known precisely enough.
     '''
 
-    def __init__(self, name=None, description='', kind=None, **kwargs):
+    def __init__(self, name=None, description='', kind=None, noisy=False,
+                 **kwargs):
         Data.__init__(self, name=name, description=description, type=kind)
+        self.noisy = noisy
         return
 
+    def is_noisy(self):
+        return self.noisy
+
 
     
@@ -5,7 +5,9 @@ import pickle
 import log
 
 from platform import Platform
-from ..Platforms import LINUX
+from history import load_history
+from history import create_point_tag
+from history import ResultStore
 
 #from opal.core.modelstructure import ModelEvaluator
 
@@ -17,6 +19,8 @@ class Model:
                  modelStructure=None,
                  evaluatingOptions=None,
                  dataFile='blackbox.dat',
+                 warmStart=None,
+                 nWarmPoints=5,
                  **kwargs):
         """
 
@@ -33,6 +37,10 @@ class Model:
         The link to a solver is created by the solver and added to the
         BlackBoxModel object upon solving the problem.
 
+        If `warmStart` names the history file of a previous campaign, the
+        best `nWarmPoints` points of it are the first initial points (see
+        `warm_start`).
+
         """
 
         self.data = modelData
@@ -71,6 +79,8 @@ class Model:
                 pass # Do nothing and use the default platform
             del self.evaluating_options['platform'] # Remove platform setting
         self.initialize()
+        if warmStart is not None:
+            self.warm_start(warmStart, nPoints=nWarmPoints)
         return
     
     def initialize(self):
@@ -128,6 +138,120 @@ class Model:
                 initialPoint.append(converters[param.kind](val))
         self.initial_points.append(initialPoint)
         
+    def map_point(self, record):
+        '''
+
+        Return the point of a history record as a point of this model. The
+        coordinates are matched by parameter name; the parameters unknown
+        to the record take their default values. Return None if the record
+        has no parameter in common with the model.
+        '''
+        converters = {'real':float,
+                      'integer':lambda value: int(float(value)),
+                      'categorical':str}
+        names = record.get('parameters', None)
+        if names is None: # An old record, the parameters are the same
+            if len(record['point']) != len(self.variables):
+                return None
+            names = [var.name for var in self.variables]
+        if len([var for var in self.variables if var.name in names]) == 0:
+            return None
+        point = []
+        for var in self.variables:
+            if var.name in names:
+                value = record['point'][names.index(var.name)]
+                if var.kind in converters:
+                    value = converters[var.kind](value)
+                point.append(value)
+            else:
+                point.append(var.get_default())
+        return point
+
+    def estimate_merit(self, record, point, problemIds):
+        '''
+
+        Estimate the constraint violation and the objective function value
+        of a history record from its measure values on the given problems,
+        or take its model values if no problem is given
+        '''
+        if len(problemIds) == 0:
+            if record['values'] is None:
+                return None
+            objValue, consValues = record['values']
+        else:
+            measures = {}
+            for probId in problemIds:
+                for measureId, value in record['measures'][probId].items():
+                    if measureId not in measures:
+                        measures[measureId] = []
+                    measures[measureId].append(value)
+            objValue = self.structure.objective.evaluate(point, measures)
+            consValues = [cons.evaluate(point, measures) \
+                          for cons in self.structure.constraints]
+        violation = 0.0
+        for cons in consValues:
+            for value in cons:
+                if (value is not None) and (value > 0):
+                    violation = violation + value*value
+        return (violation, objValue)
+
+    def warm_start(self, historyFile, nPoints=5, resultStore=None):
+        '''
+
+        Seed the initial points with the best points of the evaluation
+        history of a previous campaign of the same algorithm, whose model
+        was evaluated with the `history` option. The parameter
+        set may have changed (see `map_point`), and so may the problem list:
+        the points are compared on the problems of this model measured for
+        all of them, or by their old model values if there is no such
+        problem.
+
+        If `resultStore` names a result store file, the measure values of
+        the seeded points on the problems of this model are put in it so
+        that these tests are replayed rather than run again.
+
+        Return the seeded points.
+        '''
+        problemIds = [prob.identify() for prob in self.get_problems()]
+        candidates = []
+        for record in load_history(historyFile):
+            if record['values'] is None: # A failed evaluation
+                continue
+            point = self.map_point(record)
+            if point is not None:
+                candidates.append((record, point))
+        commonIds = [probId for probId in problemIds \
+                     if len([record for record, point in candidates \
+                             if probId in record.get('measures', {})]) == \
+                     len(candidates)]
+        ranked = []
+        for record, point in candidates:
+            merit = self.estimate_merit(record, point, commonIds)
+            if merit is not None:
+                ranked.append((merit, record, point))
+        ranked.sort(key=lambda item: item[0])
+        seeded = []
+        store = None
+        if resultStore is not None:
+            store = ResultStore(resultStore)
+        for merit, record, point in ranked:
+            if len(seeded) >= nPoints:
+                break
+            if point in seeded:
+                continue
+            seeded.append(point)
+            if store is None:
+                continue
+            tag = create_point_tag(point)
+            for probId in problemIds:
+                if (probId in record.get('measures', {})) and \
+                       (store.get(tag, probId) is None):
+                    store.add(tag, probId, record['measures'][probId])
+        self.initial_points = seeded + \
+                              [point for point in self.initial_points \
+                               if point not in seeded]
+        return seeded
+
     def get_bound_constraints(self):
         return self.bounds
 
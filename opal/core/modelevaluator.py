@@ -9,6 +9,10 @@ from .mafrw import Agent
 from .mafrw import Message
 from .datagenerator import DataGenerator
 from .structureevaluator import StructureEvaluator
+from .structureevaluator import RacingEvaluator
+from .history import get_history_file
+from .history import record_evaluation
+from .history import create_point_tag
 from ..Platforms import supported_platforms
 
 #from opal.core.modelstructure import ModelEvaluator
@@ -26,7 +30,11 @@ class ModelEvaluator(Agent):
         Agent.__init__(self, name=name, logHandlers=logHandlers)
         self.options = {'platform': 'LINUX', 
                         'synchronized': False,
-                        'interruptible': True}
+                        'interruptible': True,
+                        'racing': False,
+                        'racing_confidence': 0.95,
+                        'racing_min_problems': 5,
+                        'history': False}
         self.options.update(options)
         if model is None:
             if modelFile is not None:
@@ -40,6 +48,13 @@ class ModelEvaluator(Agent):
         self.model = model
         self.model_file = modelFile
         self.options.update(self.model.evaluating_options)
+        # If the history option is set, the evaluated points are recorded
+        # in a history file next to the model file so that a surrogate can
+        # be learned from them or a later campaign warm started
+        self.history_file = None
+        if self.options['history'] and (modelFile is not None):
+            self.history_file = get_history_file(modelFile)
+        self.points = {}
        
         # if platform option is provided by a string representing the name of 
         # a OPAL-supported platform
@@ -52,6 +67,9 @@ class ModelEvaluator(Agent):
                                                   self.estimate_partially_model
         self.message_handlers['inform-constraint-partially-violated'] = \
                                                   self.estimate_partially_model
+        self.message_handlers['inform-model-value'] = self.record_model_value
+        self.message_handlers['inform-evaluation-cancelled'] = \
+                                                  self.forget_evaluation
         return
 
     def register(self, environment):
@@ -79,11 +97,20 @@ class ModelEvaluator(Agent):
                    DataGenerator(algorithm=self.model.get_algorithm(),
                                  parameters=self.model.get_parameters(),
                                  problems=self.model.get_problems(),
-                                 platform=self.model.platform_description)
+                                 platform=self.model.platform_description,
+                                 options=self.options)
             dataGenerator.register(environment)
 
         if self.find_collaborator('structure evaluator', environment) is None:
-            structureEvaluator = \
+            if self.options['racing']:
+                structureEvaluator = RacingEvaluator(
+                    structure=self.model.structure,
+                    problems=self.model.get_problems(),
+                    measures=self.model.get_measures(),
+                    confidence=self.options['racing_confidence'],
+                    minProblems=self.options['racing_min_problems'])
+            else:
+                structureEvaluator = \
                           StructureEvaluator(structure=self.model.structure,
                                             problems=self.model.get_problems(),
                                             measures=self.model.get_measures())
@@ -95,10 +122,18 @@ class ModelEvaluator(Agent):
         return None
 
     def create_tag(self, point):
-        valuesStr = '_'
-        for coordinate in point:
-            valuesStr = valuesStr + str(coordinate) + '_'
-        return hashlib.sha1(valuesStr).hexdigest()
+        return create_point_tag(point)
+
+    def record(self, paramTag, values, measureValues=None):
+        if (self.history_file is None) or (paramTag not in self.points):
+            return
+        record_evaluation(self.history_file,
+                          self.points.pop(paramTag),
+                          values,
+                          measureValues,
+                          [param.name \
+                           for param in self.model.get_parameters()])
+        return
   
     # Message handlers
 
@@ -108,6 +143,7 @@ class ModelEvaluator(Agent):
             parameterTag = info['proposition']['tag']
         else:
             parameterTag = self.create_tag(parameterValues)
+        self.points[parameterTag] = parameterValues
 
         message = Message(sender=self.id,
                           performative='cfp',
@@ -121,6 +157,7 @@ class ModelEvaluator(Agent):
     def handle_experiment_failed(self, info):
         paramTag = info['proposition']['parameter-tag']
         reason = info['proposition']['why']
+        self.record(paramTag, None)
         # Send an inform message about the model-value with the value
         # is set to None. That indicates that there is something wrong in model
         # evaluation.
@@ -138,17 +175,29 @@ class ModelEvaluator(Agent):
     def estimate_partially_model(self, info):
 
         paramTag = info['proposition']['parameter-tag']
+        reason = info['proposition'].get('why', 'parameters invalid')
+        self.record(paramTag, None)
         message = Message(sender=self.id,
                           performative='inform',
                           content={'proposition':{'what':'model-value',
                                                   'values':None,
-                                                  'why':'parameters invalid',
+                                                  'why':reason,
                                                   'parameter-tag':paramTag
                                                   }
                                    })
         self.send_message(message)
         return
-        
+
+    def record_model_value(self, info):
+        self.record(info['proposition']['parameter-tag'],
+                    info['proposition']['values'],
+                    info['proposition'].get('measure-values', None))
+        return
+
+    def forget_evaluation(self, info):
+        self.points.pop(info['proposition']['parameter-tag'], None)
+        return
+
     def stop(self, info=None):
         '''
         
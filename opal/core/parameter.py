@@ -1,3 +1,5 @@
+import ast
+import math
 import string
 
 from opal.core.data import Data, DataSet
@@ -185,23 +187,166 @@ class Parameter(Data):
                 'default':self._default}
 
 
+class VectorizingTransformer(ast.NodeTransformer):
+    """
+
+    Rewrite a constraint so that it applies element-wise to arrays of
+    values: the logical operators, the chained comparisons and the
+    conditional expressions become calls of NumPy functions.
+    """
+    def call(self, name, args, node):
+        return ast.copy_location(ast.Call(func=ast.Name(id=name,
+                                                        ctx=ast.Load()),
+                                          args=args,
+                                          keywords=[],
+                                          starargs=None,
+                                          kwargs=None),
+                                 node)
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.And):
+            return self.call('_and', node.values, node)
+        return self.call('_or', node.values, node)
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return self.call('_not', [node.operand], node)
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        if len(node.ops) == 1:
+            return node
+        # a < b < c is a < b and b < c
+        operands = [node.left] + node.comparators
+        comparisons = [ast.copy_location(ast.Compare(left=operands[i],
+                                                     ops=[op],
+                                                     comparators=\
+                                                     [operands[i + 1]]),
+                                         node) \
+                       for i, op in enumerate(node.ops)]
+        return self.call('_and', comparisons, node)
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        return self.call('_where', [node.test, node.body, node.orelse], node)
+
+
+# The functions that a constraint can use, on a point and on a batch
+scalar_functions = {'sqrt': math.sqrt,
+                    'exp': math.exp,
+                    'log': math.log,
+                    'log10': math.log10,
+                    'floor': math.floor,
+                    'ceil': math.ceil}
+vector_functions = {}
+
+def get_vector_functions():
+    '''
+
+    Return the NumPy versions of the functions and operators of the
+    constraints. NumPy is imported at the first call only, so that it is
+    not loaded by the programs that check one point at a time.
+    '''
+    if len(vector_functions) == 0:
+        import numpy
+        vector_functions.update({
+            '_and': lambda *args: reduce(numpy.logical_and, args),
+            '_or': lambda *args: reduce(numpy.logical_or, args),
+            '_not': numpy.logical_not,
+            '_where': numpy.where,
+            'abs': numpy.abs,
+            'min': lambda *args: reduce(numpy.minimum, args),
+            'max': lambda *args: reduce(numpy.maximum, args),
+            'sqrt': numpy.sqrt,
+            'exp': numpy.exp,
+            'log': numpy.log,
+            'log10': numpy.log10,
+            'floor': numpy.floor,
+            'ceil': numpy.ceil})
+    return vector_functions
+
+
 class ParameterConstraint:
     """
-    .. warning::
 
-        Document this class!!!
+    A constraint on the parameters of an algorithm, given by a Python
+    expression over the parameter names, for example
+    `'eta1 < eta2 and 0 < gamma1 <= gamma2 < 1'`. The expression may use
+    the functions abs, min, max, sqrt, exp, log, log10, floor and ceil.
+
+    The expression is parsed once. It is evaluated at a point by calling
+    the constraint with the parameters, or at a batch of points by
+    `evaluate`, which takes arrays of values and returns an array of
+    booleans.
     """
 
     violated = False
+    # Compiled forms of the expression, built at the first use (they can
+    # not be pickled)
+    scalar_code = None
+    vector_code = None
+    names = None
+
     def __init__(self,constraintStr='',*argv):
         self.constraintStr = constraintStr
+        self.compile()
         pass
 
+    def compile(self):
+        tree = ast.parse(self.constraintStr.strip(), mode='eval')
+        functions = [node.func.id for node in ast.walk(tree) \
+                     if isinstance(node, ast.Call) and \
+                     isinstance(node.func, ast.Name)]
+        self.names = sorted(set([node.id for node in ast.walk(tree) \
+                                 if isinstance(node, ast.Name) and \
+                                 (node.id not in functions) and \
+                                 (node.id not in ['True', 'False', 'None'])]))
+        self.scalar_code = compile(tree, '<constraint>', 'eval')
+        vectorTree = ast.fix_missing_locations(
+            VectorizingTransformer().visit(ast.parse(
+                self.constraintStr.strip(), mode='eval')))
+        self.vector_code = compile(vectorTree, '<constraint>', 'eval')
+        return
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for name in ['scalar_code', 'vector_code']:
+            state.pop(name, None)
+        return state
+
+    def get_names(self):
+        "Return the names of the parameters in the constraint."
+        if self.names is None:
+            self.compile()
+        return self.names
+
     def __call__(self,parameters):
-        constraintStr = self.constraintStr
-        for param in parameters :
-            constraintStr = constraintStr.replace(param.name,str(param.value))
-        return eval(constraintStr)
+        if self.scalar_code is None:
+            self.compile()
+        values = dict([(param.name, param.value) for param in parameters])
+        return bool(eval(self.scalar_code, scalar_functions, values))
+
+    def evaluate(self, values):
+        '''
+
+        Evaluate the constraint at a batch of points. `values` maps each
+        parameter name of the constraint to the array of its values at the
+        points, or to a single value shared by all of them. Return the
+        array of booleans telling whether the points satisfy the constraint.
+        '''
+        import numpy
+        if self.vector_code is None:
+            self.compile()
+        values = dict([(name, numpy.asarray(value)) \
+                       for name, value in values.items()])
+        # The branches of the logical operators are all evaluated: the
+        # invalid operations of the discarded ones must be silent
+        with numpy.errstate(all='ignore'):
+            result = eval(self.vector_code, get_vector_functions(), values)
+        return numpy.asarray(result, dtype=bool)
 
 
 def _test():
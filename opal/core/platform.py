@@ -1,3 +1,5 @@
+from collections import deque
+
 from mafrw import Agent
 from mafrw import Message
 
@@ -9,16 +11,29 @@ class Task(Agent):
                  sessionTag=None,
                  input=None,
                  output='/dev/null',
+                 extractor=None,
+                 streamMeasures=False,
                  logHandlers=[]):
         '''
 
         Each task object correspond to an application of the target 
         algorithm on a test problem.
 
+        If a `MeasureExtractor` is given, the platform captures the standard
+        output of the command and the task extracts the measures from it as
+        the command runs. The measure values are sent with the request of
+        collecting the result. If `streamMeasures` is True, the measures
+        found so far are also sent each time a new one is found, so that
+        an agent can stop an unpromising run early by asking the platform
+        to `stop-task`.
         '''
         self.task_id = taskId # task_id is assigned by platform
         self.command = command
         self.output = output
+        self.extractor = extractor
+        self.stream_measures = streamMeasures
+        self.measure_values = None
+        self.stopped = False
         if name is None:
             Agent.__init__(self, name=command, logHandlers=logHandlers)
         else:
@@ -29,18 +44,59 @@ class Task(Agent):
             self.session_tag = sessionTag
         return
 
-    def run(self):
+    def capture_output(self, stream):
+        '''
+
+        Feed the output of the command, read line by line from `stream`, to
+        the extractor until the end of the output
+        '''
+        self.extractor.reset()
+        for line in iter(stream.readline, ''):
+            found = self.extractor.feed(line)
+            if self.stream_measures and (not self.stopped) and \
+                   (len(found) > 0):
+                message = Message(sender=self.id,
+                                  performative='inform',
+                                  content={'proposition':\
+                                           {'what':'partial-measure-values',
+                                            'values':found,
+                                            'session-tag':self.session_tag}
+                                           }
+                                  )
+                self.send_message(message)
+        stream.close()
+        self.measure_values = self.extractor.close()
+        return self.measure_values
+
+    def stop(self):
+        '''
+
+        Stop the command before its end. The tasks that can kill their
+        command override this method; the others finish their work, which
+        is reported as stopped all the same.
+        '''
+        self.stopped = True
+        return
+
+    def run(self, how='no-error'):
         '''
 
         The common activity of all task is send a message that informs
-        termination of its work
+        termination of its work. `how` tells whether the work has been done
+        ('no-error'), has been stopped ('stopped') or has failed.
         '''
+        if self.stopped and (how == 'no-error'):
+            how = 'stopped'
+        proposition = {'session-tag':self.session_tag,
+                       'how':how}
+        if self.extractor is not None:
+            proposition['measure-values'] = self.measure_values
         message = Message(sender=self.id,
                           performative='inform',
                           receiver=None,
                           content={'proposition':{'who':self.name,
                                                   'what':'task-finish',
-                                                  'how':'no-error'}
+                                                  'how':how}
                                    }
                           )
         self.send_message(message)
@@ -48,7 +104,7 @@ class Task(Agent):
                           performative='cfp',
                           receiver=None,
                           content={'action':'collect-result',
-                                   'proposition':{'session-tag':self.session_tag}
+                                   'proposition':proposition
                                    }
                           )
         self.send_message(message)
@@ -58,55 +114,109 @@ class Task(Agent):
 
 
 class QueueSystem:
-    # The default queue system managed the tasks in one or many queue
-    # where each queue is identified by name
-    def __init__(self):
-        self.tasks = {'default':[]}
+    """
+
+    The default queue system manages the tasks in one or many queues where
+    each queue is identified by a tag, normally the parameter tag. The
+    tasks of a queue are served in the order of submission. The queues are
+    served in turn so that the concurrent parameter points progress evenly.
+    A queue with weight k gets k tasks served before the next queue takes
+    its turn. All operations but the removal of a queue take O(1) time.
+    """
+    def __init__(self, weights=None):
+        self.tasks = {'default':deque()}
+        self.length = 0
+        self.turns = deque() # Tags of the non-empty queues in serving order
+        self.weights = {}
+        if weights is not None:
+            self.weights.update(weights)
+        self.quota = 0 # Tasks that the queue at the head of turns can still
+                       # get served before giving the turn to the next one
         return
 
     def get_length(self):
-        length = 0
-        for queueTag in self.tasks:
-            length = length + len(self.tasks[queueTag])
-        return length
+        return self.length
+
+    def set_weight(self, queue, weight):
+        self.weights[queue] = weight
+        return
+
+    def get_weight(self, queue):
+        return self.weights.get(queue, 1)
 
     def append(self, task, queue=None):
-        if (queue is None) or (queue is 'default'):
-            self.tasks['default'].append(task)
-        else:
-            if queue in self.tasks.keys():
-                self.tasks[queue].append(task)
-            else:
-                self.tasks[queue] = [task]         
+        if queue is None:
+            queue = 'default'
+        if queue not in self.tasks:
+            self.tasks[queue] = deque()
+        if len(self.tasks[queue]) == 0:
+            if len(self.turns) == 0:
+                self.quota = self.get_weight(queue)
+            self.turns.append(queue)
+        self.tasks[queue].append(task)
+        self.length = self.length + 1
         return
 
     def pop(self, queue=None):
-        if (queue is None) or (queue is 'default'):
-            if len(self.tasks['default']) > 0 :
-                return self.tasks['default'].pop()
-            for queue in self.tasks.keys():
-                if queue is not 'default':
-                    return self.tasks[queue].pop()
+        if queue is None:
+            if self.length == 0:
+                raise Exception('The task queue is empty')
+            queue = self.turns[0]
+            self.quota = self.quota - 1
+        elif queue not in self.tasks:
+            raise Exception('The task queue does not exist')
+        elif len(self.tasks[queue]) == 0:
             raise Exception('The task queue is empty')
-        
-        if queue in self.tasks.keys():
-            task = self.tasks[queue].pop()
+        task = self.tasks[queue].popleft()
+        self.length = self.length - 1
+        if len(self.tasks[queue]) == 0:
+            self.leave_turns(queue)
             # Remove the queue if it is empty
-            if len(self.tasks[queue]) == 0:
+            if queue != 'default':
                 del self.tasks[queue]
-            return task
-        raise Exception('The task queue does not exist')
+        elif self.quota <= 0:
+            # The turn goes to the next queue
+            self.turns.rotate(-1)
+            self.quota = self.get_weight(self.turns[0])
+        return task
+
+    def peek(self):
+        '''
+
+        Return the task that the next call of pop() will give
+        '''
+        if self.length == 0:
+            raise Exception('The task queue is empty')
+        return self.tasks[self.turns[0]][0]
 
-    
     def remove_tasks(self, queue=None):
-        if (queue is None) or (queue is 'default'):
-            del self.tasks['default'][0:]
-            return
-        if queue in self.tasks.keys():
+        '''
+
+        Remove the tasks of a queue and return them
+        '''
+        if queue is None:
+            queue = 'default'
+        if queue not in self.tasks:
+            return []
+        removed = list(self.tasks[queue])
+        if len(self.tasks[queue]) > 0:
+            self.length = self.length - len(self.tasks[queue])
+            self.leave_turns(queue)
+        if queue == 'default':
+            self.tasks[queue].clear()
+        else:
             del self.tasks[queue]
-            return
+        return removed
+
+    def leave_turns(self, queue):
+        if queue == self.turns[0]:
+            self.turns.popleft()
+            if len(self.turns) > 0:
+                self.quota = self.get_weight(self.turns[0])
+        else:
+            self.turns.remove(queue)
         return
-    
+
 class Platform(Agent):
     def __init__(self,
                  name='platform',
@@ -134,6 +244,7 @@ class Platform(Agent):
         Agent.__init__(self, name=name, logHandlers=logHandlers)
         self.message_handlers['inform-task-finish'] = self.finalize_task
         self.message_handlers['cfp-cancel-queue'] = self.cancel_queue
+        self.message_handlers['cfp-stop-task'] = self.stop_task
         return
 
     def set_parameter(self, settings=None, **kwargs):
@@ -154,18 +265,33 @@ class Platform(Agent):
         del self.running[taskName]
         return
 
+    def can_launch(self, task):
+        return len(self.running) < self.settings['MAX_TASK']
+
+    def launch(self, task):
+        self.running[task.name] = task
+        task.start()
+        return
+
+    def adjust(self):
+        '''
+
+        Called at each loop of the platform before launching tasks. A
+        platform overrides it to adapt its settings to the running state.
+        '''
+        return
+
     def run(self):
         while self.working :
+            self.adjust()
             if not self.settings['SYNCHRONOUS'] or len(self.running) == 0: 
                 # Submit task when there is no
                 # running task
                 #self.logger.log('Begin a launching session, we have ' + \
                 #                str(len(self.queue)) + ' task')
-                while (len(self.running) < self.settings['MAX_TASK']) and \
-                          (self.queue_system.get_length() > 0):
-                    task = self.queue_system.pop()
-                    self.running[task.name] = task
-                    task.start()
+                while (self.queue_system.get_length() > 0) and \
+                          self.can_launch(self.queue_system.peek()):
+                    self.launch(self.queue_system.pop())
                     #self.logger.log('Task: ' + str(task.name) + ' is launched')
             # Work as an agent
             messages = self.fetch_messages()
@@ -181,7 +307,36 @@ class Platform(Agent):
             queueTag = info['proposition']['queue']
         else:
             queueTag = None
-        self.queue_system.remove_tasks(queue=queueTag)
+        removed = self.queue_system.remove_tasks(queue=queueTag)
+        if len(removed) == 0:
+            return
+        # The removed tasks will never run: they leave the environment and
+        # their owner is told to forget them
+        for task in removed:
+            task.unregister()
+        message = Message(sender=self.id,
+                          performative='inform',
+                          content={'proposition':\
+                                   {'what':'tasks-cancelled',
+                                    'session-tags':[task.session_tag \
+                                                    for task in removed],
+                                    'queue':queueTag}
+                                   }
+                          )
+        self.send_message(message)
+        return
+
+    def stop_task(self, info):
+        '''
+
+        Handle a request of stopping a running task, for example a run whose
+        partial measures show that it is not worth going on
+        '''
+        # The running tasks are indexed by their names, which are given by
+        # the environment
+        for task in self.running.values():
+            if task.session_tag == info['proposition']['tag']:
+                task.stop()
         return
     
     
@@ -0,0 +1,137 @@
+"""
+
+This module selects the test problems of a surrogate model from the
+evaluation history of a model. A good surrogate ranks the parameter points
+like the model does. The ranking agreement of a subset of problems is
+measured by the Kendall correlation between the objective function
+computed on the subset and the one computed on all of the problems, over
+the points of the history.
+"""
+from statistics import kendall_tau
+from history import load_history
+from modeldata import ModelData
+
+__docformat__ = 'restructuredtext'
+
+
+def get_complete_records(history, problemIds):
+    '''
+
+    Return the records of the history that contain the measure values of
+    every problem
+    '''
+    return [record for record in history \
+            if len([probId for probId in problemIds \
+                    if probId in record.get('measures', {})]) == \
+            len(problemIds)]
+
+
+def get_problem_costs(records, problemIds, costMeasure=None):
+    '''
+
+    Return the mean cost of each problem over the records. The cost is the
+    value of the measure `costMeasure`, typically the running time, or 1 if
+    no cost measure is given.
+    '''
+    costs = {}
+    for probId in problemIds:
+        if costMeasure is None:
+            costs[probId] = 1.0
+        else:
+            costs[probId] = sum([float(record['measures'][probId][costMeasure])
+                                 for record in records])/len(records)
+    return costs
+
+
+def evaluate_on_problems(objective, record, problemIds):
+    '''
+
+    Compute the objective function of a record with the measure values of
+    the given problems only
+    '''
+    measures = {}
+    for probId in problemIds:
+        for measureId, value in record['measures'][probId].items():
+            if measureId not in measures:
+                measures[measureId] = []
+            measures[measureId].append(value)
+    return objective.evaluate(record['point'], measures)
+
+
+def select_problems(history, structure, problems, budget=None,
+                    costMeasure=None, threshold=0.9):
+    '''
+
+    Select a small subset of the problems whose objective function ranks the
+    points of the history like the one of all of the problems. The problems
+    are added greedily, the one that increases the Kendall correlation the
+    most first (the cheapest one in case of a tie), until the correlation
+    reaches `threshold` or the total cost would exceed `budget`. An
+    exception is raised if no problem fits in the budget.
+
+    Return the selected problems, in the order of `problems`, and the
+    Kendall correlation they achieve.
+    '''
+    problemIds = [prob.identify() for prob in problems]
+    records = get_complete_records(history, problemIds)
+    if len(records) < 2:
+        raise Exception('At least two points evaluated on every problem ' + \
+                        'are needed to select the problems')
+    objective = structure.objective
+    costs = get_problem_costs(records, problemIds, costMeasure)
+    if (budget is not None) and (min(costs.values()) > budget):
+        raise Exception('The budget ' + str(budget) + ' is smaller than ' + \
+                        'the cost of the cheapest problem ' + \
+                        str(min(costs.values())))
+    fullValues = [evaluate_on_problems(objective, record, problemIds) \
+                  for record in records]
+    selected = []
+    cost = 0.0
+    tau = -1.0
+    bestSize = 0
+    bestTau = -1.0
+    while tau < threshold:
+        candidates = [probId for probId in problemIds \
+                      if (probId not in selected) and \
+                      ((budget is None) or (cost + costs[probId] <= budget))]
+        if len(candidates) == 0:
+            break
+        choices = []
+        for probId in candidates:
+            values = [evaluate_on_problems(objective, record,
+                                           selected + [probId]) \
+                      for record in records]
+            choices.append((kendall_tau(values, fullValues),
+                            -costs[probId],
+                            probId))
+        tau, negativeCost, probId = max(choices)
+        selected.append(probId)
+        cost = cost - negativeCost
+        if tau > bestTau:
+            bestSize = len(selected)
+            bestTau = tau
+    selected = selected[:bestSize]
+    return [prob for prob in problems if prob.identify() in selected], bestTau
+
+
+def create_surrogate_data(modelData, structure, historyFile, budget=None,
+                          costMeasure=None, threshold=0.9):
+    '''
+
+    Create the data of a surrogate model from the history of a model,
+    recorded by evaluating it with the `history` option. The surrogate data
+    is the model data restricted to the problems chosen by
+    `select_problems`.
+    '''
+    problems, tau = select_problems(load_history(historyFile),
+                                    structure,
+                                    modelData.get_problems(),
+                                    budget=budget,
+                                    costMeasure=costMeasure,
+                                    threshold=threshold)
+    return ModelData(modelData.get_algorithm(),
+                     problems=problems,
+                     parameters=modelData.get_parameters(),
+                     measures=modelData.get_measures(),
+                     neighborhoods=modelData.neighborhoods,
+                     **modelData.running_options)
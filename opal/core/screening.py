@@ -0,0 +1,212 @@
+"""
+
+This module screens the parameters of a model by the elementary effects
+method of Morris. The objective function is evaluated along random
+trajectories that change one parameter at a time by a fixed step, and the
+influence of a parameter is measured by the mean absolute change of the
+objective function per unit step (mu*) and its spread (sigma). A large
+mu* denotes an important parameter, a large sigma a parameter that
+interacts with the others or acts non-linearly.
+
+The parameters found unimportant are then fixed, by
+`Parameter.set_as_const`, in a reduced model that has only the important
+parameters as variables.
+"""
+import os
+import copy
+import shutil
+import tempfile
+import numpy
+
+from model import Model
+from modeldata import ModelData
+from design import get_parameter_range
+from design import save_parameter_values
+from design import restore_parameter_values
+
+__docformat__ = 'restructuredtext'
+
+
+def create_morris_design(nFactors, nTrajectories=10, nLevels=4, seed=0):
+    '''
+
+    Return the Morris trajectories in the unit hypercube, an array of shape
+    (nTrajectories, nFactors + 1, nFactors). The starting point of a
+    trajectory is on the grid of `nLevels` levels and each step moves one
+    factor, in a random order, by nLevels/(2*(nLevels - 1)).
+    '''
+    generator = numpy.random.RandomState(seed)
+    delta = nLevels/(2.0*(nLevels - 1))
+    levels = numpy.arange(nLevels)/float(nLevels - 1)
+    levels = levels[levels <= 1.0 - delta + 1.0e-12]
+    design = numpy.zeros((nTrajectories, nFactors + 1, nFactors))
+    for t in range(nTrajectories):
+        x = generator.choice(levels, size=nFactors)
+        design[t, 0] = x
+        for step, i in enumerate(generator.permutation(nFactors)):
+            x = x.copy()
+            if (x[i] + delta <= 1.0 + 1.0e-12) and \
+                   ((x[i] - delta < -1.0e-12) or (generator.rand() < 0.5)):
+                x[i] = x[i] + delta
+            else:
+                x[i] = x[i] - delta
+            design[t, step + 1] = x
+    return design
+
+
+def get_elementary_effects(design, values):
+    '''
+
+    Return the mean absolute elementary effect (mu*) and the standard
+    deviation of the elementary effects (sigma) of each factor. `values`
+    holds the objective function values at the points of the design, None
+    for a failed evaluation; the steps involving a failure are ignored.
+    '''
+    nTrajectories, nPoints, nFactors = design.shape
+    effects = [[] for i in range(nFactors)]
+    for t in range(nTrajectories):
+        for step in range(1, nPoints):
+            change = design[t, step] - design[t, step - 1]
+            i = int(numpy.argmax(numpy.abs(change)))
+            if (change[i] == 0.0) or (values[t][step] is None) or \
+                   (values[t][step - 1] is None):
+                continue
+            effects[i].append((values[t][step] - values[t][step - 1])/\
+                              change[i])
+    muStar = []
+    sigma = []
+    for i in range(nFactors):
+        if len(effects[i]) == 0:
+            muStar.append(None)
+            sigma.append(None)
+        else:
+            muStar.append(float(numpy.mean(numpy.abs(effects[i]))))
+            sigma.append(float(numpy.std(effects[i])))
+    return muStar, sigma
+
+
+def screen_parameters(model, nTrajectories=10, nLevels=4, seed=0,
+                      evaluation=None):
+    '''
+
+    Screen the numerical parameters of a model. The points of the Morris
+    design are evaluated in a single batch so that the platform of the
+    model runs their tests concurrently. The points are evaluated by
+    `evaluation`, an in-process `ModelEvaluation` of the model by default.
+
+    Return the list of the screened parameters as tuples (name, mu*,
+    sigma), the most important first. The categorical parameters are not
+    screened. The values of the parameters of the model are the same after
+    the screening as before, and the default evaluation saves the model in
+    a temporary file, not in the model file.
+    '''
+    variables = model.variables
+    screened = [i for i in range(len(variables)) \
+                if not variables[i].is_categorical]
+    ranges = [get_parameter_range(variables[i]) for i in screened]
+    design = create_morris_design(len(screened), nTrajectories=nTrajectories,
+                                  nLevels=nLevels, seed=seed)
+    points = []
+    for t in range(nTrajectories):
+        for x in design[t]:
+            point = [var.value for var in variables]
+            for u, i, (low, high) in zip(x, screened, ranges):
+                value = low + u*(high - low)
+                if variables[i].is_integer:
+                    value = int(round(value))
+                point[i] = value
+            points.append(point)
+    # The rounding of the integer parameters changes the actual steps
+    for t in range(nTrajectories):
+        for step in range(design.shape[1]):
+            point = points[t*design.shape[1] + step]
+            for j, i in enumerate(screened):
+                low, high = ranges[j]
+                design[t, step, j] = (point[i] - low)/(high - low)
+    workDir = None
+    if evaluation is None:
+        from ..Solvers.mads import ModelEvaluation
+        workDir = tempfile.mkdtemp()
+        evaluation = ModelEvaluation(model,
+                                     dataFile=os.path.join(workDir,
+                                                           'screening.dat'))
+    savedValues = save_parameter_values(model)
+    evaluation.start()
+    try:
+        evaluated = evaluation.evaluate(points)
+    finally:
+        evaluation.stop()
+        restore_parameter_values(savedValues)
+        if workDir is not None:
+            shutil.rmtree(workDir)
+    objValues = {}
+    for point, values in evaluated:
+        if values is None:
+            objValues[tuple(point)] = None
+        else:
+            objValues[tuple(point)] = values[0]
+    values = [[objValues.get(tuple(points[t*design.shape[1] + step]), None) \
+               for step in range(design.shape[1])] \
+              for t in range(nTrajectories)]
+    muStar, sigma = get_elementary_effects(design, values)
+    ranking = [(variables[i].name, m, s) \
+               for i, m, s in zip(screened, muStar, sigma)]
+    ranking.sort(key=lambda r: -1.0 if r[1] is None else r[1], reverse=True)
+    return ranking
+
+
+def reduce_model(model, names):
+    '''
+
+    Return a model whose variables are the parameters of `model` named in
+    `names`. The other parameters are fixed to their current value: they
+    become the constant default of the parameter of the algorithm. The
+    reduced model works on a copy of the algorithm, `model` is left
+    unchanged.
+    '''
+    algorithm, variables = copy.deepcopy((model.data.get_algorithm(),
+                                          model.variables))
+    kept = []
+    for param in variables:
+        if param.name in names:
+            kept.append(param)
+            continue
+        for fixed in [param, algorithm.parameters[param.name]]:
+            fixed.set_default(param.value)
+            fixed.set_as_const()
+    data = ModelData(algorithm,
+                     problems=model.data.get_problems(),
+                     parameters=kept,
+                     measures=model.data.get_measures(),
+                     neighborhoods=model.data.neighborhoods,
+                     **model.data.running_options)
+    reduced = Model(modelData=data,
+                    modelStructure=model.structure,
+                    evaluatingOptions=model.evaluating_options,
+                    dataFile=model.data_file)
+    reduced.platform_description = dict(model.platform_description)
+    return reduced
+
+
+def screen_model(model, nParameters=None, threshold=0.05, nTrajectories=10,
+                 nLevels=4, seed=0, evaluation=None):
+    '''
+
+    Screen the parameters of a model and return the reduced model of the
+    important ones together with the ranking of `screen_parameters`. The
+    `nParameters` most important parameters are kept if it is given,
+    otherwise those whose mu* is at least `threshold` times the largest
+    one. The categorical parameters are always kept.
+    '''
+    ranking = screen_parameters(model, nTrajectories=nTrajectories,
+                                nLevels=nLevels, seed=seed,
+                                evaluation=evaluation)
+    if nParameters is not None:
+        important = [name for name, m, s in ranking[:nParameters]]
+    else:
+        largest = max([m for name, m, s in ranking if m is not None] + [0.0])
+        important = [name for name, m, s in ranking \
+                     if (m is None) or (m >= threshold*largest)]
+    names = [param.name for param in model.variables \
+             if param.is_categorical or (param.name in important)]
+    return reduce_model(model, names), ranking
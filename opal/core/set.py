@@ -8,54 +8,70 @@ class Set:
     elements in the Set is assigned a key that is actually the identity of
     elements. A requirement applied to the elements of a Set object is each
     element has a method that show its identity.
+
+    The elements are stored in a list and their positions in a dictionary
+    indexed by identity, so that the membership test and the access by
+    identity take a constant time. A removed element leaves a tombstone
+    (None) in the list instead of shifting the next elements; the
+    tombstones are dropped by `compact`, which is called when they make up
+    half of the list or before an access by position.
     """
+    n_removed = 0 # Number of tombstones (sets pickled without it have none)
+
     def __init__(self,name="", elements=[], *argv, **kwargv):
         self.name = name
         self.indices = {}
         self.db = []
-        if len(elements) > 0:
-            index = 0
-            for elem in elements:
-                self.indices[elem.identify()] = index
-                self.db.append(elem)
-                index = index + 1
+        self.n_removed = 0
+        for elem in elements:
+            self.append(elem)
         return
-    
+
     def __getitem__(self, id):
         '''
 
         A data set object provide two ways to access an element: by order or by
-        identity that provided by methode {\sf identify()} 
+        identity that provided by methode {\sf identify()}
         '''
         if (type(id) == type(0)):
+            if self.n_removed > 0:
+                self.compact()
             return self.db[id]
         else:
             return self.db[self.indices[id]]
-      
+
     def __len__(self):
-        return len(self.db)
+        return len(self.indices)
+
+    def __iter__(self):
+        if self.n_removed == 0:
+            return iter(self.db)
+        return (elem for elem in self.db if elem is not None)
+
+    def get_identity(self, elem):
+        '''
+
+        Return the identity of an element, or the given value itself if it is
+        not an element, i.e. it has no identify() method
+        '''
+        if isinstance(elem, basestring):
+            return elem
+        try:
+            return elem.identify()
+        except AttributeError:
+            return elem
 
     def __contains__(self, elem):
         '''
 
-        There are two way to verify the existence of an element in a DataSet 
+        There are two way to verify the existence of an element in a DataSet
         object.
         Either element or its identity can be provided for the verification.
         '''
-        # if this is an empty DataSet object the False signal is returned 
-        # immediately
-        if len(self.indices) <= 0:
+        try:
+            return self.get_identity(elem) in self.indices
+        except TypeError: # Not hashable, thus neither an identity
             return False
-        idType = type(self.indices.keys()[0])
-        # Identity is provided to the verifcation
-        if type(elem) == idType:
-            return (elem in self.indices.keys())
-        # Element is provided
-        else:
-            try:
-                return (elem.identify() in self.indices.keys())
-            except:
-                return False
 
     def append(self, elem):
         '''
@@ -63,45 +79,45 @@ class Set:
         Add an element to the set
         '''
         # An element with the same name is in the set. Nothing to add
-        if elem.identify() in self.indices:
-            return 
-        self.indices[elem.identify()] = len(self.db)
+        id = elem.identify()
+        if id in self.indices:
+            return
+        self.indices[id] = len(self.db)
         self.db.append(elem)
         return
 
     def remove(self, elem):
         '''
 
-        Remove an element from the set.
+        Remove an element from the set. The element or its identity can be
+        given.
         '''
-        if len(self.inidces) <= 0:
+        if len(self.indices) <= 0:
             return
-        idType = type(self.indices.keys()[0])
-        if type(elem) == idType:
-            try:
-                index = self.indices[elem]
-            except:
-                raise IndexError
-        else:
-            try:
-                index = self.indices[elem.identify()]
-            except:
-                raise IndexError
-        i = index + 1
-        # Update the indices
-        while i < len(self.db):
-            id = self.db[i].identify()
-            self.indices[id] = self.indices[id] - 1
-            i = i + 1
-        # Remove the element from the database and remove its index
-        id = self.db[index].identify()
-        self.db.remove(self.db[index])
-        del self.indices[id]
-        return 
+        id = self.get_identity(elem)
+        if id not in self.indices:
+            raise IndexError, 'Element can not be found in the set'
+        self.db[self.indices.pop(id)] = None
+        self.n_removed = self.n_removed + 1
+        if 2*self.n_removed >= len(self.db):
+            self.compact()
+        return
+
+    def compact(self):
+        '''
+
+        Drop the tombstones left by the removed elements and renumber the
+        positions of the other ones
+        '''
+        self.db = [elem for elem in self.db if elem is not None]
+        for index in range(len(self.db)):
+            self.indices[self.db[index].identify()] = index
+        self.n_removed = 0
+        return
 
     def select(self, query):
         queryResult = Set(name='query-result')
-        for elem in self.db:
+        for elem in self:
             if query.match(elem):
-                queryResult.append(prob)
+                queryResult.append(elem)
         return queryResult
@@ -0,0 +1,213 @@
+"""
+
+This module contains the statistical tools used to deal with the noisy
+measures: the sample statistics of repeated observations and the quantiles
+of the normal and Student distributions needed by the confidence intervals
+and the tests.
+"""
+import math
+
+
+def normal_quantile(p):
+    '''
+
+    Return the p-quantile of the standard normal distribution. The quantile
+    is found by bisection on the distribution function.
+    '''
+    if (p <= 0.0) or (p >= 1.0):
+        raise ValueError, 'Probability must be in (0, 1)'
+    low = -40.0
+    high = 40.0
+    for i in range(100):
+        middle = 0.5*(low + high)
+        if 0.5*(1.0 + math.erf(middle/math.sqrt(2.0))) < p:
+            low = middle
+        else:
+            high = middle
+    return 0.5*(low + high)
+
+
+def student_quantile(p, dof):
+    '''
+
+    Return the p-quantile of the Student distribution with `dof` degrees of
+    freedom. The quantile is exact for one and two degrees of freedom and is
+    given by the Cornish-Fisher expansion otherwise.
+    '''
+    if dof == 1:
+        return math.tan(math.pi*(p - 0.5))
+    if dof == 2:
+        return (2.0*p - 1.0)/math.sqrt(2.0*p*(1.0 - p))
+    z = normal_quantile(p)
+    v = float(dof)
+    return z + (z**3 + z)/(4*v) + \
+           (5*z**5 + 16*z**3 + 3*z)/(96*v**2) + \
+           (3*z**7 + 19*z**5 + 17*z**3 - 15*z)/(384*v**3) + \
+           (79*z**9 + 776*z**7 + 1482*z**5 - 1920*z**3 - 945*z)/(92160*v**4)
+
+
+class Sample:
+    """
+
+    Running statistics of repeated observations of a quantity. The mean and
+    the variance are updated by Welford's method so that the observations
+    need not be stored.
+    """
+    def __init__(self, values=[]):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        for value in values:
+            self.add(value)
+        return
+
+    def add(self, value):
+        self.n = self.n + 1
+        delta = value - self.mean
+        self.mean = self.mean + delta/self.n
+        self.m2 = self.m2 + delta*(value - self.mean)
+        return
+
+    def __len__(self):
+        return self.n
+
+    def get_mean(self):
+        return self.mean
+
+    def get_variance(self):
+        if self.n < 2:
+            return 0.0
+        return self.m2/(self.n - 1)
+
+    def get_half_width(self, confidence=0.95):
+        '''
+
+        Return the half width of the confidence interval of the mean
+        '''
+        if self.n < 2:
+            return float('inf')
+        quantile = student_quantile(0.5*(1.0 + confidence), self.n - 1)
+        return quantile*math.sqrt(self.get_variance()/self.n)
+
+    def get_interval(self, confidence=0.95):
+        halfWidth = self.get_half_width(confidence)
+        return (self.mean - halfWidth, self.mean + halfWidth)
+
+
+def chi_square_quantile(p, dof):
+    '''
+
+    Return the p-quantile of the chi-square distribution with `dof` degrees
+    of freedom by the Wilson-Hilferty approximation.
+    '''
+    z = normal_quantile(p)
+    v = float(dof)
+    return v*(1.0 - 2.0/(9.0*v) + z*math.sqrt(2.0/(9.0*v)))**3
+
+
+def rank(values):
+    '''
+
+    Return the ranks of the values, starting from 1. Tied values share the
+    average of their ranks.
+    '''
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    ranks = [0.0]*len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while (j + 1 < len(order)) and \
+                  (values[order[j + 1]] == values[order[i]]):
+            j = j + 1
+        for l in range(i, j + 1):
+            ranks[order[l]] = 0.5*(i + j) + 1.0
+        i = j + 1
+    return ranks
+
+
+def paired_t_test(table, confidence=0.95):
+    '''
+
+    Compare two candidates by the paired t-test. The table has one row by
+    block (problem) and one column by candidate; smaller values are better.
+    Return the list of indices of the candidates that are significantly
+    worse than the other one.
+    '''
+    differences = Sample([row[0] - row[1] for row in table])
+    mean = differences.get_mean()
+    if mean == 0.0:
+        return []
+    if differences.get_variance() == 0.0:
+        significant = True
+    else:
+        significant = abs(mean) > differences.get_half_width(confidence)
+    if not significant:
+        return []
+    if mean > 0:
+        return [0]
+    return [1]
+
+
+def friedman_race(table, confidence=0.95):
+    '''
+
+    Compare the candidates by the Friedman test followed, if the test
+    rejects the equivalence of all candidates, by the pairwise comparisons
+    of each candidate with the best one as in the F-race method. The table
+    has one row by block (problem) and one column by candidate; smaller
+    values are better. Return the list of indices of the candidates that
+    are significantly worse than the best one.
+    '''
+    n = len(table)
+    k = len(table[0])
+    if (n < 2) or (k < 2):
+        return []
+    if k == 2:
+        return paired_t_test(table, confidence)
+    ranks = [rank(row) for row in table]
+    rankSums = [sum([ranks[i][j] for i in range(n)]) for j in range(k)]
+    a = sum([r*r for row in ranks for r in row])
+    c = n*k*(k + 1)**2/4.0
+    if a == c: # All candidates are tied in every block
+        return []
+    t = (k - 1)*sum([(r - n*(k + 1)/2.0)**2 for r in rankSums])/(a - c)
+    if t <= chi_square_quantile(confidence, k - 1):
+        return []
+    dof = (n - 1)*(k - 1)
+    criticalDifference = student_quantile(0.5*(1.0 + confidence), dof)*\
+        math.sqrt(2.0*(n*a - sum([r*r for r in rankSums]))/dof)
+    best = min(rankSums)
+    return [j for j in range(k) if rankSums[j] - best > criticalDifference]
+
+
+def kendall_tau(x, y):
+    '''
+
+    Return the Kendall rank correlation (tau-b, accounting for the ties)
+    between two lists of values. The correlation of a constant list with
+    another one is taken as 0.
+    '''
+    concordant = 0
+    discordant = 0
+    xTies = 0
+    yTies = 0
+    n = len(x)
+    for i in range(n):
+        for j in range(i + 1, n):
+            dx = x[i] - x[j]
+            dy = y[i] - y[j]
+            if (dx == 0) and (dy == 0):
+                continue
+            if dx == 0:
+                xTies = xTies + 1
+            elif dy == 0:
+                yTies = yTies + 1
+            elif (dx > 0) == (dy > 0):
+                concordant = concordant + 1
+            else:
+                discordant = discordant + 1
+    denominator = math.sqrt((concordant + discordant + xTies)*\
+                            (concordant + discordant + yTies))
+    if denominator == 0:
+        return 0.0
+    return (concordant - discordant)/denominator
@@ -10,6 +10,7 @@ from mafrw import Message
 
 from set import Set
 from data import DataTable
+from statistics import friedman_race
 
 
 class DataCacheEntry(DataTable):
@@ -19,6 +20,8 @@ class DataCacheEntry(DataTable):
     '''
     def __init__(self, name, parameters, problems, measures):
         self.parameters = parameters
+        # Number of runs and variances of the noisy measures by problem
+        self.statistics = {}
         DataTable.__init__(self,
                            name=name,
                            rowIdentities=problems,
@@ -113,9 +116,12 @@ class StructureEvaluator(Agent):
                                                         self.create_cache_entry
         return
 
-    def update_data_cache(self, paramTag, problem, measureValues):
+    def update_data_cache(self, paramTag, problem, measureValues,
+                          statistics=None):
         entry = self.data_cache.__getitem__(paramTag)
         entry.update_row(problem, measureValues)
+        if statistics is not None:
+            entry.statistics[problem] = statistics
         #log.debugger.log(str(entry.table))
         # Return updated entry information.
         storageRatio = entry.get_storage_ratio()
@@ -160,7 +166,9 @@ class StructureEvaluator(Agent):
             self.send_message(msg)
             return
         
-        storageInfo = self.update_data_cache(paramTag, problem, measureValues)
+        storageInfo = self.update_data_cache(
+            paramTag, problem, measureValues,
+            statistics=info['proposition'].get('statistics', None))
         # Compute the model values
         parameters = self.data_cache.get_parameters(paramTag)
         storageRatio, measures = self.data_cache.get_measure_vectors(paramTag)
@@ -222,10 +230,12 @@ class StructureEvaluator(Agent):
         for cons in self.structure.constraints:
             consVals.append(cons.evaluate(parameters, measures))
     
+        entry = self.data_cache.__getitem__(paramTag)
         msg = Message(performative='inform',
                           sender=self.id,
                           content={'proposition':{'what':'model-value',
                                                   'values':(objVal, consVals),
+                                                  'measure-values':entry.table,
                                                   'parameter-tag':paramTag
                                                   }
                                    })
@@ -233,6 +243,164 @@ class StructureEvaluator(Agent):
         return
 
 
+class RacingEvaluator(StructureEvaluator):
+    """
+
+    A structure evaluator that races the parameter points evaluated at the
+    same time, in the manner of F-race. The test problems of every point are
+    solved in the same order. Each time a new problem is solved for all of
+    the points still in the race, the points are compared by the Friedman
+    test (the paired t-test when two points remain) on their contributions
+    to the objective function, i.e. the objective function evaluated on
+    each problem alone. The points that are significantly worse than the
+    best one are eliminated: their remaining experiments are cancelled so
+    that the platform works for the survivors only, and they are given no
+    model value.
+
+    The comparison starts once `minProblems` problems are solved by every
+    point in the race. A point leaves the race when it is completely
+    evaluated, when one of its tests fails and when its evaluation is
+    cancelled, so that the remaining points keep being compared.
+    """
+    def __init__(self,
+                 name='structure evaluator',
+                 structure=None,
+                 problems=None,
+                 measures=None,
+                 confidence=0.95,
+                 minProblems=5,
+                 logHandlers=[],
+                 **kwargs):
+        StructureEvaluator.__init__(self,
+                                    name=name,
+                                    structure=structure,
+                                    problems=problems,
+                                    measures=measures,
+                                    logHandlers=logHandlers)
+        self.confidence = confidence
+        self.min_problems = minProblems
+        # Contributions to the objective function by parameter tag and by
+        # problem
+        self.scores = {}
+        self.eliminated = [] # Tags of the points whose results are ignored
+        self.n_compared_problems = 0
+        self.message_handlers['inform-evaluation-cancelled'] = \
+                                                        self.cancel_racer
+        self.message_handlers['inform-objective-partially-exceed'] = \
+                                                        self.cancel_racer
+        self.message_handlers['inform-constraint-partially-violated'] = \
+                                                        self.cancel_racer
+        return
+
+    def get_score(self, paramTag, problem):
+        '''
+
+        Return the objective function evaluated on the measures of one
+        problem
+        '''
+        entry = self.data_cache.__getitem__(paramTag)
+        row = entry.get_row(problem)
+        measures = {}
+        for measureId in row.keys():
+            measures[measureId] = [row[measureId]]
+        return self.structure.objective.evaluate(entry.parameters, measures)
+
+    def get_racers(self):
+        return self.scores.keys()
+
+    def withdraw(self, paramTag):
+        '''
+
+        Take a point out of the race
+        '''
+        if paramTag in self.scores:
+            del self.scores[paramTag]
+            # The new set of racers may share more problems than the old one
+            self.n_compared_problems = 0
+        return
+
+    def race(self):
+        '''
+
+        Compare the points in the race on the problems solved by all of
+        them and return the tags of the points to eliminate
+        '''
+        racers = self.get_racers()
+        if len(racers) < 2:
+            return []
+        problems = [prob.identify() for prob in self.data_cache.problems]
+        common = [prob for prob in problems \
+                  if len([tag for tag in racers \
+                          if prob in self.scores[tag]]) == len(racers)]
+        if (len(common) < self.min_problems) or \
+               (len(common) <= self.n_compared_problems):
+            return []
+        self.n_compared_problems = len(common)
+        table = [[self.scores[tag][prob] for tag in racers] \
+                 for prob in common]
+        return [racers[j] for j in friedman_race(table, self.confidence)]
+
+    def eliminate(self, paramTag):
+        self.eliminated.append(paramTag)
+        self.withdraw(paramTag)
+        entry = self.data_cache.__getitem__(paramTag)
+        if entry.get_storage_ratio() >= 1.0:
+            # The point is completely evaluated, there is nothing to stop
+            return
+        msg = Message(performative='inform',
+                      sender=self.id,
+                      content={'proposition':\
+                               {'what':'objective-partially-exceed',
+                                'why':'eliminated by racing',
+                                'parameter-tag':paramTag
+                                }}
+                      )
+        self.send_message(msg)
+        return
+
+    # Message handlers
+
+    def create_cache_entry(self, info):
+        # A point evaluated again after its elimination or its cancellation
+        # is raced again
+        paramTag = info['proposition']['tag']
+        if paramTag in self.eliminated:
+            self.eliminated.remove(paramTag)
+        self.withdraw(paramTag)
+        StructureEvaluator.create_cache_entry(self, info)
+        return
+
+    def cancel_racer(self, info):
+        paramTag = info['proposition']['parameter-tag']
+        if paramTag not in self.eliminated:
+            self.eliminated.append(paramTag)
+        self.withdraw(paramTag)
+        return
+
+    def evaluate(self, info):
+        paramTag = info['proposition']['parameter-tag']
+        if paramTag in self.eliminated:
+            # Late result of an eliminated or cancelled point
+            return
+        StructureEvaluator.evaluate(self, info)
+        if info['proposition']['values'] is None:
+            # The point fails, it can not be compared any more
+            self.cancel_racer(info)
+            return
+        problem = info['proposition']['problem']
+        if paramTag not in self.scores.keys():
+            self.scores[paramTag] = {}
+        self.scores[paramTag][problem] = self.get_score(paramTag, problem)
+        for loser in self.race():
+            self.eliminate(loser)
+        if (paramTag not in self.eliminated) and \
+               (self.data_cache.__getitem__(paramTag).get_storage_ratio() \
+                >= 1.0):
+            # The point is completely evaluated, it has a model value
+            self.withdraw(paramTag)
+        return
+
+
 class FunctionEvaluator(Agent):
     """
     An agent that has responsibility to 
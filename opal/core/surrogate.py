@@ -0,0 +1,232 @@
+"""
+
+This module contains the surrogates learned from the evaluation history of
+a model. A surrogate is fitted to the points evaluated so far and predicts
+the model values (objective function and constraints) of a new point
+without running any test. It is intended to be given to a solver, for
+example NOMAD through its `SGTE_EXE` option, in place of a cheaper model.
+"""
+import pickle
+import numpy
+
+from mafrw import Agent
+from mafrw import Message
+from history import load_history
+from history import get_history_end
+
+__docformat__ = 'restructuredtext'
+
+
+class Surrogate:
+    """
+
+    A surrogate of a model learned from its evaluation history. Each model
+    value (the objective function and the bounds of the constraints) is
+    approximated by its own interpolant. The points are scaled into the unit
+    box given by the bounds of the parameters, or by the range of the
+    evaluated points where a bound is missing.
+
+    The interpolant is a cubic radial basis function with a linear tail.
+    The tail is reduced to a constant when there are too few points to fit
+    it. A sub-class provides another interpolant by overriding `fit_values`
+    and `predict_values`.
+    """
+    def __init__(self, name='surrogate', bounds=None, historyFile=None,
+                 **kwargs):
+        self.name = name
+        self.bounds = bounds
+        self.history_file = historyFile
+        self.n_points = 0
+        self.shift = None
+        self.scale = None
+        self.models = None
+        self.structure = None # Positions of the None constraint values
+        return
+
+    def fit_history(self, history=None):
+        '''
+
+        Fit the surrogate to the successful evaluations of a history. Return
+        True if there is at least one evaluation to learn from.
+        '''
+        if history is None:
+            history = load_history(self.history_file)
+        points = []
+        outputs = []
+        for record in history:
+            if record['values'] is None:
+                continue
+            try:
+                point = [float(coordinate) for coordinate in record['point']]
+            except (TypeError, ValueError): # A categorical parameter
+                continue
+            objValue, consValues = record['values']
+            points.append(point)
+            outputs.append([objValue] + \
+                           [bound for cons in consValues for bound in cons])
+            self.structure = [[bound is None for bound in cons] \
+                              for cons in consValues]
+        if len(points) == 0:
+            return False
+        outputs = [[numpy.nan if value is None else float(value) \
+                    for value in output] for output in outputs]
+        self.fit(numpy.array(points), numpy.array(outputs))
+        return True
+
+    def fit(self, points, outputs):
+        self.n_points = points.shape[0]
+        low = points.min(axis=0)
+        high = points.max(axis=0)
+        if self.bounds is not None:
+            for i in range(len(self.bounds)):
+                if self.bounds[i] is None:
+                    continue
+                if self.bounds[i][0] is not None:
+                    low[i] = self.bounds[i][0]
+                if self.bounds[i][1] is not None:
+                    high[i] = self.bounds[i][1]
+        self.shift = low
+        self.scale = numpy.where(high > low, high - low, 1.0)
+        x = (points - self.shift)/self.scale
+        self.models = []
+        for j in range(outputs.shape[1]):
+            known = ~numpy.isnan(outputs[:, j])
+            if not known.any():
+                self.models.append(None)
+            else:
+                self.models.append(self.fit_values(x[known],
+                                                   outputs[known, j]))
+        return
+
+    def predict(self, point):
+        '''
+
+        Return the predicted model values of a point in the form of the
+        `model-value` messages, i.e. the objective function value and the
+        list of the constraint values
+        '''
+        x = (numpy.array([float(c) for c in point]) - self.shift)/self.scale
+        outputs = [None if model is None else \
+                   float(self.predict_values(model, x)) \
+                   for model in self.models]
+        objValue = outputs[0]
+        consValues = []
+        j = 1
+        for cons in self.structure:
+            values = []
+            for isNone in cons:
+                if isNone:
+                    values.append(None)
+                else:
+                    values.append(outputs[j])
+                j = j + 1
+            consValues.append(values)
+        return objValue, consValues
+
+    def fit_values(self, x, y):
+        n, d = x.shape
+        if n > d:
+            tail = numpy.hstack([numpy.ones((n, 1)), x])
+        else:
+            tail = numpy.ones((n, 1))
+        m = tail.shape[1]
+        differences = x[:, None, :] - x[None, :, :]
+        distances = numpy.sqrt((differences**2).sum(axis=2))
+        system = numpy.zeros((n + m, n + m))
+        system[:n, :n] = distances**3
+        system[:n, n:] = tail
+        system[n:, :n] = tail.T
+        rhs = numpy.concatenate([y, numpy.zeros(m)])
+        coefficients = numpy.linalg.lstsq(system, rhs, rcond=None)[0]
+        return (x, coefficients[:n], coefficients[n:])
+
+    def predict_values(self, model, x):
+        centers, weights, tailCoefficients = model
+        distances = numpy.sqrt(((centers - x)**2).sum(axis=1))
+        value = numpy.dot(weights, distances**3) + tailCoefficients[0]
+        if len(tailCoefficients) > 1:
+            value = value + numpy.dot(tailCoefficients[1:], x)
+        return value
+
+
+# The radial basis function surrogate under its explicit name
+RBFSurrogate = Surrogate
+
+
+class QuadraticSurrogate(Surrogate):
+    """
+
+    A quadratic model fitted by least squares. With fewer points than
+    coefficients, the minimum norm model is taken.
+    """
+    def get_features(self, x):
+        d = x.shape[-1]
+        features = [numpy.ones(x.shape[:-1])]
+        features.extend([x[..., i] for i in range(d)])
+        features.extend([x[..., i]*x[..., j] \
+                         for i in range(d) for j in range(i, d)])
+        return numpy.array(features).T
+
+    def fit_values(self, x, y):
+        return numpy.linalg.lstsq(self.get_features(x), y, rcond=None)[0]
+
+    def predict_values(self, model, x):
+        return numpy.dot(self.get_features(x), model)
+
+
+class SurrogateEvaluator(Agent):
+    """
+
+    An agent that evaluates the points with a surrogate instead of the
+    model. The surrogate is fitted again to the history when records have
+    been appended to it since the last fit, so that it follows the
+    evaluations made by the blackbox. A point is given the value 1e+20 by
+    the communicator while the history is empty.
+    """
+    def __init__(self,
+                 name='surrogate evaluator',
+                 surrogate=None,
+                 surrogateFile=None,
+                 logHandlers=[],
+                 **kwargs):
+        Agent.__init__(self, name=name, logHandlers=logHandlers)
+        if surrogate is None:
+            if surrogateFile is not None:
+                f = open(surrogateFile)
+                surrogate = pickle.load(f)
+                f.close()
+        if surrogate is None:
+            raise Exception("Error in creating a surrogate evaluator")
+        self.surrogate = surrogate
+        self.history_end = None # End of the history at the last fit
+        self.fitted = False
+        self.message_handlers['cfp-evaluate-point'] = self.evaluate
+        return
+
+    def update_surrogate(self):
+        '''
+
+        Fit the surrogate again if the history has grown since the last fit.
+        Return True if the surrogate has been fitted to some evaluations.
+        '''
+        historyEnd = get_history_end(self.surrogate.history_file)
+        if historyEnd != self.history_end:
+            self.fitted = self.surrogate.fit_history()
+            self.history_end = historyEnd
+        return self.fitted
+
+    # Message handlers
+
+    def evaluate(self, info):
+        point = info['proposition']['point']
+        proposition = {'what':'model-value'}
+        if self.update_surrogate():
+            proposition['values'] = self.surrogate.predict(point)
+        else:
+            proposition['values'] = None
+            proposition['why'] = 'empty history'
+        msg = Message(performative='inform',
+                      sender=self.id,
+                      content={'proposition':proposition})
+        self.send_message(msg)
+        return
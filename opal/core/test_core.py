@@ -9,3 +9,667 @@ def test_multi_agent_framework():
     
 
     
+
+def test_queue_system():
+    from platform import QueueSystem
+
+    queues = QueueSystem()
+    queues.set_weight('b', 2)
+    for task in ['a1', 'a2', 'a3']:
+        queues.append(task, queue='a')
+    for task in ['b1', 'b2', 'b3']:
+        queues.append(task, queue='b')
+    queues.append('c1', queue='c')
+    assert queues.get_length() == 7
+    order = [queues.pop() for i in range(5)]
+    assert order == ['a1', 'b1', 'b2', 'c1', 'a2']
+    assert queues.remove_tasks(queue='b') == ['b3']
+    assert queues.remove_tasks(queue='b') == []
+    assert queues.get_length() == 1
+    assert queues.pop() == 'a3'
+    assert queues.get_length() == 0
+
+
+def test_sample_statistics():
+    from statistics import Sample
+    from statistics import student_quantile
+
+    sample = Sample([1.0, 2.0, 3.0, 4.0])
+    assert abs(sample.get_mean() - 2.5) < 1e-12
+    assert abs(sample.get_variance() - 5.0/3) < 1e-12
+    assert abs(student_quantile(0.975, 10) - 2.228) < 1e-3
+    assert abs(student_quantile(0.975, 1) - 12.706) < 1e-3
+    low, high = sample.get_interval(0.95)
+    assert low < 2.5 < high
+
+
+def test_racing_evaluator():
+    from statistics import friedman_race
+    from testproblem import TestProblem
+    from measure import Measure
+    from modelstructure import ModelStructure
+    from structureevaluator import RacingEvaluator
+
+    table = [[1.0, 2.0, 3.0], [1.5, 2.5, 3.5], [1.0, 3.0, 2.0],
+             [0.5, 2.0, 3.0], [1.0, 2.0, 3.0], [1.0, 2.5, 3.0]]
+    assert friedman_race(table) == [1, 2]
+    assert friedman_race([[1.0, 1.0, 1.0]]*6) == []
+
+    def objective(parameters, measures):
+        return sum(measures['TIME'])
+
+    problems = [TestProblem(name='P' + str(i)) for i in range(8)]
+    evaluator = RacingEvaluator(structure=ModelStructure(objective=objective),
+                                problems=problems,
+                                measures=[Measure(name='TIME')],
+                                minProblems=4)
+    messages = []
+    evaluator.send_message = messages.append
+    for tag, time in [('fast', 1.0), ('slow', 3.0), ('failed', 2.0),
+                      ('cancelled', 2.0)]:
+        evaluator.create_cache_entry({'proposition':{'tag':tag,
+                                                     'parameter':[time]}})
+    # The failed and cancelled points do not stop the race
+    evaluator.evaluate({'proposition':{'parameter-tag':'failed',
+                                       'problem':'P0',
+                                       'values':None}})
+    evaluator.evaluate({'proposition':{'parameter-tag':'cancelled',
+                                       'problem':'P0',
+                                       'values':{'TIME':2.0}}})
+    evaluator.cancel_racer({'proposition':{'parameter-tag':'cancelled'}})
+    for i in range(5):
+        for tag, time in [('fast', 1.0 + 0.1*i), ('slow', 3.0 - 0.1*i)]:
+            evaluator.evaluate({'proposition':{'parameter-tag':tag,
+                                               'problem':'P' + str(i),
+                                               'values':{'TIME':time}}})
+    assert evaluator.eliminated == ['failed', 'cancelled', 'slow']
+    assert evaluator.get_racers() == ['fast']
+    # A completely evaluated point leaves the race
+    for i in range(5, 8):
+        evaluator.evaluate({'proposition':{'parameter-tag':'fast',
+                                           'problem':'P' + str(i),
+                                           'values':{'TIME':1.0}}})
+    assert evaluator.get_racers() == []
+    eliminations = [msg for msg in messages \
+                    if msg.content['proposition']['what'] == \
+                    'objective-partially-exceed']
+    assert len(eliminations) == 1
+
+
+def test_learned_surrogate():
+    import os
+    import tempfile
+    try:
+        import numpy
+    except ImportError:
+        from nose.plugins.skip import SkipTest
+        raise SkipTest('numpy is not available')
+    from history import record_evaluation
+    from history import load_history
+    from history import get_history_end
+    from surrogate import RBFSurrogate
+    from surrogate import QuadraticSurrogate
+    from surrogate import SurrogateEvaluator
+
+    historyFile = tempfile.mktemp(suffix='.hist')
+    points = [[x, y] for x in [0.0, 0.5, 1.0] for y in [0.0, 0.5, 1.0]]
+    for point in points:
+        value = (point[0] - 0.3)**2 + 2*point[1]**2
+        record_evaluation(historyFile, [str(c) for c in point],
+                          (value, [[None, point[0] - 1.0]]))
+    end = get_history_end(historyFile)
+    record_evaluation(historyFile, ['0.2', '0.2'], None)
+    assert len(load_history(historyFile)) == 10
+    # Only the records appended after a position are loaded from it
+    assert load_history(historyFile, start=end)[0]['point'] == ['0.2', '0.2']
+    assert load_history(historyFile, start=get_history_end(historyFile)) == []
+
+    for surrogate in [RBFSurrogate(historyFile=historyFile),
+                      QuadraticSurrogate(historyFile=historyFile)]:
+        assert surrogate.fit_history()
+        objValue, consValues = surrogate.predict(['0.5', '0.5'])
+        assert abs(objValue - 0.54) < 1e-6
+        assert consValues[0][0] is None
+        assert abs(consValues[0][1] + 0.5) < 1e-6
+    objValue, consValues = surrogate.predict([0.25, 0.75])
+    assert abs(objValue - (0.05**2 + 2*0.75**2)) < 1e-6
+
+    # The evaluator fits the surrogate again only when the history grows
+    evaluator = SurrogateEvaluator(surrogate=RBFSurrogate(
+                                              historyFile=historyFile))
+    assert evaluator.update_surrogate()
+    models = evaluator.surrogate.models
+    assert evaluator.update_surrogate()
+    assert evaluator.surrogate.models is models
+    record_evaluation(historyFile, ['0.8', '0.8'], (1.53, [[None, -0.2]]))
+    assert evaluator.update_surrogate()
+    assert evaluator.surrogate.n_points == 10
+    os.remove(historyFile)
+
+
+def test_damaged_history():
+    import os
+    import pickle
+    import tempfile
+    from history import record_evaluation
+    from history import load_history
+    from history import ResultStore
+
+    historyFile = tempfile.mktemp(suffix='.hist')
+    for x in range(3):
+        record_evaluation(historyFile, [str(x)], (float(x), []))
+    # A crash cuts the last record short, then the campaign goes on
+    f = open(historyFile, 'rb+')
+    f.truncate(os.path.getsize(historyFile) - 5)
+    f.close()
+    for x in range(3, 5):
+        record_evaluation(historyFile, [str(x)], (float(x), []))
+    assert [record['point'] for record in load_history(historyFile)] == \
+           [['0'], ['1'], ['3'], ['4']]
+
+    storeFile = tempfile.mktemp(suffix='.results')
+    ResultStore(storeFile).add('p1', 'A', {'TIME':1.0})
+    f = open(storeFile, 'ab')
+    f.write('garbage')
+    f.close()
+    ResultStore(storeFile).add('p2', 'A', {'TIME':2.0})
+    store = ResultStore(storeFile)
+    assert len(store) == 2
+    assert store.get('p2', 'A') == ({'TIME':2.0}, None)
+
+    # The records written without frame by the older versions are read
+    f = open(historyFile, 'wb')
+    pickle.dump({'point':['5'], 'values':None}, f)
+    f.close()
+    record_evaluation(historyFile, ['6'], None)
+    assert [record['point'] for record in load_history(historyFile)] == \
+           [['5'], ['6']]
+    os.remove(historyFile)
+    os.remove(storeFile)
+
+
+def test_problem_selection():
+    from testproblem import TestProblem
+    from modelstructure import ModelStructure
+    from problemselection import select_problems
+
+    def objective(parameters, measures):
+        return sum(measures['HEVAL'])
+
+    problems = [TestProblem(name=name) for name in ['BIG', 'SMALL', 'FLAT']]
+    history = []
+    for i in range(6):
+        x = float(i)
+        history.append({'point':[x],
+                        'values':None,
+                        'measures':{'BIG':{'HEVAL':10*x, 'TIME':5.0},
+                                    'SMALL':{'HEVAL':(x % 2), 'TIME':1.0},
+                                    'FLAT':{'HEVAL':1.0, 'TIME':1.0}}})
+    history.append({'point':[9.0], 'values':None, 'measures':{}})
+    structure = ModelStructure(objective=objective)
+    selected, tau = select_problems(history, structure, problems)
+    assert [prob.name for prob in selected] == ['BIG']
+    assert tau == 1.0
+    selected, tau = select_problems(history, structure, problems, budget=2.0,
+                                    costMeasure='TIME')
+    assert 'BIG' not in [prob.name for prob in selected]
+    assert tau < 1.0
+    # A surrogate needs at least one problem
+    try:
+        select_problems(history, structure, problems, budget=0.5,
+                        costMeasure='TIME')
+    except Exception:
+        pass
+    else:
+        raise AssertionError('No problem fits in the budget')
+
+
+def test_warm_start():
+    import os
+    import tempfile
+    from algorithm import Algorithm
+    from parameter import Parameter
+    from testproblem import TestProblem
+    from modeldata import ModelData
+    from modelstructure import ModelStructure
+    from model import Model
+    from history import record_evaluation
+    from history import create_point_tag
+    from history import ResultStore
+
+    def sum_time(parameters, measures):
+        return sum(measures['TIME'])
+
+    historyFile = tempfile.mktemp(suffix='.hist')
+    # The previous campaign tuned x and y on the problems A and B
+    for x, y, a, b in [(1.0, 5.0, 3.0, 1.0), (2.0, 6.0, 1.0, 1.0),
+                       (3.0, 7.0, 2.0, 9.0)]:
+        record_evaluation(historyFile, [str(x), str(y)], (a + b, []),
+                          {'A':{'TIME':a}, 'B':{'TIME':b}}, ['x', 'y'])
+    record_evaluation(historyFile, ['0.0', '0.0'], None, {}, ['x', 'y'])
+
+    # The new campaign tunes x and z on the problems B and C
+    algorithm = Algorithm(name='ALGO')
+    algorithm.add_param(Parameter(name='x', kind='real', default=0.5))
+    algorithm.add_param(Parameter(name='z', kind='integer', default=4))
+    data = ModelData(algorithm,
+                     problems=[TestProblem(name='B'), TestProblem(name='C')])
+    model = Model(modelData=data,
+                  modelStructure=ModelStructure(objective=sum_time))
+    storeFile = tempfile.mktemp(suffix='.results')
+    seeded = model.warm_start(historyFile, nPoints=2, resultStore=storeFile)
+    # The points are ranked by their times on B, the only common problem
+    assert seeded == [[1.0, 4], [2.0, 4]]
+    assert model.get_initial_points() == [[1.0, 4], [2.0, 4], [0.5, 4]]
+    store = ResultStore(storeFile)
+    assert store.get(create_point_tag([1.0, 4]), 'B') == ({'TIME':1.0}, None)
+    assert store.get(create_point_tag([1.0, 4]), 'C') is None
+    os.remove(historyFile)
+    os.remove(storeFile)
+
+
+def test_parameter_screening():
+    try:
+        import numpy
+    except ImportError:
+        from nose.plugins.skip import SkipTest
+        raise SkipTest('numpy is not available')
+    from algorithm import Algorithm
+    from parameter import Parameter
+    from modeldata import ModelData
+    from modelstructure import ModelStructure
+    from model import Model
+    from screening import screen_model
+    from ..Solvers.mads import FunctionEvaluation
+
+    def sum_value(parameters, measures):
+        return sum(measures['VALUE'])
+
+    def function(point):
+        a, b, c, n = point
+        return (10*a*a + b + 0.0*c, [])
+
+    algorithm = Algorithm(name='ALGO')
+    for name in ['a', 'b', 'c']:
+        algorithm.add_param(Parameter(name=name, kind='real', default=0.5,
+                                      bound=[0.0, 1.0]))
+    algorithm.add_param(Parameter(name='n', kind='integer', default=2,
+                                  bound=[1, None]))
+    model = Model(modelData=ModelData(algorithm),
+                  modelStructure=ModelStructure(objective=sum_value))
+    reduced, ranking = screen_model(model, threshold=0.05,
+                                    evaluation=FunctionEvaluation(function))
+    assert [name for name, m, s in ranking][:2] == ['a', 'b']
+    assert ranking[2][1] == 0.0
+    assert [param.name for param in reduced.variables] == ['a', 'b']
+    fixed = reduced.data.get_algorithm().parameters
+    assert fixed['c'].is_const()
+    assert fixed['n'].get_default() == 2
+    # The screened model is left unchanged
+    assert not algorithm.parameters['c'].is_const()
+    assert len(model.variables) == 4
+
+
+def test_screening_model_evaluation():
+    import os
+    import shutil
+    import tempfile
+    try:
+        import numpy
+    except ImportError:
+        from nose.plugins.skip import SkipTest
+        raise SkipTest('numpy is not available')
+    from algorithm import Algorithm
+    from parameter import Parameter
+    from measure import Measure
+    from testproblem import TestProblem
+    from modeldata import ModelData
+    from modelstructure import ModelStructure
+    from model import Model
+    from screening import screen_model
+
+    def sum_value(parameters, measures):
+        return sum(measures['VALUE'])
+
+    # The evaluation of the points goes through the data generator, which
+    # sets the values of the parameters
+    workDir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(workDir)
+    try:
+        script = open('run.sh', 'w')
+        script.write('x=`grep "^x:" $1 | cut -d: -f3`\n' + \
+                     'awk -v x=$x "BEGIN {print \\"VALUE\\", 10*x}" > $3\n')
+        script.close()
+        algorithm = Algorithm(name='SHELL')
+        algorithm.set_executable_command('sh run.sh')
+        for name in ['x', 'y']:
+            algorithm.add_param(Parameter(name=name, kind='real',
+                                          default=0.5, bound=[0.0, 1.0]))
+        algorithm.add_measure(Measure(name='VALUE', kind='real'))
+        model = Model(modelData=ModelData(algorithm,
+                                          problems=[TestProblem(name='P')]),
+                      modelStructure=ModelStructure(objective=sum_value),
+                      platform='SMP')
+        reduced, ranking = screen_model(model, nTrajectories=3)
+        assert [name for name, m, s in ranking] == ['x', 'y']
+        assert [param.name for param in reduced.variables] == ['x']
+        fixed = reduced.data.get_algorithm().parameters['y']
+        assert fixed.is_const() and (fixed.get_default() == 0.5)
+        # The parameters of the model keep their values and the model file
+        # is not written
+        assert [param.value for param in algorithm.parameters] == [0.5, 0.5]
+        assert not os.path.exists(model.data_file)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workDir)
+
+
+def test_design_evaluation():
+    import os
+    import tempfile
+    try:
+        import numpy
+    except ImportError:
+        from nose.plugins.skip import SkipTest
+        raise SkipTest('numpy is not available')
+    from algorithm import Algorithm
+    from parameter import Parameter
+    from modeldata import ModelData
+    from modelstructure import ModelStructure
+    from model import Model
+    from design import create_sobol_sequence
+    from design import create_latin_hypercube
+    from design import evaluate_design
+    from ..Solvers.mads import FunctionEvaluation
+
+    sobol = create_sobol_sequence(16, 64)
+    assert sobol[:4, :2].tolist() == [[0.0, 0.0], [0.5, 0.5],
+                                      [0.75, 0.25], [0.25, 0.75]]
+    # Each coordinate takes one value in each slice of width 1/64
+    for i in range(16):
+        assert sorted((sobol[:, i]*64).astype(int)) == range(64)
+    lhs = create_latin_hypercube(3, 10)
+    for i in range(3):
+        assert sorted((lhs[:, i]*10).astype(int)) == range(10)
+
+    def sum_value(parameters, measures):
+        return sum(measures['VALUE'])
+
+    calls = []
+    def function(point):
+        calls.append(point)
+        x, n = point
+        return (x + n, [[None, x - 0.5]])
+
+    algorithm = Algorithm(name='ALGO')
+    algorithm.add_param(Parameter(name='x', kind='real', default=0.0,
+                                  bound=[0.0, 1.0]))
+    algorithm.add_param(Parameter(name='n', kind='integer', default=0,
+                                  bound=[0, 1]))
+    model = Model(modelData=ModelData(algorithm),
+                  modelStructure=ModelStructure(objective=sum_value))
+    tableFile = tempfile.mktemp(suffix='.csv')
+    table = evaluate_design(model, design='grid', nLevels=4,
+                            evaluation=FunctionEvaluation(function),
+                            tableFile=tableFile)
+    # The four levels of n are mapped to two values, hence eight points
+    assert len(table) == 8
+    assert len(calls) == 8
+    assert table.get_column('n') == [0, 1]*4
+    assert table.get_row(7) == {'x':1.0, 'n':1, 'objective':2.0,
+                                'constraint1-lower':None,
+                                'constraint1-upper':0.5}
+    f = open(tableFile)
+    lines = f.readlines()
+    f.close()
+    assert lines[0].strip() == 'x,n,objective,constraint1-lower,' + \
+           'constraint1-upper'
+    assert len(lines) == 9
+    os.remove(tableFile)
+
+
+def test_design_model_evaluation():
+    import os
+    import shutil
+    import tempfile
+    try:
+        import numpy
+    except ImportError:
+        from nose.plugins.skip import SkipTest
+        raise SkipTest('numpy is not available')
+    from algorithm import Algorithm
+    from parameter import Parameter
+    from measure import Measure
+    from testproblem import TestProblem
+    from modeldata import ModelData
+    from modelstructure import ModelStructure
+    from model import Model
+    from design import evaluate_design
+
+    def sum_value(parameters, measures):
+        return sum(measures['VALUE'])
+
+    workDir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(workDir)
+    try:
+        script = open('run.sh', 'w')
+        script.write('x=`grep "^x:" $1 | cut -d: -f3`\n' + \
+                     'awk -v x=$x "BEGIN {print \\"VALUE\\", 2*x}" > $3\n')
+        script.close()
+        algorithm = Algorithm(name='SHELL')
+        algorithm.set_executable_command('sh run.sh')
+        algorithm.add_param(Parameter(name='x', kind='real', default=0.25,
+                                      bound=[0.0, 1.0]))
+        algorithm.add_measure(Measure(name='VALUE', kind='real'))
+        model = Model(modelData=ModelData(algorithm,
+                                          problems=[TestProblem(name='P')]),
+                      modelStructure=ModelStructure(objective=sum_value),
+                      platform='SMP')
+        table = evaluate_design(model, design='grid', nLevels=3)
+        assert table.get_column('P.VALUE') == [0.0, 1.0, 2.0]
+        # The model keeps its parameter values and its file is not written
+        assert algorithm.parameters['x'].value == 0.25
+        assert not os.path.exists(model.data_file)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workDir)
+
+
+def test_set():
+    from testproblem import TestProblem
+    from testproblem import ProblemSet
+    from data import DataSet
+    from parameter import Parameter
+
+    problems = ProblemSet(name='problems')
+    for i in range(10):
+        problems.add_problem(TestProblem(name='P' + str(i)))
+    assert 'P3' in problems
+    assert problems['P3'] in problems
+    assert 'P10' not in problems
+    assert [1, 2] not in problems
+    problems.remove('P3')
+    problems.remove_problem(problems['P0'])
+    assert 'P3' not in problems
+    assert len(problems) == 8
+    assert problems['P4'].name == 'P4'
+    assert [prob.name for prob in problems] == \
+           ['P1', 'P2', 'P4', 'P5', 'P6', 'P7', 'P8', 'P9']
+    assert problems[2].name == 'P4' # Positions are renumbered
+    for i in range(1, 10):
+        if i != 3:
+            problems.remove('P' + str(i))
+    assert len(problems) == 0
+    problems.add_problem(TestProblem(name='P3'))
+    assert problems[0].name == 'P3'
+    try:
+        problems.remove('P0')
+        assert False
+    except IndexError:
+        pass
+
+    parameters = DataSet(name='parameters',
+                         elements=[Parameter(name='a', default=1.0),
+                                   Parameter(name='b', default=2.0)])
+    parameters.set_values([3.0])
+    parameters.set_values({'b':4.0})
+    assert [param.value for param in parameters] == [3.0, 4.0]
+
+
+def test_problem_collection():
+    from testproblem import TestProblem
+    from testproblem import ProblemSet
+    from testproblem import ProblemCollection
+
+    HS = ProblemSet(name='HS')
+    HS.add_problem(TestProblem(name='HS13'))
+    custom = ProblemCollection(name='custom')
+    custom.add_problem(TestProblem(name='ROSENBR'))
+    CUTEr = ProblemCollection(name='CUTEr')
+    CUTEr.add_problem(TestProblem(name='BDQRTIC'))
+    CUTEr.add_subcollection(HS)
+    CUTEr.add_subcollection(custom)
+    # The problems added to a subcollection are indexed by its parents
+    HS.add_problem(TestProblem(name='HS26'))
+    custom.add_problem(TestProblem(name='WOODS'))
+    assert [prob.name for prob in CUTEr] == \
+           ['BDQRTIC', 'HS13', 'HS26', 'ROSENBR', 'WOODS']
+    assert len(CUTEr) == 5
+    # The positions cover the problems of the subcollections too
+    assert [CUTEr[i].name for i in range(len(CUTEr))] == \
+           ['BDQRTIC', 'HS13', 'HS26', 'ROSENBR', 'WOODS']
+    assert CUTEr[-1].name == 'WOODS'
+    try:
+        CUTEr[5]
+        assert False
+    except IndexError:
+        pass
+    assert CUTEr['HS26'] is HS['HS26']
+    assert 'WOODS' in CUTEr
+    assert custom['WOODS'] in CUTEr
+    assert 'WOODS' not in HS
+    assert CUTEr.find_sub_collection('custom') is custom
+    assert CUTEr.find_sub_collection('HS') is HS
+    HS.remove_problem('HS13')
+    assert 'HS13' not in CUTEr
+    try:
+        CUTEr['HS13']
+        assert False
+    except IndexError:
+        pass
+
+
+def test_measure_extractor():
+    import os
+    import StringIO
+    from tools import MeasureExtractor
+    from tools import extract_measure
+
+    output = ' #iterations... : 34\n' + \
+             ' objective value : 0.2420000E+02/  0.1234567E-12\n' + \
+             ' Exit code...... : -1\n' + \
+             ' user     :     0.02\n' + \
+             ' #iterations... : 35\n'
+    extractor = MeasureExtractor([('\#iterations\.*', 'NITER', 'int'),
+                                  ('Exit code\.*', 'ECODE', 'int'),
+                                  ('user', 'CPU', 'real'),
+                                  ('Gradient evals\.*', 'GEVAL', 'int')])
+    extractor.add_pattern('objective value[ \t]:[ \t]+' + \
+                          '(?P<FVAL0>-?\d*\.\d+E[+-]\d+)/[ \t]+' + \
+                          '(?P<FVAL>-?\d*\.\d+E[+-]\d+)',
+                          {'FVAL0': 'float', 'FVAL': 'float'})
+    measures = {'NITER': 35, 'ECODE': -1, 'CPU': 0.02, 'GEVAL': None,
+                'FVAL0': 24.2, 'FVAL': 1.234567e-13}
+    assert extractor.parse(output) == measures
+    assert extract_measure(output, '\#iterations\.*', 'NITER') == 35
+    # The output is fed by chunks that split the lines
+    extractor.reset()
+    for i in range(0, len(output), 7):
+        extractor.feed(output[i:i + 7])
+    assert extractor.close() == measures
+    # or read from a file descriptor
+    readEnd, writeEnd = os.pipe()
+    os.write(writeEnd, output)
+    os.close(writeEnd)
+    assert extractor.parse(readEnd) == measures
+    os.close(readEnd)
+    # A measure is not found across a line break, whether the output is
+    # given as a string or as a stream
+    output = ' user     :\n 0.02\n #iterations... : 35\n'
+    measures = {'NITER': 35, 'ECODE': None, 'CPU': None, 'GEVAL': None,
+                'FVAL0': None, 'FVAL': None}
+    assert extractor.parse(output) == measures
+    assert extractor.parse(StringIO.StringIO(output), blockSize=12) == \
+           measures
+
+
+def test_parameter_constraint():
+    import pickle
+    try:
+        import numpy
+    except ImportError:
+        from nose.plugins.skip import SkipTest
+        raise SkipTest('numpy is not available')
+    from parameter import Parameter
+    from parameter import ParameterConstraint
+
+    eta1 = Parameter(name='eta1', default=0.25)
+    eta10 = Parameter(name='eta10', default=2.0)
+    # eta1 is a prefix of eta10
+    constraint = ParameterConstraint('0 < eta1 <= 1 and not eta10 > 5')
+    assert constraint.get_names() == ['eta1', 'eta10']
+    assert constraint([eta1, eta10])
+    eta10.set_value(6.0)
+    assert not constraint([eta1, eta10])
+    values = numpy.array([-1.0, 0.5, 1.0, 1.5])
+    assert list(constraint.evaluate({'eta1': values, 'eta10': 2.0})) == \
+           [False, True, True, False]
+    assert list(constraint.evaluate({'eta1': values,
+                                     'eta10': values*5})) == \
+           [False, True, True, False]
+    constraint = pickle.loads(pickle.dumps(constraint))
+    assert constraint([eta1, Parameter(name='eta10', default=2.0)])
+    # The discarded branch may be invalid
+    constraint = ParameterConstraint('log(x) < 1 if x > 0 else abs(x) < 1')
+    assert list(constraint.evaluate({'x': values})) == \
+           [False, True, True, True]
+
+
+def test_check_points():
+    try:
+        import numpy
+    except ImportError:
+        from nose.plugins.skip import SkipTest
+        raise SkipTest('numpy is not available')
+    from algorithm import Algorithm
+    from algorithm import FEASIBLE
+    from algorithm import OUT_OF_BOUNDS
+    from algorithm import CONSTRAINT_VIOLATED
+    from parameter import Parameter
+
+    algo = Algorithm(name='check')
+    algo.add_param(Parameter(name='eta1', default=0.25, bound=[0.0, 1.0]))
+    algo.add_param(Parameter(name='eta10', default=0.75))
+    algo.add_param(Parameter(name='n', kind='integer', default=2,
+                             bound=[1, 5]))
+    algo.add_param(Parameter(name='side', kind='categorical',
+                             default='left', bound=['left', 'right']))
+    algo.add_parameter_constraint('eta1 < eta10')
+    algo.add_parameter_constraint('side == "left" or n > 2')
+    points = numpy.array([[0.25, 0.75, 2],
+                          [1.5, 2.0, 2],
+                          [0.5, 0.25, 3],
+                          [0.5, 0.75, 0.5]])
+    feasible, reasons = algo.check_points(points, ['eta1', 'eta10', 'n'])
+    assert list(feasible) == [True, False, False, False]
+    assert list(reasons) == [FEASIBLE, OUT_OF_BOUNDS, CONSTRAINT_VIOLATED,
+                             OUT_OF_BOUNDS]
+    # The categorical values and the constraints on them
+    feasible, reasons = algo.check_points([['right', 2], ['right', 3],
+                                           ['up', 3]], ['side', 'n'])
+    assert list(reasons) == [CONSTRAINT_VIOLATED, FEASIBLE, OUT_OF_BOUNDS]
+    # The parameters are left unchanged
+    assert [param.value for param in algo.parameters] == \
+           [0.25, 0.75, 2, 'left']
@@ -75,19 +75,28 @@ class ProblemSet(Set):
     In the above example, note that a `ProblemSet` is iterable.
     """
 
+    parent_collections = () # Collections that index the problems of the set
+
     def __init__(self, name='Problem-Set', **kwargs):
         Set.__init__(self, name=name, **kwargs)
         return
 
+    def identify(self):
+        return self.name
+
     def add_problem(self, problem):
         "Add problem to collection."
         if isinstance(problem, TestProblem):
             self.append(problem)
+            for collection in self.parent_collections:
+                collection.index_problem(problem)
         else:
             raise TypeError, 'Problem must be a TestProblem'
 
     def remove_problem(self, problem):
         self.remove(problem)
+        for collection in self.parent_collections:
+            collection.reindex()
 
     
     def select(self, query):
@@ -99,7 +108,7 @@ class ProblemSet(Set):
         is its classification string.
         """
         queryResult = ProblemSet(name='query result')
-        for prob in self.db:
+        for prob in self:
             if query.match(prob):
                 queryResult.append(prob)
         return queryResult
@@ -130,61 +139,138 @@ class ProblemCollection(ProblemSet):
     """
 
     def __init__(self, name=None, description=None, **kwargs):
-        self.name = name
+        ProblemSet.__init__(self, name=name, **kwargs)
         self.description = description
-        ProblemSet.__init__(self, name='set of problems', **kwargs)
         self.subcollections = Set(name='sub-collections') # List of
                                                           # subcollections of
                                                           # this collection
+        # The problems of the collection and of all of its subcollections by
+        # name. The index is kept up to date by the subcollections, which
+        # know their parents.
+        self.problem_index = {}
+
+    problem_index = None # Built on demand for the collections pickled
+                         # without it
+
+    def get_problem_index(self):
+        if self.problem_index is None:
+            self.reindex()
+        return self.problem_index
+
+    def index_problem(self, problem):
+        '''
+
+        Add a problem of the collection or of one of its subcollections to
+        the index of the collection and of its parents
+        '''
+        index = self.get_problem_index()
+        if problem.identify() not in index:
+            index[problem.identify()] = problem
+        for collection in self.parent_collections:
+            collection.index_problem(problem)
+        return
+
+    def reindex(self):
+        '''
+
+        Build again the index of the collection and of its parents, for
+        example after the removal of a problem
+        '''
+        index = {}
+        for prob in self.all_problems():
+            if prob.identify() not in index:
+                index[prob.identify()] = prob
+        self.problem_index = index
+        for collection in self.parent_collections:
+            collection.reindex()
+        return
 
     def __len__(self):
-        size = ProblemSet.__len__(self)
-        for collection in self.subcollections:
-            size = size + collection.__len__()
-        return size
+        return len(self.get_problem_index())
 
     def __getitem__(self, key):
+        if type(key) == type(0):
+            # The position is the one of the problem in the iteration over
+            # the collection and its subcollections
+            if 0 <= key < ProblemSet.__len__(self):
+                return ProblemSet.__getitem__(self, key)
+            if key < 0:
+                key = key + len(self)
+            if key >= 0:
+                for position, prob in enumerate(self.all_problems()):
+                    if position == key:
+                        return prob
+            raise IndexError, 'Element can not be found in the set'
         try:
-            return ProblemSet.__getitem__(self, key)
-        except IndexError:
-            for collection in self.subcollections:
-                try:
-                    return collection.__getitem__(key)
-                except IndexError:
-                    pass # Try to get from other collections
-            # If all collections are searched wihtout result
-            # an exception of index error is raised
+            return self.get_problem_index()[key]
+        except KeyError:
             raise IndexError, 'Element can not be found in the set'
 
     def __contains__(self,prob):
-        if ProblemSet.__contains__(self, prob):
-            return True
+        try:
+            return self.get_identity(prob) in self.get_problem_index()
+        except TypeError:
+            return False
+
+    def __iter__(self):
+        return self.all_problems()
+
+    def all_problems(self):
+        '''
+
+        Iterate over the problems of the collection and of its
+        subcollections, each one once, without copying the lists of
+        problems
+        '''
+        if len(self.subcollections) == 0:
+            return ProblemSet.__iter__(self)
+        return self.iterate_problems()
+
+    def iterate_problems(self):
+        seen = set()
+        for prob in ProblemSet.__iter__(self):
+            seen.add(prob.identify())
+            yield prob
         for collection in self.subcollections:
-            # Search recursively in the subcollections
-            if collection.__contains__(prob):
-                return True
-        return False
+            for prob in collection:
+                if prob.identify() not in seen:
+                    seen.add(prob.identify())
+                    yield prob
 
-    def identify(self):
-        return self.name
+    def add_problem(self, problem):
+        "Add problem to collection."
+        if isinstance(problem, TestProblem):
+            self.append(problem)
+            self.index_problem(problem)
+        else:
+            raise TypeError, 'Problem must be a TestProblem'
+
+    def remove_problem(self, problem):
+        self.remove(problem)
+        self.reindex()
 
     def find_sub_collection(self, collectionId):
         for collection in self.subcollections:
-            if collection.identify() is collectionId:
+            if collection.identify() == collectionId:
                 return collection
-            result = collection.find_sub_collection(collectionId)
-            if result is not None:
-                return result
+            if isinstance(collection, ProblemCollection):
+                result = collection.find_sub_collection(collectionId)
+                if result is not None:
+                    return result
         return None # No subcollection can be found
-            
+
     def add_subcollection(self, collection):
         "Add a subcollection to this collection."
-        if isinstance(collection, ProblemCollection):
+        if isinstance(collection, ProblemSet):
             self.subcollections.append(collection)
+            collection.parent_collections = \
+                collection.parent_collections + (self,)
+            for prob in collection:
+                self.index_problem(prob)
         else:
-            raise TypeError, 'Collection must be a ProblemCollection object'
+            raise TypeError, 'Collection must be a ProblemSet object'
+
 
-        
 def _test():
     import doctest
     return doctest.testmod()
@@ -1,25 +1,192 @@
 # Miscellaneous tools.
+import os
 import re
 
+number_patterns = {'int':'-?\d+',
+                   'real':'-?\d*\.\d+',
+                   'float':'-?\d*\.\d+E[+-]\d+'}
+converters = {'int':int,
+              'real': float,
+              'float': float}
+
+
+class MeasureExtractor:
+    """
+
+    Extract the measure values from the output of a solver. A measure is
+    described by a tuple (label, name, type) or (label, name, type,
+    separator): its value, of type 'int', 'real' or 'float', follows the
+    label (a regular expression) and the separator, '[ \t]+:[ \t]+' by
+    default. A pattern with several named groups, each a measure, can be
+    added by `add_pattern`. When a measure is found several times, the last
+    value is kept; a measure that is not found is None.
+
+    A measure is found within a line: the labels, the separators and the
+    patterns must not match a line break, so use '[ \t]' rather than '\s'.
+    Otherwise a measure split over two lines would be found in a string but
+    missed in a stream cut between these lines.
+
+    The descriptions are compiled once into a single pattern, so that the
+    output is read in one pass. It is given whole to `parse` or by chunks,
+    as the solver writes it, to `feed`, which is what `parse` does with a
+    file or a file descriptor.
+
+    Example::
+
+        extractor = MeasureExtractor([('Exit code\.*', 'ECODE', 'int'),
+                                      ('user', 'CPU', 'real')])
+        measures = extractor.parse(open('problem.sol'))
+    """
+    def __init__(self, measures=[], separator='[ \t]+:[ \t]+'):
+        self.separator = separator
+        self.patterns = []
+        self.names = []
+        self.compiled_pattern = None
+        self.values = {}
+        self.buffer = ''
+        for measure in measures:
+            self.add_measure(*measure)
+        return
+
+    def add_measure(self, label, name, valueType='int', separator=None):
+        if separator is None:
+            separator = self.separator
+        self.add_pattern(label + separator + '(?P<' + name + '>' + \
+                         number_patterns[valueType] + ')',
+                         {name: valueType})
+        return
+
+    def add_pattern(self, pattern, types):
+        '''
+
+        Add a regular expression whose named groups are measures. `types`
+        gives the type of each of them.
+        '''
+        self.patterns.append((pattern, types))
+        for name in types.keys():
+            if name not in self.names:
+                self.names.append(name)
+                self.values[name] = None
+        self.compiled_pattern = None
+        return
+
+    def compile(self):
+        # The descriptions are the alternatives of a single pattern. They
+        # are not enclosed in groups, which would prevent the regular
+        # expression engine from skipping quickly to the positions where
+        # one of them can start.
+        self.types = {}
+        for pattern, types in self.patterns:
+            self.types.update(types)
+        self.compiled_pattern = re.compile('|'.join(
+            ['(?:' + pattern + ')' if '|' in pattern else pattern \
+             for pattern, types in self.patterns]))
+        return self.compiled_pattern
+
+    def copy(self):
+        '''
+
+        Return an extractor of the same measures with its own values, for
+        example to read the outputs of concurrent runs
+        '''
+        extractor = MeasureExtractor(separator=self.separator)
+        for pattern, types in self.patterns:
+            extractor.add_pattern(pattern, types)
+        if self.compiled_pattern is None:
+            self.compile()
+        extractor.types = self.types
+        extractor.compiled_pattern = self.compiled_pattern
+        return extractor
+
+    def __getstate__(self):
+        # The compiled pattern is rebuilt at the first use
+        state = dict(self.__dict__)
+        state['compiled_pattern'] = None
+        return state
+
+    def reset(self):
+        self.values = dict([(name, None) for name in self.names])
+        self.buffer = ''
+        return
+
+    def scan(self, content):
+        '''
+
+        Record the measures found in `content` and return them as a
+        dictionary
+        '''
+        if self.compiled_pattern is None:
+            self.compile()
+        found = {}
+        for match in self.compiled_pattern.finditer(content):
+            for name, value in match.groupdict().items():
+                if value is not None:
+                    found[name] = converters[self.types[name]](value)
+        self.values.update(found)
+        return found
+
+    def feed(self, data):
+        '''
+
+        Scan the complete lines of a chunk of output. The last line, if it is
+        not complete, is kept until the next chunk or the call of `close`.
+        Return the measures found in the scanned lines.
+        '''
+        end = data.rfind('\n')
+        if end < 0:
+            self.buffer = self.buffer + data
+            return {}
+        content = self.buffer + data[:end + 1]
+        self.buffer = data[end + 1:]
+        return self.scan(content)
+
+    def close(self):
+        '''
+
+        Scan the remaining output and return the values of all the measures
+        '''
+        if len(self.buffer) > 0:
+            self.scan(self.buffer)
+            self.buffer = ''
+        return self.get_measures()
+
+    def get_measures(self):
+        return dict(self.values)
+
+    def parse(self, source, blockSize=65536):
+        '''
+
+        Return the measures found in `source`, a string, a file object or a
+        file descriptor, which is read to its end
+        '''
+        self.reset()
+        if isinstance(source, basestring):
+            self.scan(source)
+        elif isinstance(source, int):
+            data = os.read(source, blockSize)
+            while len(data) > 0:
+                self.feed(data)
+                data = os.read(source, blockSize)
+        else:
+            data = source.read(blockSize)
+            while len(data) > 0:
+                self.feed(data)
+                data = source.read(blockSize)
+        return self.close()
+
+
+extractors = {}
+
 def extract_measure(content, description, name, valueType = 'int'):
-    numberPattern = {'int':'\d+',
-                     'real':'-?\d*\.\d+',
-                     'float':'-?\d*\.\d+E(\+|-)\d+'}
-    converters = {'int':int,
-                  'real': float,
-                  'float': float}
-
-    matches = re.finditer(description + '\s+:\s+(?P<' +
-                          name + '>' +
-                          numberPattern[valueType] + ')',
-                          content)
-    value = None
-    for m in matches:
-        if name not in m.groupdict().keys():
-            raise Exception('Could not to extract measure ' + name)
-            continue
-        value = converters[valueType](m.groupdict()[name])
-    return value
+    '''
+
+    Return the last value of a measure in `content`. To extract several
+    measures, a `MeasureExtractor` reads the content only once.
+    '''
+    key = (description, name, valueType)
+    if key not in extractors:
+        extractors[key] = MeasureExtractor([key])
+    return extractors[key].scan(content).get(name, None)
 
 
 class TableFormatter: